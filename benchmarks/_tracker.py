@@ -0,0 +1,17 @@
+"""Helpers shared by the benchmark scripts."""
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def load_tracker_module():
+    """Import community-health_tracker.py (its file name is not a valid module name)."""
+    spec = importlib.util.spec_from_file_location("community_health_tracker",
+                                                  os.path.join(ROOT, "community-health_tracker.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,90 @@
+"""Benchmark for the anomaly detector and its multi-process backfill.
+
+Streams synthetic readings through the detector in memory (the per-reading
+cost of logging), then backfills an embedded SQLite database with a growing
+number of worker processes.
+
+    python benchmarks/bench_alerts.py --rows 1000000 5000000 --db-rows 2000000 --workers 1 2 4
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from _tracker import ROOT  # noqa: F401 (puts the repository on sys.path)
+from health_tracker.alerts import backfill, detect
+from health_tracker.storage import create_backend
+from health_tracker.summaries import UserSummary
+from health_tracker.validation import Reading
+
+
+def synthetic_readings(rows, users, seed=42):
+    """Yield (user_id, weight, systolic, diastolic, steps) grouped by user, with ~0.1% outliers."""
+    rng = random.Random(seed)
+    per_user, extra = divmod(rows, users)
+    for user_id in range(1, users + 1):
+        base_weight, base_steps = rng.gauss(75, 15), rng.gammavariate(4, 2000)
+        for _ in range(per_user + (user_id <= extra)):
+            weight = base_weight + rng.gauss(0, 0.8)
+            steps = max(base_steps + rng.gauss(0, 1500), 0)
+            if rng.random() < 0.001:
+                weight, steps = weight + rng.choice((-15, 15)), 0
+            yield user_id, round(weight, 1), round(rng.gauss(125, 15)), round(rng.gauss(80, 10)), round(steps)
+
+
+def bench_stream(rows, users):
+    readings = list(synthetic_readings(rows, users))
+    day = datetime(2024, 1, 1)
+    summary, alerts = None, 0
+    started = time.perf_counter()
+    for reading_id, (user_id, weight, systolic, diastolic, steps) in enumerate(readings, 1):
+        if summary is None or summary.user_id != user_id:
+            summary = UserSummary(user_id)
+        alerts += len(detect(summary, Reading(weight, systolic, diastolic, steps)))
+        summary.add(reading_id, day, weight, systolic, diastolic, steps)
+    elapsed = time.perf_counter() - started
+    print(f"stream rows={rows:>11,} alerts={alerts:,} elapsed={elapsed:.2f}s "
+          f"({rows / elapsed:,.0f} readings/sec, {elapsed / rows * 1e6:.2f} us/reading)")
+
+
+def bench_backfill(rows, users, worker_counts):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = "sqlite:///" + os.path.join(tmp, "bench.db")
+        backend = create_backend(url)
+        backend.executemany("INSERT INTO users (username, password) VALUES (%s, %s)",
+                            [(f"user{i}", "x") for i in range(users)])
+        first_day = datetime(2020, 1, 1)
+        backend.executemany(
+            "INSERT INTO health_data (user_id, weight, blood_pressure, systolic, diastolic, steps, date_logged) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            ((user_id, weight, f"{systolic}/{diastolic}", systolic, diastolic, steps, first_day + timedelta(minutes=i))
+             for i, (user_id, weight, systolic, diastolic, steps) in enumerate(synthetic_readings(rows, users))),
+        )
+        for workers in worker_counts:
+            backend.execute("DELETE FROM alerts")
+            started = time.perf_counter()
+            checked, found = backfill(url, workers)
+            elapsed = time.perf_counter() - started
+            print(f"backfill rows={checked:,} workers={workers} alerts={found:,} elapsed={elapsed:.2f}s "
+                  f"({checked / elapsed:,.0f} readings/sec)")
+        backend.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000000])
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--db-rows", type=int, default=0, help="also time backfilling this many rows from SQLite")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="worker counts for the backfill")
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        bench_stream(rows, args.users)
+    if args.db_rows:
+        bench_backfill(args.db_rows, args.users, args.workers)
+
+
+if __name__ == "__main__":
+    main()
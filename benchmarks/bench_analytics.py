@@ -0,0 +1,89 @@
+"""Scaling benchmark for the population analytics engine.
+
+Builds synthetic readings directly as column arrays (so tens of millions of
+rows fit in a few hundred MB) and times each statistic.  ``--db-rows`` also
+measures loading column blocks from an embedded SQLite database.
+
+    python benchmarks/bench_analytics.py --rows 1000000 10000000 30000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from _tracker import ROOT  # noqa: F401 (puts the repository on sys.path)
+from health_tracker.analytics import (
+    HealthColumns, bp_category_counts, daily_trends, load_columns, percentile_bands,
+)
+from health_tracker.storage import create_backend
+
+
+def synthetic_columns(rows, users, days, seed=42):
+    rng = np.random.default_rng(seed)
+    first_day = np.datetime64("2020-01-01").astype(np.int32)
+    return HealthColumns(
+        rng.integers(1, users + 1, rows, dtype=np.int32),
+        (first_day + rng.integers(0, days, rows)).astype(np.int32),
+        rng.normal(75, 15, rows).astype(np.float32),
+        rng.normal(125, 15, rows).round().astype(np.float32),
+        rng.normal(80, 10, rows).round().astype(np.float32),
+        rng.gamma(4, 2000, rows).round().astype(np.float32),
+    )
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def bench_compute(rows, users, days):
+    cols = synthetic_columns(rows, users, days)
+    timings = {
+        "daily_trends": timed(daily_trends, cols),
+        "bp_categories": timed(bp_category_counts, cols),
+        "percentiles": timed(percentile_bands, cols),
+    }
+    total = sum(timings.values())
+    details = " ".join(f"{name}={seconds:.3f}s" for name, seconds in timings.items())
+    print(f"rows={rows:>11,} {details} total={total:.3f}s ({rows / total:,.0f} rows/sec)")
+
+
+def bench_load(rows, users):
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = create_backend("sqlite:///" + os.path.join(tmp, "bench.db"))
+        backend.executemany("INSERT INTO users (username, password) VALUES (%s, %s)",
+                            [(f"user{i}", "x") for i in range(users)])
+        cols = synthetic_columns(rows, users, 365 * 3)
+        days = cols.day.astype("datetime64[D]").astype(str)
+        backend.executemany(
+            "INSERT INTO health_data (user_id, weight, systolic, diastolic, steps, date_logged) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            zip(cols.user_id.tolist(), cols.weight.tolist(), cols.systolic.tolist(),
+                cols.diastolic.tolist(), cols.steps.tolist(), days.tolist()),
+        )
+        started = time.perf_counter()
+        loaded = load_columns(backend)
+        elapsed = time.perf_counter() - started
+        backend.close()
+    print(f"load rows={len(loaded):,} elapsed={elapsed:.2f}s ({len(loaded) / elapsed:,.0f} rows/sec)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000000, 10000000])
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--days", type=int, default=365 * 5)
+    parser.add_argument("--db-rows", type=int, default=0, help="also time loading this many rows from SQLite")
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        bench_compute(rows, args.users, args.days)
+    if args.db_rows:
+        bench_load(args.db_rows, args.users)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Throughput benchmark for the bulk health-metrics importer.
+
+Writes a synthetic CSV file, imports it into a fresh embedded SQLite
+database and reports rows/sec.  Run from the repository root::
+
+    python benchmarks/bench_bulk_import.py --rows 200000 --users 1000
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from _tracker import ROOT  # noqa: F401 (puts the repository on sys.path)
+from health_tracker.bulk_import import import_files
+from health_tracker.storage import create_backend
+
+
+def write_readings(path, rows, users, seed=42):
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    with open(path, "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["username", "weight", "blood_pressure", "steps", "date_logged"])
+        for i in range(rows):
+            writer.writerow([
+                f"user{rng.randrange(users)}",
+                round(rng.uniform(45, 120), 1),
+                f"{rng.randint(95, 160)}/{rng.randint(60, 100)}",
+                rng.randint(0, 20000),
+                (start + timedelta(minutes=i)).isoformat(" "),
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "readings.csv")
+        write_readings(csv_path, args.rows, args.users)
+
+        backend = create_backend("sqlite:///" + os.path.join(tmp, "bench.db"))
+        backend.executemany(
+            "INSERT INTO users (username, password) VALUES (%s, %s)",
+            [(f"user{i}", "x") for i in range(args.users)],
+        )
+
+        started = time.perf_counter()
+        report = import_files([csv_path], backend, args.batch_size)
+        elapsed = time.perf_counter() - started
+        backend.close()
+
+    print(f"rows={report.processed} inserted={report.inserted} rejected={len(report.rejected)} "
+          f"batch_size={args.batch_size}")
+    print(f"elapsed={elapsed:.2f}s throughput={report.inserted / elapsed:,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
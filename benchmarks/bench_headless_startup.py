@@ -0,0 +1,61 @@
+"""Cold-start benchmark for headless mode.
+
+Starts ``community-health_tracker.py --headless`` as a fresh process several
+times and measures the wall-clock time until the result of the first
+command (a login) is printed, and until the process exits.
+
+    python benchmarks/bench_headless_startup.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from _tracker import ROOT
+
+SCRIPT = os.path.join(ROOT, "community-health_tracker.py")
+COMMANDS = "login benchuser bench12345\nlog 70.5 120/80 6500\n"
+
+
+def run_once(db_url):
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, SCRIPT, "--headless", "--db", db_url],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, cwd=ROOT,
+    )
+    process.stdin.write(COMMANDS)
+    process.stdin.close()
+    first = process.stdout.readline()
+    first_at = time.perf_counter() - started
+    process.stdout.read()
+    process.wait()
+    if '"ok": true' not in first:
+        raise SystemExit(f"first command failed: {first.strip()}")
+    return first_at, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_url = "sqlite:///" + os.path.join(tmp, "bench.db")
+        # Create the schema and the user outside the timed runs
+        subprocess.run([sys.executable, SCRIPT, "--headless", "--db", db_url],
+                       input="register benchuser bench12345\n", text=True, check=True,
+                       stdout=subprocess.DEVNULL, cwd=ROOT)
+        results = [run_once(db_url) for _ in range(args.runs)]
+
+    first = [r[0] * 1000 for r in results]
+    total = [r[1] * 1000 for r in results]
+    print(f"runs={args.runs}")
+    print(f"first command: min={min(first):.0f}ms median={statistics.median(first):.0f}ms")
+    print(f"process total: min={min(total):.0f}ms median={statistics.median(total):.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Latency of a doctor's inbox as it fills up.
+
+Fills one doctor's inbox in an embedded SQLite database with a growing number
+of messages (mostly closed, a few percent unread), then times the cached
+unread/total counts, the first inbox page, walking the next pages with the
+keyset cursor, and - for comparison - counting unread messages with COUNT(*).
+
+    python benchmarks/bench_inbox.py --messages 1000 10000 100000 --pages 10
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from _tracker import ROOT  # noqa: F401 (puts the repository on sys.path)
+from health_tracker.messages import STATUSES, inbox_counts, inbox_page, recount
+from health_tracker.storage import create_backend
+from health_tracker.synthetic import populate
+
+STATUS_WEIGHTS = (3, 5, 12, 80)  # unread, read, replied, closed (percent)
+REPEATS = 20  # Timed calls per measurement
+
+
+def add_messages(backend, doctor_id, user_ids, first, count, seed=42):
+    """Add messages first..first+count-1 to a doctor's inbox, one minute apart, and recount the inboxes."""
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    rows = [
+        (doctor_id, rng.choice(user_ids), "message", rng.choices(STATUSES, STATUS_WEIGHTS)[0],
+         f"Synthetic message {n}", start + timedelta(minutes=n))
+        for n in range(first, first + count)
+    ]
+    with backend.transaction() as tx:
+        tx.executemany("INSERT INTO messages (doctor_id, user_id, kind, status, body, created_at) "
+                       "VALUES (%s, %s, %s, %s, %s, %s)", rows)
+    recount(backend)
+
+
+def median_ms(function, repeats=REPEATS):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def walk(backend, doctor_id, pages):
+    before = None
+    for _ in range(pages):
+        page = inbox_page(backend, doctor_id, before=before)
+        if not page.has_more:
+            return
+        before = page.last_key
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--pages", type=int, default=10, help="inbox pages walked per measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = create_backend("sqlite:///" + os.path.join(tmp, "bench.db"))
+        populate(backend, users=200, doctors=1, years=0.01)
+        doctor_id = backend.fetchone("SELECT MIN(id) FROM doctors")[0]
+        user_ids = [row[0] for row in backend.fetchall("SELECT id FROM users")]
+
+        print(f"{'messages':>9} {'counts':>9} {'page 1':>9} {f'{args.pages} pages':>10} {'COUNT(*)':>9}")
+        filled = 0
+        for total in sorted(args.messages):
+            add_messages(backend, doctor_id, user_ids, filled, total - filled, seed=total)
+            filled = total
+            counts = median_ms(lambda: inbox_counts(backend, doctor_id))
+            first = median_ms(lambda: inbox_page(backend, doctor_id))
+            pages = median_ms(lambda: walk(backend, doctor_id, args.pages), repeats=5)
+            scan = median_ms(lambda: backend.fetchone(
+                "SELECT COUNT(*) FROM messages WHERE doctor_id = %s AND status = 'unread'", (doctor_id,)))
+            print(f"{total:>9,} {counts:>7.2f}ms {first:>7.2f}ms {pages:>8.2f}ms {scan:>7.2f}ms")
+        backend.close()
+
+
+if __name__ == "__main__":
+    main()
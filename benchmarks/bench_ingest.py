@@ -0,0 +1,99 @@
+"""Per-row commits vs. the write-behind ingestion queue.
+
+Several threads (devices) log readings through HealthTracker.log_health_metrics
+at the same time, first with one commit per reading, then through an
+IngestQueue with group commits.  Each mode uses a fresh SQLite database.
+Reports throughput, p50/p99 latency of log_health_metrics and, for the
+queue, how long it took until every reading was committed.
+
+    python benchmarks/bench_ingest.py --threads 16 --readings 500
+    python benchmarks/bench_ingest.py --db mysql://root:@localhost/bench   # MySQL (tables are reused)
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from array import array
+
+from _tracker import ROOT  # noqa: F401 (puts the repository on sys.path)
+from health_tracker.core import HealthTracker
+from health_tracker.ingest import IngestQueue
+from health_tracker.storage import create_backend
+
+PASSWORD = "bench12345"
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run(db_url, wal_path, threads, readings, pool_size):
+    backend = create_backend(db_url, pool_size)
+    queue = IngestQueue(backend, wal_path) if wal_path else None
+    trackers = []
+    for n in range(threads):
+        tracker = HealthTracker(backend, ingest=queue or False)
+        tracker.register_user(f"device{n}", PASSWORD)
+        tracker.login_user(f"device{n}", PASSWORD)
+        trackers.append(tracker)
+    before = backend.fetchone("SELECT COUNT(*) FROM health_data")[0]
+
+    latencies = [array("d") for _ in range(threads)]
+    failures = []
+
+    def device(n):
+        tracker, timings = trackers[n], latencies[n]
+        for i in range(readings):
+            started = time.perf_counter()
+            ok, message = tracker.log_health_metrics(60 + i % 40, f"{110 + i % 30}/{70 + i % 15}", 1000 + i)
+            timings.append(time.perf_counter() - started)
+            if not ok:
+                failures.append(message)
+
+    workers = [threading.Thread(target=device, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    accepted = time.perf_counter() - started
+    if queue:
+        queue.flush()
+        queue.close()
+    committed = time.perf_counter() - started
+
+    rows = backend.fetchone("SELECT COUNT(*) FROM health_data")[0] - before
+    backend.close()
+    values = [value for timings in latencies for value in timings]
+    return {
+        "rows": rows, "failures": len(failures), "accepted": accepted, "committed": committed,
+        "p50": percentile(values, 50), "p99": percentile(values, 99),
+    }
+
+
+def report(name, result):
+    total = result["rows"]
+    print(f"{name:>12}: rows={total} failures={result['failures']} "
+          f"throughput={total / result['committed']:.0f} rows/s "
+          f"p50={result['p50'] * 1000:.2f}ms p99={result['p99'] * 1000:.2f}ms "
+          f"accepted in {result['accepted']:.2f}s, committed in {result['committed']:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16, help="concurrent devices")
+    parser.add_argument("--readings", type=int, default=500, help="readings per device")
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--db", help="database URL (default: a fresh SQLite file per mode)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, wal in (("per-row", None), ("write-behind", os.path.join(tmp, "ingest.wal"))):
+            url = args.db or "sqlite:///" + os.path.join(tmp, f"{name}.db")
+            report(name, run(url, wal, args.threads, args.readings, args.pool_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Overhead of the hot-path instrumentation.
+
+Logs readings and fetches history pages through HealthTracker on a fresh
+embedded SQLite database, first with metrics disabled and then enabled,
+and reports the time per operation of each run.
+
+    python benchmarks/bench_metrics.py --ops 20000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from _tracker import ROOT  # noqa: F401 (puts the repository on sys.path)
+from health_tracker import metrics
+from health_tracker.core import HealthTracker
+from health_tracker.storage import create_backend
+
+
+def run(tracker, ops):
+    started = time.perf_counter()
+    for i in range(ops):
+        tracker.log_health_metrics(60 + i % 40, f"{110 + i % 30}/{70 + i % 20}", 1000 + i % 9000)
+        tracker.display_health_history()
+    return (time.perf_counter() - started) / ops * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=20000, help="log + history round trips per run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = create_backend("sqlite:///" + os.path.join(tmp, "bench.db"))
+        tracker = HealthTracker(backend, ingest=False)
+        tracker.register_user("benchuser", "bench12345")
+        tracker.login_user("benchuser", "bench12345")
+        run(tracker, min(args.ops, 1000))  # Warm up caches and the page cache
+
+        disabled = run(tracker, args.ops)
+        metrics.enable()
+        enabled = run(tracker, args.ops)
+        backend.close()
+
+    print(f"disabled: {disabled:.1f} us/op")
+    print(f"enabled:  {enabled:.1f} us/op ({(enabled / disabled - 1) * 100:+.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
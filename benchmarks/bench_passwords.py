@@ -0,0 +1,54 @@
+"""Cost tuning benchmark for the scrypt password hashes.
+
+For each scrypt cost setting, measures the time of one hash, the memory it
+needs and how many logins per second the hashing pool sustains with many
+concurrent callers.  Pick the highest cost whose latency is acceptable and
+set it with HEALTH_TRACKER_SCRYPT_N / _R / _P.
+
+    python benchmarks/bench_passwords.py --costs 12,14,15,16 --concurrent 32
+"""
+import argparse
+import hashlib
+import os
+import statistics
+import time
+
+from _tracker import ROOT  # noqa: F401 (puts the repository on sys.path)
+from health_tracker.passwords import hash_password, hash_pool, verify_password
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--costs", default="12,13,14,15,16", help="comma separated log2(n) values")
+    parser.add_argument("--r", type=int, default=8)
+    parser.add_argument("--p", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=5, help="hashes timed per cost")
+    parser.add_argument("--concurrent", type=int, default=16, help="logins submitted to the pool at once")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    for _ in range(args.runs * 100):
+        hashlib.sha256(b"secret123").hexdigest()
+    legacy = (time.perf_counter() - started) / (args.runs * 100)
+    print(f"legacy sha256: {legacy * 1e6:.1f}us per hash")
+    print(f"hashing workers={os.cpu_count() or 1} (one per CPU)")
+
+    for log_n in (int(value) for value in args.costs.split(",")):
+        n = 2 ** log_n
+        stored = hash_password("secret123", n, args.r, args.p)
+        timings = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            verify_password("secret123", stored)
+            timings.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        futures = [hash_pool().submit(verify_password, "secret123", stored) for _ in range(args.concurrent)]
+        assert all(future.result()[0] for future in futures)
+        rate = args.concurrent / (time.perf_counter() - started)
+        print(f"n=2**{log_n} r={args.r} p={args.p}: memory={128 * n * args.r * args.p / 2 ** 20:.0f}MiB "
+              f"hash median={statistics.median(timings) * 1000:.1f}ms logins/s={rate:.1f}")
+
+
+if __name__ == "__main__":
+    main()
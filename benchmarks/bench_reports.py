@@ -0,0 +1,56 @@
+"""Throughput and memory of the report exporter.
+
+Generates a synthetic population (one reading per user per day) in an
+embedded SQLite database, then exports the cohort report in each format with
+a growing number of worker processes, reporting readings per second, output
+size and the largest resident set size of the exporting processes.
+
+    python benchmarks/bench_reports.py --users 1000 --years 3 --formats csv jsonl --workers 1 2 4
+"""
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+from _tracker import ROOT  # noqa: F401 (puts the repository on sys.path)
+from health_tracker.reports import FORMATS, export_cohort
+from health_tracker.storage import create_backend
+from health_tracker.synthetic import populate
+
+
+def max_rss_mib():
+    # Largest RSS of this process and of any finished worker process
+    peak = max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+    return peak / 1024  # Linux reports KiB
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--years", type=float, default=3.0, help="years of daily readings per user")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=["csv", "jsonl"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = "sqlite:///" + os.path.join(tmp, "bench.db")
+        backend = create_backend(url)
+        started = time.perf_counter()
+        population = populate(backend, users=args.users, doctors=0, years=args.years)
+        print(f"populated {population.readings:,} readings in {time.perf_counter() - started:.1f}s")
+
+        out = os.path.join(tmp, "report")
+        for fmt in args.formats:
+            for workers in args.workers:
+                started = time.perf_counter()
+                count = export_cohort(url, out, fmt, workers)
+                elapsed = time.perf_counter() - started
+                print(f"{fmt:<5} workers={workers} rows={count:,} elapsed={elapsed:.2f}s "
+                      f"({count / elapsed:,.0f} readings/sec) size={os.path.getsize(out) / 2**20:,.0f} MiB "
+                      f"max_rss={max_rss_mib():,.0f} MiB")
+        backend.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Load test for the HTTP/JSON service.
+
+Starts ``python -m health_tracker.service`` on a temporary SQLite database,
+opens many concurrent keep-alive client connections, logs each one in and
+sends a mix of requests (log a reading, fetch a history page, search the
+doctor directory).  Reports throughput and p50/p99 latency per endpoint.
+
+    python benchmarks/bench_service.py --clients 500 --requests 40
+    python benchmarks/bench_service.py --url http://127.0.0.1:8080   # an already running service
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from _tracker import ROOT
+
+MIX = (("log", 4), ("history", 4), ("doctors", 2))  # Endpoint weights of the request mix
+PASSWORD = "bench12345"
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection speaking JSON."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.token = None
+        self.reader = self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(body)}\r\n"
+        if self.token:
+            head += f"Authorization: Bearer {self.token}\r\n"
+        self.writer.write((head + "\r\n").encode() + body)
+        await self.writer.drain()
+
+        response_head = await self.reader.readuntil(b"\r\n\r\n")
+        status = int(response_head.split(b" ", 2)[1])
+        length = 0
+        for line in response_head.split(b"\r\n"):
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":", 1)[1])
+        return status, json.loads(await self.reader.readexactly(length))
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+async def setup_users(host, port, users):
+    client = Client(host, port)
+    await client.connect()
+    for n in range(users):
+        await client.request("POST", "/register", {"username": f"bench{n}", "password": PASSWORD})
+    await client.request("POST", "/register", {
+        "username": "benchdoc", "password": PASSWORD, "specialty": "Cardiology",
+        "name": "Bench Doctor", "email": "doc@example.org", "phone": "0700000000",
+    })
+    await client.close()
+
+
+async def run_client(host, port, number, users, requests, latencies, errors, rng):
+    client = Client(host, port)
+    await client.connect()
+    try:
+        status, response = await client.request("POST", "/login",
+                                                {"username": f"bench{number % users}", "password": PASSWORD})
+        if status != 200:
+            errors.append(f"login: {status} {response['message']}")
+            return
+        client.token = response["data"]["token"]
+        names, weights = zip(*MIX)
+        for _ in range(requests):
+            op = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            if op == "log":
+                status, response = await client.request("POST", "/readings", {
+                    "weight": round(rng.uniform(50, 110), 1),
+                    "blood_pressure": f"{rng.randint(100, 150)}/{rng.randint(60, 95)}",
+                    "steps": rng.randint(0, 20000),
+                })
+            elif op == "history":
+                status, response = await client.request("GET", "/history?size=20")
+            else:
+                status, response = await client.request("GET", "/doctors?name=ben")
+            latencies[op].append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(f"{op}: {status} {response['message']}")
+    finally:
+        await client.close()
+
+
+async def load_test(host, port, args):
+    await setup_users(host, port, args.users)
+    latencies = {name: [] for name, _ in MIX}
+    errors = []
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        run_client(host, port, n, args.users, args.requests, latencies, errors, random.Random(rng.random()))
+        for n in range(args.clients)
+    ))
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"clients={args.clients} requests={total} errors={len(errors)} "
+          f"elapsed={elapsed:.2f}s throughput={total / elapsed:.0f} req/s")
+    for name, values in list(latencies.items()) + [("all", [v for vs in latencies.values() for v in vs])]:
+        values.sort()
+        print(f"{name:>8}: n={len(values):6d} p50={percentile(values, 50) * 1000:7.1f}ms "
+              f"p99={percentile(values, 99) * 1000:7.1f}ms max={(values[-1] if values else 0) * 1000:7.1f}ms")
+    for error in errors[:5]:
+        print("error:", error)
+    return 1 if errors else 0
+
+
+def start_service(db_url, pool_size):
+    env = dict(os.environ, HEALTH_TRACKER_POOL_SIZE=str(pool_size))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "health_tracker.service", "--port", "0", "--db", db_url],
+        stdout=subprocess.PIPE, text=True, cwd=ROOT, env=env,
+    )
+    line = process.stdout.readline()
+    if not line.startswith("Serving on"):
+        process.kill()
+        raise SystemExit(f"service did not start: {line!r}")
+    parts = urlsplit(line.split()[-1])
+    return process, parts.hostname, parts.port
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200, help="concurrent connections")
+    parser.add_argument("--requests", type=int, default=50, help="requests per client after login")
+    parser.add_argument("--users", type=int, default=100, help="distinct accounts the clients log in as")
+    parser.add_argument("--pool-size", type=int, default=8, help="database connections of the service")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--url", help="test a running service instead of starting one")
+    args = parser.parse_args()
+
+    if args.url:
+        parts = urlsplit(args.url)
+        return asyncio.run(load_test(parts.hostname, parts.port, args))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        process, host, port = start_service("sqlite:///" + os.path.join(tmp, "bench.db"), args.pool_size)
+        try:
+            return asyncio.run(load_test(host, port, args))
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
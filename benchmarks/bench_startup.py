@@ -0,0 +1,78 @@
+"""Import-time breakdown of a quick headless action.
+
+Runs ``community-health_tracker.py --headless`` under ``python -X importtime``
+to log one reading (login + log) against a temporary SQLite database, then
+prints the slowest imports by cumulative time, the total import time and
+the wall-clock time of the run.  Modules that a headless run should never
+load (menu, driver or analytics dependencies) are reported when they show up,
+and ``--budget-ms`` makes the script exit non-zero above a wall-clock budget.
+
+    python benchmarks/bench_startup.py --runs 5 --top 15 [--budget-ms 250]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from _tracker import ROOT
+
+SCRIPT = os.path.join(ROOT, "community-health_tracker.py")
+COMMANDS = "login benchuser bench12345\nlog 70.5 120/80 6500\n"
+# Heavy dependencies that only the menus, MySQL, analytics or batch jobs need
+UNEXPECTED = ("tabulate", "keyboard", "mysql.connector", "numpy", "multiprocessing", "tempfile")
+
+
+def run_once(db_url):
+    """Return (wall seconds, {module: (self us, cumulative us)}) of one headless run."""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", SCRIPT, "--headless", "--db", db_url],
+                            input=COMMANDS, capture_output=True, text=True, cwd=ROOT)
+    elapsed = time.perf_counter() - started
+    if result.returncode or '"ok": false' in result.stdout:
+        raise SystemExit(f"headless run failed:\n{result.stdout}{result.stderr}")
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        imports[name.strip()] = (int(own), int(cumulative))
+    return elapsed, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--budget-ms", type=float, help="fail when the median run takes longer")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_url = "sqlite:///" + os.path.join(tmp, "bench.db")
+        # Create the schema and the user outside the timed runs
+        subprocess.run([sys.executable, SCRIPT, "--headless", "--db", db_url],
+                       input="register benchuser bench12345\n", text=True, check=True,
+                       stdout=subprocess.DEVNULL, cwd=ROOT)
+        runs = [run_once(db_url) for _ in range(args.runs)]
+
+    wall = statistics.median(elapsed for elapsed, _ in runs) * 1000
+    _, imports = runs[-1]
+    total = sum(own for own, _ in imports.values()) / 1000
+    print(f"runs={args.runs} median wall={wall:.0f}ms imports={total:.1f}ms ({len(imports)} modules, last run)")
+    print(f"{'cumulative':>10} {'self':>8}  module")
+    for name, (own, cumulative) in sorted(imports.items(), key=lambda item: -item[1][1])[:args.top]:
+        print(f"{cumulative / 1000:>8.1f}ms {own / 1000:>6.1f}ms  {name}")
+
+    loaded = [name for name in UNEXPECTED if name in imports]
+    if loaded:
+        print(f"unexpected imports: {', '.join(loaded)}")
+    if args.budget_ms is not None and wall > args.budget_ms:
+        print(f"over budget: {wall:.0f}ms > {args.budget_ms:.0f}ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
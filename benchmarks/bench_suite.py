@@ -0,0 +1,214 @@
+"""End-to-end benchmark suite over the tracker's hot paths.
+
+For each scale (number of users) a synthetic population is generated in a
+fresh embedded SQLite database, then the real code paths are timed:
+register_user, login_user, log_health_metrics, display_health_history
+(newest page and the one after it) and the Contact a Doctor menu (driven
+with scripted input: filter by specialty, pick a doctor).  Each scenario
+reports latency percentiles, throughput and the peak traced memory of a
+short extra run.
+
+Results are written as JSON and compared with a baseline (an earlier
+result file, by default the committed benchmarks/baseline.json): scenarios
+whose p50 latency or peak memory grew, or whose throughput dropped, by more
+than the tolerance (and more than NOISE_FLOOR) are reported and the exit
+status is 1.  The baseline was
+recorded on one machine; refresh it with ``--out`` when the reference
+hardware changes or a slowdown is accepted::
+
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --scales 100 1000 --out benchmarks/baseline.json --no-compare
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from datetime import datetime
+
+from _tracker import load_tracker_module
+from health_tracker.core import HealthTracker
+from health_tracker.storage import create_backend
+from health_tracker.synthetic import PASSWORD, populate
+
+SCHEMA_VERSION = 1  # Bumped when the result format changes
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+MEMORY_OPS = 20  # Operations repeated under tracemalloc for the memory figure
+# Changes smaller than these are run-to-run noise, whatever the ratio
+NOISE_FLOOR = {"p50_ms": 0.25, "peak_kib": 64.0}
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+def measure(name, scale, operation, ops):
+    """Time ops calls of operation(i), then trace the memory of a few more."""
+    latencies = []
+    started = time.perf_counter()
+    for i in range(ops):
+        op_started = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - op_started)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    for i in range(ops, ops + min(ops, MEMORY_OPS)):
+        operation(i)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "scenario": name,
+        "scale": scale,
+        "ops": ops,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "throughput": ops / elapsed,
+        "peak_kib": peak / 1024,
+    }
+
+
+def scripted(module, answers):
+    """Make the interactive module read its input from answers and print nowhere."""
+    script = iter(answers)
+    module.input = lambda prompt="": next(script)
+
+
+def run_scale(module, scale, args):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = create_backend("sqlite:///" + os.path.join(tmp, "bench.db"))
+        started = time.perf_counter()
+        population = populate(backend, scale, args.doctors, args.years, args.seed)
+        print(f"scale={scale}: {population.readings:,} readings generated in "
+              f"{time.perf_counter() - started:.1f}s", file=sys.stderr)
+        rng = random.Random(args.seed)
+        tracker = HealthTracker(backend, ingest=False)  # Every reading committed on its own
+
+        def register(i):
+            success, message = tracker.register_user(f"newuser{i:06d}", PASSWORD)
+            assert success, message
+
+        def login(i):
+            success, message = tracker.login_user(rng.choice(population.usernames), PASSWORD)
+            assert success, message
+
+        results.append(measure("register_user", scale, register, args.auth_ops))
+        results.append(measure("login_user", scale, login, args.auth_ops))
+
+        def log(i):
+            success, message = tracker.log_health_metrics(
+                round(rng.uniform(50, 110), 1), f"{rng.randint(100, 150)}/{rng.randint(60, 95)}",
+                rng.randint(0, 20000))
+            assert success, message
+
+        def history(i):
+            rows, headers, message, page = tracker.display_health_history()
+            assert rows, message
+            if page.has_older:
+                tracker.display_health_history(older_than=page.last_key)
+
+        results.append(measure("log_health_metrics", scale, log, args.ops))
+        results.append(measure("display_health_history", scale, history, args.ops))
+
+        # The menus use the shared backend of HEALTH_TRACKER_DB: point it at this database
+        menu = module.AdvancedHealthTracker.__new__(module.AdvancedHealthTracker)
+        HealthTracker.__init__(menu, backend, ingest=False)
+        doctors = menu.find_doctors()
+
+        def contact(i):
+            specialty = rng.randrange(len(module.SPECIALTIES)) + 1
+            doctor = rng.choice(doctors)
+            scripted(module, ["s", str(specialty), "n", str(doctor.id), ""])
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                assert menu.contact_doctor() == "home"
+
+        results.append(measure("contact_doctor", scale, contact, args.ops))
+        backend.close()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of results against a baseline result file, as readable strings."""
+    previous = {(r["scenario"], r["scale"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get((result["scenario"], result["scale"]))
+        if old is None:
+            continue
+        label = f"{result['scenario']} @ {result['scale']}"
+        for metric in ("p50_ms", "peak_kib"):
+            if result[metric] > old[metric] * tolerance and result[metric] - old[metric] > NOISE_FLOOR[metric]:
+                regressions.append(f"{label}: {metric} {old[metric]:.2f} -> {result[metric]:.2f}")
+        slower_ms = (1 / result["throughput"] - 1 / old["throughput"]) * 1000  # Per operation
+        if result["throughput"] * tolerance < old["throughput"] and slower_ms > NOISE_FLOOR["p50_ms"]:
+            regressions.append(f"{label}: throughput {old['throughput']:.1f} -> {result['throughput']:.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[100, 1000], help="users per run")
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--years", type=float, default=1.0, help="years of history per synthetic user")
+    parser.add_argument("--ops", type=int, default=500, help="operations per scenario")
+    parser.add_argument("--auth-ops", type=int, default=30, help="operations for register/login (scrypt bound)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="earlier result file to compare with")
+    parser.add_argument("--no-compare", action="store_true", help="do not compare with a baseline")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="allowed ratio against the baseline before a change counts as a regression")
+    args = parser.parse_args()
+
+    module = load_tracker_module()
+    # No screen clears or sleeps in a scripted menu
+    module.clear_screen = lambda: None
+    module.time = types.SimpleNamespace(sleep=lambda seconds: None)
+
+    results = []
+    for scale in args.scales:
+        results.extend(run_scale(module, scale, args))
+    report = {
+        "schema": SCHEMA_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"doctors": args.doctors, "years": args.years, "ops": args.ops,
+                     "auth_ops": args.auth_ops, "seed": args.seed},
+        "results": results,
+    }
+
+    for result in results:
+        print(f"{result['scenario']:>22} scale={result['scale']:<7} p50={result['p50_ms']:8.2f}ms "
+              f"p99={result['p99_ms']:8.2f}ms {result['throughput']:9.1f} ops/s peak={result['peak_kib']:8.0f}KiB",
+              file=sys.stderr)
+    if args.out:
+        with open(args.out, "w") as handle:
+            json.dump(report, handle, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.no_compare:
+        return 0
+    with open(args.baseline) as handle:
+        regressions = compare(results, json.load(handle), args.tolerance)
+    for regression in regressions:
+        print("REGRESSION:", regression, file=sys.stderr)
+    print(f"{len(regressions)} regressions against {args.baseline}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
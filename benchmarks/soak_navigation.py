@@ -0,0 +1,131 @@
+"""Soak test for the menu navigation loop.
+
+Scripts a long interactive session (login, then home -> tips -> history ->
+doctors -> log metrics -> ... over and over) through
+AdvancedHealthTracker.run() against an embedded SQLite database, and checks
+that stack depth, traced memory and per-step latency stay flat.  Exits
+non-zero if they grow.
+
+    python benchmarks/soak_navigation.py --steps 100000
+"""
+import argparse
+import array
+import contextlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+from _tracker import load_tracker_module
+
+# One loop of the scripted session, starting and ending at the home menu
+CYCLE = [
+    "1", "2", "",  # Health tips -> nutrition tips -> continue
+    "4", "",  # Personalised tips -> continue
+    "5",  # Back to home
+    "3", "",  # View history -> back
+    "4", "b",  # Contact a doctor -> back
+    "2", "70.5", "120/80", "6500", "",  # Log metrics
+    "9",  # Invalid choice
+]
+
+
+class SoakDone(Exception):
+    """Raised by the scripted input once enough steps have run."""
+
+
+def stack_depth():
+    frame, depth = sys._getframe(), 0
+    while frame:
+        depth, frame = depth + 1, frame.f_back
+    return depth
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, default=100000, help="menu inputs to script")
+    parser.add_argument("--windows", type=int, default=10, help="windows compared for growth")
+    parser.add_argument("--max-latency-growth", type=float, default=2.0,
+                        help="allowed ratio of last to first window median latency")
+    parser.add_argument("--max-memory-growth-kb", type=float, default=2048)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["HEALTH_TRACKER_DB"] = "sqlite:///" + os.path.join(tmp, "soak.db")
+        module = load_tracker_module()
+
+        # No screen clears, sleeps or welcome animation in a scripted session
+        module.clear_screen = lambda: None
+        module.time = types.SimpleNamespace(sleep=lambda seconds: None)
+        module.AdvancedHealthTracker.display_welcome_message = lambda self: None
+
+        tracker = module.AdvancedHealthTracker()
+        tracker.register_user("soakuser", "soak12345")
+        tracker.register_user("soakdoc", "soak12345", True, "Cardiology", "Soak Doctor", "doc@example.com", "123")
+
+        window = max(1, args.steps // args.windows)
+        latencies = array.array("d", bytes(8 * args.steps))  # Preallocated so it doesn't show up as growth
+        memory, depths = array.array("d", bytes(8 * (args.windows + 1))), set()
+        state = {"step": 0, "last": None}
+        script = iter(["1", "soakuser", "soak12345"])  # Login
+
+        def scripted_input(prompt=""):
+            nonlocal script
+            now = time.perf_counter()
+            if state["step"] >= args.steps:
+                raise SoakDone
+            if state["last"] is not None:
+                latencies[state["step"] - 1] = now - state["last"]
+            depths.add(stack_depth())
+            state["step"] += 1
+            if state["step"] % window == 0:
+                memory[state["step"] // window] = tracemalloc.get_traced_memory()[0]
+            try:
+                answer = next(script)
+            except StopIteration:
+                script = iter(CYCLE * 1000)
+                answer = next(script)
+            state["last"] = time.perf_counter()
+            return answer
+
+        module.input = scripted_input
+        module.getpass = types.SimpleNamespace(getpass=scripted_input)
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            try:
+                tracker.run()
+            except SoakDone:
+                pass
+        elapsed = time.perf_counter() - started
+        tracemalloc.stop()
+        tracker.db.close()
+
+    steps = state["step"]
+    latencies = latencies[:steps - 1]
+    memory = memory[1:steps // window + 1]
+    medians = [statistics.median(latencies[i:i + window]) * 1e6 for i in range(0, len(latencies), window)]
+    growth = medians[-1] / medians[0] if medians[0] else 1.0
+    memory_growth = (memory[-1] - memory[1]) / 1024 if len(memory) > 2 else 0.0  # After one warm-up window
+
+    print(f"steps={steps} elapsed={elapsed:.1f}s stack_depth={sorted(depths)}")
+    print("median step latency per window (us): " + " ".join(f"{m:.0f}" for m in medians))
+    print("traced memory per window (KiB): " + " ".join(f"{m / 1024:.0f}" for m in memory))
+
+    failures = []
+    if max(depths) - min(depths) > 1:  # A screen may call one helper screen (e.g. show_tips)
+        failures.append(f"stack depth varies: {sorted(depths)}")
+    if growth > args.max_latency_growth:
+        failures.append(f"latency grew {growth:.2f}x")
+    if memory_growth > args.max_memory_growth_kb:
+        failures.append(f"memory grew {memory_growth:.0f} KiB")
+    print("FAIL: " + "; ".join(failures) if failures else "OK: stack, memory and latency stayed flat")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,37 +1,41 @@
+import argparse  # For the command line options
 import os  # For operating system operations like clearing screen
-import mysql.connector  # For MySQL database connectivity
 import time  # For adding delays and timing operations
 from datetime import datetime  # For handling date and time operations
+import sys  # For command line arguments
 import getpass  # For secure password input without displaying characters
-from tabulate import tabulate  # For creating formatted tables in console
-import re  # For regular expression operations (password validation)
-from hashlib import sha256  # For password hashing
-import keyboard  # For keyboard input detection
-
-# MySQL Database connection setup
-def get_db_connection():
-    return mysql.connector.connect(
-        host="localhost",  # Database server location
-        user="root",  # Database username
-        password="",  # Database password (empty in this case)
-        database="health_tracker"  # Name of the database to connect to
-    )
+from health_tracker import metrics  # For optional timers, query histograms and profiling
+from health_tracker.core import HealthTracker  # For login, registration, metrics and history without a terminal
+from health_tracker.doctors import SPECIALTIES, doctor_directory, page_of  # For the doctor directory
+from health_tracker.messages import OPEN_STATUSES  # For the doctors' inboxes
+from health_tracker.reports import HISTORY_COLUMNS, write_table  # For streaming history tables
+from health_tracker.storage import StorageError, get_backend  # For pooled MySQL / embedded SQLite storage
+from health_tracker.summaries import load_summary  # For per-user progress summaries
+
+# (header, width) of the doctors' inbox table
+INBOX_COLUMNS = [("ID", 6), ("Received", 19), ("Patient", 12), ("Type", 11), ("Status", 7), ("Message", 40)]
+
+# Database setup: the backend is chosen by the HEALTH_TRACKER_DB environment variable
+# (e.g. "mysql://root:@localhost/health_tracker" or "sqlite:///health_tracker.db")
+def get_db_backend():
+    return get_backend()  # Shared by every tracker session in this process
 
 def clear_screen():
     # Clear the terminal screen.
     os.system('cls' if os.name == 'nt' else 'clear')  # Use 'cls' for Windows, 'clear' for Unix/Linux
 
-class AdvancedHealthTracker:
+def key_pressed(key):
+    # keyboard is only imported by the interactive animations (it needs root on Linux)
+    import keyboard  # For keyboard input detection
+    return keyboard.is_pressed(key)
+
+class AdvancedHealthTracker(HealthTracker):
+    """Interactive menus on top of the non-interactive HealthTracker core."""
+
     def __init__(self):
-        # Initialize the tracker with necessary database connection.
-        self.db_connection = get_db_connection()  # Establish database connection
-        self.cursor = self.db_connection.cursor()  # Create database cursor for operations
-        self.username = None  # Store current user's username
-        self.display_welcome_message()  # Show welcome screen
-        self.initialize_health_tips()  # Set up health tips database
-        self.login_attempts=0   # Track failed login attempts
-        
-    
+        # Initialize the tracker with the shared storage backend (it connects on the first query).
+        super().__init__(get_db_backend())  # Database, session and health tips
+
     def display_welcome_message(self):
         # Display an enhanced interactive welcome message.
         clear_screen()  # Clear terminal for clean display
@@ -70,7 +74,7 @@ class AdvancedHealthTracker:
 
         # Displaying welcome message with typing effects
         for message in welcome_messages:
-            if keyboard.is_pressed("enter"): # Allow skipping animation
+            if key_pressed("enter"): # Allow skipping animation
                 break
             self.print_slowly(message, 0.03)  # Show message with typing effect
 
@@ -85,63 +89,6 @@ class AdvancedHealthTracker:
         clear_screen()
 
 
-    def initialize_health_tips(self):
-        # Initialize health tips database.
-        self.health_tips = {
-            "general": [  # General health advice
-                "Stay hydrated by drinking at least 8 glasses of water daily.",
-                "Aim for 7-9 hours of sleep each night.",
-                "Practice good posture throughout the day.",
-                "Take regular breaks from screen time.",
-                "Stay socially connected with friends and family."
-            ],
-            "nutrition": [  # Nutrition specific advice
-                "Include a variety of fruits and vegetables in your diet.",
-                "Choose whole grains over refined grains.",
-                "Limit processed foods and added sugars.",
-                "Eat protein-rich foods with each meal.",
-                "Practice mindful eating.",
-                "Plan your meals ahead."
-                "Include healthy fats in your diet, such as those from avocados, nuts, seeds, and olive oil."
-            ],
-            "exercise": [  # Exercise-related tips
-                "Aim for 30 minutes of moderate exercise daily.",
-                "Include both cardio and strength training.",
-                "Take regular walking breaks.",
-                "Try different types of physical activities.",
-                "Start with gentle exercises if you're new to working out.",
-                "Remember to stretch before and after exercise."
-            ],
-            "metrics": {  # Metric-specific health advice
-                "weight": [  # Weight-related tips
-                    "Maintain a healthy weight by balancing your calorie intake and expenditure.",
-                    "If you're overweight, aim for gradual weight loss with a balanced diet and exercise."
-                ],
-                "blood_pressure": [  # Blood pressure tips
-                    "Monitor your blood pressure regularly and aim for a healthy range.",
-                    "If you have high blood pressure, reduce salt intake and stay physically active."
-                ],
-                "steps": [  # step count tips
-                    "Aim for at least 10,000 steps daily to maintain a healthy lifestyle.",
-                    "Take breaks during long periods of sitting to improve circulation."
-                ]
-            }
-        }
-
-    def get_health_tips(self, category="general", user_metrics=None):
-      """ Get health tips by category, optionally based on your health metrics."""
-        if user_metrics:  # If specific metrics are provided(Return relevant metric-based tips)
-            # Provide tips based on the user's health metrics
-            if 'weight' in user_metrics:
-                return self.health_tips["metrics"]["weight"]
-            if 'blood_pressure' in user_metrics:
-                return self.health_tips["metrics"]["blood_pressure"]
-            if 'steps' in user_metrics:
-                return self.health_tips["metrics"]["steps"]
-        
-        # Default that general health tips if no metrics are available
-        return self.health_tips.get(category, self.health_tips["general"])  # Return general category tips if no specific metrics
-
     def show_tips(self, tips):
         """Display the health tips."""
         print()
@@ -149,7 +96,7 @@ class AdvancedHealthTracker:
             print(f"* {tip}")
             
         input("\nPress Enter to continue...")  # Wait for user acknowledgment
-        self.show_health_tips_menu()  # Return health tips menu
+        return "health_tips"  # Return health tips menu
 
     def show_health_tips_menu(self):
         """Show health tips menu."""
@@ -159,73 +106,47 @@ class AdvancedHealthTracker:
         print("1. General Tips")
         print("2. Nutrition Tips")
         print("3. Exercise Tips")
-        print("4. Back to Home")  # User can go back to home menu
+        print("4. Tips For You (based on your readings)")
+        print("5. Back to Home")  # User can go back to home menu
         choice = input("Select an option: ")
 
         # Handle user choice
         if choice == '1':
             tips = self.get_health_tips("general")
-            self.show_tips(tips)
+            return self.show_tips(tips)
         elif choice == '2':
             tips = self.get_health_tips("nutrition")
-            self.show_tips(tips)
+            return self.show_tips(tips)
         elif choice == '3':
             tips = self.get_health_tips("exercise")
-            self.show_tips(tips)
-        elif choice == '4' or choice == '0': 
+            return self.show_tips(tips)
+        elif choice == '4':
+            try:
+                tips = self.personal_tips()
+            except StorageError as err:
+                print(f"Could not load your progress: {err}")
+                tips = []
+            if not tips:
+                tips = ["Log your health metrics to get tips based on your readings."]
+            return self.show_tips(tips)
+        elif choice == '5' or choice == '0': 
             print("back to home ...")
-            time.sleep(1) # Handle '0' and '4' to go back to Home menu
-            self.show_home_menu()  # Go back to the home menu
+            time.sleep(1) # Handle '0' and '5' to go back to Home menu
+            return "home"  # Go back to the home menu
         else:
             print("Invalid choice. Please try again.")
-            self.show_health_tips_menu()
+            return "health_tips"
 
 
     def print_slowly(self, text, delay=0.05):
         """Print text with a typing effect."""
         for char in text:
-            if keyboard.is_pressed("enter"):  # Allow skipping
+            if key_pressed("enter"):  # Allow skipping
                 break
             print(char, end='', flush=True)
             time.sleep(delay)
         print()
 
-    def log_health_metrics(self, weight, blood_pressure, steps):
-        """Log user's health metrics in the MySQL database."""
-        try:
-            # Convert and validate inputs
-            weight = float(weight)
-            steps = int(steps)
-            
-            # Validate blood pressure format
-            if not blood_pressure.count('/') == 1:
-                return False, "Blood pressure must be in format '120/80'"
-
-            # Parse and validate blood pressure values
-            sys_bp, dia_bp = map(int, blood_pressure.split('/'))
-            if not (60 <= sys_bp <= 200 and 40 <= dia_bp <= 130):
-                return False, "Blood pressure values are out of normal range"
-
-            # Get user ID
-            self.cursor.execute("SELECT id FROM users WHERE username = %s", (self.username,))
-            user = self.cursor.fetchone()
-            if not user:
-                return False, "User not found!"
-            
-            user_id = user[0]
-
-            # Insert health metrics into database
-            self.cursor.execute(
-                "INSERT INTO health_data (user_id, weight, blood_pressure, steps) VALUES (%s, %s, %s, %s)",
-                (user_id, weight, blood_pressure, steps)
-            )
-            self.db_connection.commit()
-            return True, "Health metrics logged successfully!"
-        except ValueError:
-            return False, "Please enter valid numbers!"
-        except mysql.connector.Error as err:
-            return False, f"Error saving health data: {err}"
-        
     def log_health_metrics_menu(self):
         """Log health metrics."""
         weight = input("Enter your weight (kg): ")
@@ -238,86 +159,76 @@ class AdvancedHealthTracker:
         time.sleep(2)
         if success:
             input("\nPress Enter to return to the home menu.")
-            self.show_home_menu()
+            return "home"
         else:
             retry = input("Would you like to try again? (y/n): ")
             if retry.lower() == 'y':
-                self.log_health_metrics_menu()
+                return "log_metrics"
             else:
                 print("back to home ...")
                 time.sleep(1)
-                self.show_home_menu()
-
-    def display_health_history(self):
-        """Display user's health history from the database in a tabular format."""
-        # Get user ID
-        self.cursor.execute("SELECT id FROM users WHERE username = %s", (self.username,))
-        user = self.cursor.fetchone()
-        if not user:
-            return [],[], "User not found!"
-        
-        user_id = user[0]
-        # Retrieve health data ordered by date
-        self.cursor.execute(
-            "SELECT date_logged, weight, blood_pressure, steps FROM health_data WHERE user_id = %s ORDER BY date_logged DESC",
-            (user_id,)
-        )
-        health_data = self.cursor.fetchall()
-        if not health_data:
-            return [],[], "No health history found!"
-        
-        # Prepare data for tabulation (table display)
-        table_data = []
-        for data in health_data:
-            table_data.append([
-                data[0],  # Date
-                f"{data[1]} kg",  # Weight
-                data[2],  # Blood Pressure
-                data[3]  # Steps
-            ])
-        
-        # Create headers
-        headers = ["Date of Entry", "Weight", "Blood Pressure", "Steps"]
-        
-        return table_data, headers, "Health history !!!"
+                return "home"
 
-    def view_health_history(self):
-        """View health history."""
-        history, headers, message = self.display_health_history()
-        print(message)
-        
-        if history:
-            # Use tabulate to create a nicely formatted table
-            print(tabulate(history, headers=headers, tablefmt="grid"))
+    def ask_date_range(self):
+        """Ask for an optional date range to filter the health history."""
+        try:
+            start = input("From date (YYYY-MM-DD, leave blank for no limit): ").strip()
+            end = input("To date (YYYY-MM-DD, leave blank for no limit): ").strip()
+            start = datetime.strptime(start, "%Y-%m-%d") if start else None
+            end = datetime.strptime(end, "%Y-%m-%d") if end else None
+        except ValueError:
+            print("Invalid date. Please use the format YYYY-MM-DD.")
+            time.sleep(1)
+            return None
+        return start, end
 
-        input("\nPress Enter to continue...")
-        self.show_home_menu()
+    def view_health_history(self):
+        """View health history page by page."""
+        older_than = newer_than = None  # Key of the page we came from
+        start = end = None  # Optional date range filter
+        while True:
+            clear_screen()
+            try:
+                history, headers, message, page = self.display_health_history(older_than, newer_than, start, end)
+            except StorageError as err:
+                print(f"Could not load your health history: {err}")
+                input("\nPress Enter to return to the home menu.")
+                return "home"
+            print(message)
+            
+            if history:
+                # Write the grid table row by row, as the report exporter does
+                with metrics.timed("render_history"):
+                    write_table(sys.stdout, HISTORY_COLUMNS, history)
+
+            if start or end:
+                print(f"Filtered from {start.date() if start else 'the beginning'} to {end.date() if end else 'today'}")
+            print()
+            if page and page.has_older:
+                print("n. Next page (older entries)")
+            if page and page.has_newer:
+                print("p. Previous page (newer entries)")
+            print("f. Filter by date range")
+            if start or end:
+                print("c. Clear date filter")
+            choice = input("Select an option or press Enter to return to the home menu: ").strip().lower()
+
+            if choice == 'n' and page and page.has_older:
+                older_than, newer_than = page.last_key, None
+            elif choice == 'p' and page and page.has_newer:
+                older_than, newer_than = None, page.first_key
+            elif choice == 'f':
+                date_range = self.ask_date_range()
+                if date_range:
+                    start, end = date_range
+                    older_than = newer_than = None  # Start again from the newest entry
+            elif choice == 'c':
+                start = end = None
+                older_than = newer_than = None
+            else:
+                break
+        return "home"
     
-    def validate_password(self, password):
-        """We have to ensure that the password is strong."""
-        if len(password) < 8:
-            return False, "Password must be at least 8 characters long!"
-        if not re.search(r"\d", password):
-            return False, "Password must contain at least one number!"
-        if not re.search(r"[A-Za-z]", password):
-            return False, "Password must contain at least one letter!"
-        return True, "Password is strong."
-
-    def login_user(self, username, password):
-        """Log in a user by validating their credentials."""
-        self.cursor.execute("SELECT password FROM users WHERE username = %s", (username,))
-        user = self.cursor.fetchone()
-        if not user:
-            return False, "Username not found!, try again!..."
-
-        # Verify password
-        stored_password = user[0]
-        if sha256(password.encode()).hexdigest() != stored_password:
-            return False, "Incorrect password!, try again!..."
-        
-        self.username = username
-        return True, "Login successful!"
-
     def login(self):
         """Log in an existing user."""
         username = input("Enter your username: ")
@@ -325,51 +236,12 @@ class AdvancedHealthTracker:
         success, message = self.login_user(username, password)
         
         print(message)
-        time.sleep(2)
         if success:
-            self.show_home_menu()
-        else:
-            if self.login_attempts < 2:  # Allow 3 attempts total
-                print()
-                print(f"try again!!, you still have {3-(self.login_attempts + 1)} attempts:")
-                self.login_attempts = self.login_attempts + 1
-                self.login()
-            else:
-                print("\nSorry, you have failed to login many times, may be you're not official user!!!\n")
-                time.sleep(3)
-                self.print_slowly("Closing System ...",0.3)
-                time.sleep(1)
-                clear_screen()
-                exit()
-
-    def register_user(self, username, password, is_doctor=False, specialty=None, name=None, email=None, tel=None):
-        """Register a new user or doctor in the MySQL database with hashed password."""
-        if not username or len(username) < 3:
-            return False, "Username must be at least 3 characters long!"
-        
-        self.cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
-        if self.cursor.fetchone():
-            return False, "Username already exists!"
-        
-        valid_password, msg = self.validate_password(password)
-        if not valid_password:
-            return False, msg
-        
-        password_hash = sha256(password.encode()).hexdigest()
-
-        try:
-            if is_doctor:
-                # Insert doctor with specialty
-                self.cursor.execute("INSERT INTO doctors (name,specialty,email,phone,username, password) VALUES (%s, %s, %s,%s,%s,%s)", 
-                                    (name,specialty,email,tel,username, password_hash))
-            else:
-                # Insert general user
-                self.cursor.execute("INSERT INTO users (username, password) VALUES (%s, %s)", 
-                                    (username, password_hash))
-            self.db_connection.commit()
-            return True, "Registration successful!"
-        except mysql.connector.Error as err:
-            return False, f"Error saving user data: {err}"
+            time.sleep(2)
+            return "doctor_home" if self.is_doctor else "home"
+        # Back to the menu, so the user can register or exit; throttling only blocks further attempts
+        input("\nPress Enter to return to the menu...")
+        return "login_menu"
 
     def register(self):
         """Register a new user or doctor."""
@@ -393,16 +265,16 @@ class AdvancedHealthTracker:
             terminate = input("Registration complete. Do you want to login now? (y/n): ").lower()
             if not is_doctor and terminate == 'y':
                 time.sleep(1)
-                self.show_home_menu()
+                return "login"
             else:
-                self.show_login_menu()
+                return "login_menu"
         else:
             terminate = input("Registration failed. Do you want to try again? (y/n): ").lower()
             if terminate == 'n':
                 print("Registration cancelled. Returning to the main menu.")
-                self.show_login_menu()
+                return "login_menu"
             else:
-                self.register()
+                return "register"
 
     def show_login_menu(self):
         """Show login/register menu."""
@@ -414,130 +286,414 @@ class AdvancedHealthTracker:
         choice = input("Select an option: ")
 
         if choice == '1':
-            self.login()
+            return "login"
         elif choice == '2':
-            self.register()
+            return "register"
         elif choice == '3':
             print("You have chosen to exit. Goodbye!")
-            exit()
+            return None
         else:
             print("Invalid choice. Please try again.")
-            self.show_login_menu()
+            return "login_menu"
+
+    def show_progress(self):
+        """Print the user's progress from their stored summary (no history scan)."""
+        if not self.session:
+            return
+        try:
+            summary = load_summary(self.db, self.session.user_id)
+        except StorageError:
+            return
+        if not summary or not summary.readings:
+            print("No health metrics logged yet. Start by logging today's metrics!\n")
+            return
+
+        print(f"Latest entry ({summary.latest_logged:%Y-%m-%d}): {summary.latest_weight} kg, "
+              f"{summary.latest_systolic}/{summary.latest_diastolic}, {summary.latest_steps} steps")
+        for days in (7, 30):
+            count, weight, steps = summary.window(days)
+            if count:
+                print(f"Last {days} days: {count} entries, average {weight:.1f} kg, {steps:.0f} steps")
+        if summary.weight_mean is not None:
+            print(f"Overall: {summary.readings} entries, weight {summary.weight_min}-{summary.weight_max} kg "
+                  f"(average {summary.weight_mean:.1f}), best day {summary.steps_max} steps")
+        print(f"Logging streak: {summary.streak()} day(s), longest {summary.longest_streak}\n")
 
     def show_home_menu(self):
         """Display the home menu."""
         clear_screen()
         print("Welcome to Health Tracker!")
+        self.show_progress()  # Progress at a glance
         print("1. Health Tips")
         print("2. Log Health Metrics")
         print("3. View Health History")
         print("4. Contact a Doctor")
-        print("5. Logout")
-        print("6. Exit")
+        print("5. My Messages")
+        print("6. Logout")
+        print("7. Exit")
 
         choice = input("Select an option: ")
 
         if choice == '1':
-            self.show_health_tips_menu()
+            return "health_tips"
         elif choice == '2':
-            self.log_health_metrics_menu()
+            return "log_metrics"
         elif choice == '3':
-            self.view_health_history()
+            return "history"
         elif choice == '4':
-            self.contact_doctor()
+            return "contact_doctor"
         elif choice == '5':
-            self.logout()
+            return "messages"
         elif choice == '6':
+            return "logout"
+        elif choice == '7':
             print("You have chosen to exit. Goodbye!")
-            exit()
+            return None
         else:
             print("Invalid choice. Please try again.")
-            self.show_home_menu()
+            return "home"
     
     def show_specialties(self):
         """Display a list of specialties for doctors to choose from."""
-        specialties = [
-            "Cardiology",
-            "Dermatology",
-            "Neurology",
-            "Orthopedics",
-            "Pediatrics",
-            "Psychiatry",
-            "General Medicine"
-        ]
-        
         print("\nSpecialties available for Doctors:")
-        for idx, specialty in enumerate(specialties, start=1):
+        for idx, specialty in enumerate(SPECIALTIES, start=1):
             print(f"{idx}. {specialty}")
         
-        choice = int(input("\nSelect a specialty by number: "))
-        if 1 <= choice <= len(specialties):
-            return specialties[choice - 1]
-        else:
+        while True:
+            choice = input("\nSelect a specialty by number: ")
+            if choice.isdigit() and 1 <= int(choice) <= len(SPECIALTIES):
+                return SPECIALTIES[int(choice) - 1]
             print("Invalid choice. Please try again.")
-            return self.show_specialties()
 
     def contact_doctor(self):
         """Provide the user an option to contact specific doctors."""
-        # Fetch doctors with more detailed information
-        self.cursor.execute("SELECT id, name, specialty, email, phone FROM doctors")
-        doctors = self.cursor.fetchall()
-        
-        if not doctors:
-            print("No doctors are available at the moment.")
-            input("\nPress Enter to return to the home menu.")
-            self.show_home_menu()
-            return
-        
-        # Prepare data for tabulation
-        table_data = []
-        for doctor in doctors:
-            table_data.append([
-                doctor[0],  # ID
-                f"Dr. {doctor[1]}",  # Name
-                doctor[2],  # Specialty
-            ])
-        
-        # Headers for the table
-        headers = ["ID", "Doctor Name", "Specialty"]
-        
-        # Display doctors in a table format
-        print("\nAvailable Doctors:")
-        print(tabulate(table_data, headers=headers, tablefmt="grid"))
-        
+        directory = doctor_directory(self.db)  # Cached and indexed doctor list
+        specialty = None  # Active specialty filter
+        name_prefix = ""  # Active name search
+        page = 0
+
+        while True:
+            clear_screen()
+            try:
+                available = directory.all()
+                doctors = directory.search(name_prefix, specialty)
+            except StorageError as err:
+                print(f"Could not load the doctors: {err}")
+                input("\nPress Enter to return to the home menu.")
+                return "home"
+            if not available:
+                print("No doctors are available at the moment.")
+                input("\nPress Enter to return to the home menu.")
+                break
+
+            shown, pages = page_of(doctors, page)
+            page = min(page, pages - 1)
+
+            # Display one page of doctors in a table format
+            print("\nAvailable Doctors:")
+            if specialty or name_prefix:
+                print(f"Filtered by: {specialty or 'any specialty'}, name starting with '{name_prefix or '*'}'")
+            if shown:
+                with metrics.timed("render_doctors"):
+                    from tabulate import tabulate  # For creating formatted tables in console (loaded on first use)
+                    table_data = [[doctor.id, f"Dr. {doctor.name}", doctor.specialty] for doctor in shown]
+                    print(tabulate(table_data, headers=["ID", "Doctor Name", "Specialty"], tablefmt="grid"))
+            else:
+                print("No doctors match your search.")
+            print(f"Page {page + 1} of {pages} ({len(doctors)} doctors)")
+
+            print()
+            if page + 1 < pages:
+                print("n. Next page")
+            if page > 0:
+                print("p. Previous page")
+            print("s. Filter by specialty")
+            print("f. Find by name")
+            if specialty or name_prefix:
+                print("c. Clear filters")
+            print("b. Back to home")
+            choice = input("\nEnter the ID of the doctor you wish to contact, or an option: ").strip().lower()
+
+            if choice == 'n':
+                page = min(page + 1, pages - 1)
+            elif choice == 'p':
+                page = max(page - 1, 0)
+            elif choice == 's':
+                specialty = self.show_specialties()
+                page = 0
+            elif choice == 'f':
+                name_prefix = input("Enter the start of the doctor's name: ").strip()
+                page = 0
+            elif choice == 'c':
+                specialty, name_prefix, page = None, "", 0
+            elif choice in ('b', ''):
+                break
+            else:
+                try:
+                    doctor_id = int(choice)
+                except ValueError:
+                    print("Invalid input. Please enter a valid number.")
+                    time.sleep(1)
+                    continue
+
+                # Validate doctor ID
+                try:
+                    selected_doctor = directory.get(doctor_id)
+                except StorageError as err:
+                    print(f"Could not load the doctors: {err}")
+                    input("\nPress Enter to return to the home menu.")
+                    return "home"
+                if not selected_doctor:
+                    print("Invalid doctor ID. Please try again.")
+                    time.sleep(1)
+                    continue
+
+                # Display selected doctor's contact information
+                print("\nSelected Doctor's Contact Information:")
+                print(f"Name: Dr. {selected_doctor.name}")
+                print(f"Specialty: {selected_doctor.specialty}")
+                print(f"Email: {selected_doctor.email}")
+                print(f"Phone: {selected_doctor.phone}")
+                print("\nm. Send a message")
+                print("a. Request an appointment")
+                action = input("Select an option or press Enter to return to the home menu: ").strip().lower()
+                if action in ('m', 'a'):
+                    self.write_to_doctor(selected_doctor, appointment=action == 'a')
+                break
+
+        return "home"
+
+    def ask_datetime(self, prompt):
+        """Ask for a date and time; None when the input is invalid."""
         try:
-            # Prompt for doctor selection
-            doctor_id = int(input("\nEnter the ID of the doctor you wish to contact: "))
-            
-            # Validate doctor ID
-            selected_doctor = next((doc for doc in doctors if doc[0] == doctor_id), None)
-            
-            if not selected_doctor:
-                print("Invalid doctor ID. Please try again.")
-                self.contact_doctor()
-                return
-            
-            # Display selected doctor's contact information
-            print("\nSelected Doctor's Contact Information:")
-            print(f"Name: Dr. {selected_doctor[1]}")
-            print(f"Specialty: {selected_doctor[2]}")
-            print(f"Email: {selected_doctor[3]}")
-            print(f"Phone: {selected_doctor[4]}")
-        
+            return datetime.strptime(input(prompt).strip(), "%Y-%m-%d %H:%M")
         except ValueError:
-            print("Invalid input. Please enter a valid number.")
-            self.contact_doctor()
-        
+            print("Invalid date. Please use the format YYYY-MM-DD HH:MM.")
+            return None
+
+    def write_to_doctor(self, doctor, appointment=False):
+        """Send the selected doctor a message or an appointment request."""
+        appointment_at = None
+        if appointment:
+            appointment_at = self.ask_datetime("Preferred date and time (YYYY-MM-DD HH:MM): ")
+            if appointment_at is None:
+                input("\nPress Enter to return to the home menu.")
+                return
+        text = input(f"Your message to Dr. {doctor.name}: ")
+        print("Your latest health metrics will be attached so the doctor can see how you are doing.")
+        success, message = self.message_doctor(doctor.id, text, appointment_at)
+        print(message)
         input("\nPress Enter to return to the home menu.")
-        self.show_home_menu()
+
+    def show_messages(self):
+        """Show the messages the user sent to doctors, with their replies, page by page."""
+        before = None  # Key of the last message on the previous page
+        while True:
+            clear_screen()
+            try:
+                page = self.sent_messages(before)
+            except StorageError as err:
+                print(f"Could not load your messages: {err}")
+                input("\nPress Enter to return to the home menu.")
+                return "home"
+            if not page.rows:
+                print("You have not sent any messages yet. Use Contact a Doctor to write to one.")
+            for message in page.rows:
+                kind = "Appointment request" if message.kind == "appointment" else "Message"
+                print(f"\n{kind} to Dr. {message.doctor_name} on {message.created_at:%Y-%m-%d %H:%M} [{message.status}]")
+                print(f"  You: {message.body}")
+                if message.reply:
+                    print(f"  Dr. {message.doctor_name}: {message.reply}")
+                if message.appointment_at:
+                    print(f"  Appointment confirmed for {message.appointment_at:%Y-%m-%d %H:%M}")
+            print()
+            if page.has_more:
+                print("n. Older messages")
+            choice = input("Select an option or press Enter to return to the home menu: ").strip().lower()
+            if choice == 'n' and page.has_more:
+                before = page.last_key
+            else:
+                return "home"
+
+    def show_doctor_home_menu(self):
+        """Display the home menu of a logged-in doctor."""
+        clear_screen()
+        try:
+            doctor = self.get_doctor(self.session.user_id)
+        except StorageError as err:
+            print(f"Could not load your details: {err}")
+            input("\nPress Enter to try again.")
+            return "doctor_home"
+        print(f"Welcome, Dr. {doctor.name if doctor else self.username}!")
+        try:
+            unread, total = self.inbox_counts()  # Kept up to date with every message, no counting
+            print(f"Inbox: {unread} unread of {total} messages\n")
+        except StorageError:
+            print()
+        print("1. Inbox")
+        print("2. Closed messages")
+        print("3. Logout")
+        print("4. Exit")
+
+        choice = input("Select an option: ")
+        if choice == '1':
+            return "inbox"
+        elif choice == '2':
+            return "closed_messages"
+        elif choice == '3':
+            return "logout"
+        elif choice == '4':
+            print("You have chosen to exit. Goodbye!")
+            return None
+        else:
+            print("Invalid choice. Please try again.")
+            return "doctor_home"
+
+    def show_closed_messages(self):
+        return self.show_inbox(closed=True)
+
+    def show_inbox(self, closed=False):
+        """Show the doctor's inbox page by page; open a message to read, reply to or close it."""
+        statuses = ("closed",) if closed else OPEN_STATUSES
+        unread_only = False
+        before, previous = None, []  # Key of the current page and of the pages before it
+        while True:
+            clear_screen()
+            try:
+                page = self.inbox_page(("unread",) if unread_only else statuses, before)
+            except StorageError as err:
+                print(f"Could not load your inbox: {err}")
+                input("\nPress Enter to return to the home menu.")
+                return "doctor_home"
+            print("Closed messages" if closed else "Unread messages" if unread_only else "Inbox")
+            if page.rows:
+                with metrics.timed("render_inbox"):
+                    write_table(sys.stdout, INBOX_COLUMNS, (
+                        (message.id, message.created_at, message.username, message.kind, message.status,
+                         message.body if len(message.body) <= 40 else message.body[:37] + "...")
+                        for message in page.rows
+                    ))
+            else:
+                print("No messages.")
+
+            print()
+            if page.has_more:
+                print("n. Next page (older messages)")
+            if previous:
+                print("p. Previous page")
+            if not closed:
+                print("u. Show all messages" if unread_only else "u. Show unread messages only")
+            choice = input("Enter a message ID to open it, an option, or press Enter to return: ").strip().lower()
+
+            if choice == 'n' and page.has_more:
+                previous.append(before)
+                before = page.last_key
+            elif choice == 'p' and previous:
+                before = previous.pop()
+            elif choice == 'u' and not closed:
+                unread_only, before, previous = not unread_only, None, []
+            elif choice.isdigit():
+                self.show_message(int(choice))
+            else:
+                return "doctor_home"
+
+    def show_message(self, message_id):
+        """Show one message of the inbox with the patient's metrics, and let the doctor answer it."""
+        message = self.open_message(message_id)
+        if message is None:
+            print("Invalid message ID. Please try again.")
+            time.sleep(1)
+            return
+        clear_screen()
+        kind = "Appointment request" if message.kind == "appointment" else "Message"
+        print(f"{kind} from {message.username} on {message.created_at:%Y-%m-%d %H:%M} [{message.status}]")
+        if message.requested_at:
+            print(f"Preferred time: {message.requested_at:%Y-%m-%d %H:%M}")
+        print(f"\n{message.body}\n")
+        snapshot = message.snapshot
+        if snapshot:
+            latest = snapshot["latest"]
+            print(f"Latest entry ({latest['date_logged'][:10]}): {latest['weight']} kg, {latest['blood_pressure']}"
+                  f" ({latest.get('bp_category', 'unknown')}), {latest['steps']} steps")
+            for days in (7, 30):
+                window = snapshot.get(f"last_{days}_days")
+                if window:
+                    print(f"Last {days} days: {window['readings']} entries, average {window['weight']} kg, "
+                          f"{window['steps']} steps")
+            if snapshot["recent"]:
+                write_table(sys.stdout, HISTORY_COLUMNS, (
+                    (row["date_logged"], f"{row['weight']} kg", row["blood_pressure"], row["steps"])
+                    for row in snapshot["recent"]
+                ))
+        else:
+            print("No health metrics were logged before this message.")
+        if message.reply:
+            print(f"\nYour reply: {message.reply}")
+        if message.appointment_at:
+            print(f"Appointment confirmed for {message.appointment_at:%Y-%m-%d %H:%M}")
+
+        if message.status == "closed":
+            input("\nPress Enter to return to the inbox.")
+            return
+        print("\nr. Reply")
+        print("c. Close")
+        choice = input("Select an option or press Enter to return to the inbox: ").strip().lower()
+        if choice == 'r':
+            appointment_at = None
+            if message.kind == "appointment":
+                answer = input("Confirm an appointment time? (y/n): ").strip().lower()
+                if answer == 'y':
+                    appointment_at = self.ask_datetime("Appointment date and time (YYYY-MM-DD HH:MM): ")
+            success, result = self.reply_message(message.id, input("Your reply: "), appointment_at)
+            print(result)
+            time.sleep(1)
+        elif choice == 'c':
+            success, result = self.close_message(message.id)
+            print(result)
+            time.sleep(1)
 
     def logout(self):
         """Logout user and return to login/registration."""
-        self.username = None
+        self.logout_user()  # Forget the logged-in identity
         print("You have successfully logged out.")
         time.sleep(1)
-        self.show_login_menu()
+        return "login_menu"
+
+    # Navigation table: every screen returns the name of the next screen (None exits)
+    SCREENS = {
+        "login_menu": "show_login_menu",
+        "login": "login",
+        "register": "register",
+        "home": "show_home_menu",
+        "health_tips": "show_health_tips_menu",
+        "log_metrics": "log_health_metrics_menu",
+        "history": "view_health_history",
+        "contact_doctor": "contact_doctor",
+        "messages": "show_messages",
+        "doctor_home": "show_doctor_home_menu",
+        "inbox": "show_inbox",
+        "closed_messages": "show_closed_messages",
+        "logout": "logout",
+    }
+
+    def run(self, state="login_menu"):
+        """Run the menus as one dispatch loop, so the stack stays flat however long the session."""
+        screens = {name: getattr(self, method) for name, method in self.SCREENS.items()}
+        while state is not None:
+            state = screens[state]()
 
 if __name__ == "__main__":
+    if "--headless" in sys.argv[1:]:
+        # Scripted commands without menus, animations, sleeps or keyboard hooks
+        from health_tracker.headless import main
+        sys.exit(main([arg for arg in sys.argv[1:] if arg != "--headless"]))
+    parser = argparse.ArgumentParser(description="Community Health Tracker")
+    parser.add_argument("--metrics", help="collect timings and write them to this file (Prometheus text)")
+    parser.add_argument("--profile", help="save a cProfile capture of this session to this file")
+    args = parser.parse_args()
+    if args.metrics:
+        metrics.enable(args.metrics)
     tracker = AdvancedHealthTracker()
-    tracker.show_login_menu()
+    tracker.display_welcome_message()  # Show welcome screen; the database is first used at login
+    with metrics.profiled(args.profile):
+        tracker.run()
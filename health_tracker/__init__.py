@@ -0,0 +1 @@
+"""Supporting modules for the Community Health Tracker."""
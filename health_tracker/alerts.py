@@ -0,0 +1,198 @@
+"""Anomaly detection over incoming readings and the alerts doctors review.
+
+Every new reading is checked, in constant time, against:
+
+* blood pressure thresholds - a hypertensive crisis (180/120 or above) or
+  low blood pressure (below 90/60), whatever the user's history;
+* the user's own rolling baselines - exponentially weighted mean and
+  variance of weight and steps kept in their progress summary.  After
+  MIN_BASELINE readings, a weight more than Z_THRESHOLD standard deviations
+  from the baseline, or a step count that far below it, raises an alert.
+
+Alerts are written to the ``alerts`` table in the same transaction as the
+reading, tagged with the specialty that should look at them, and doctors
+page through them by specialty.  Readings logged before the detector
+existed are checked by the backfill, which splits users into id ranges and
+scans them in chunks on several worker processes::
+
+    python -m health_tracker.alerts backfill [--workers 4] [--db URL]
+    python -m health_tracker.alerts list --specialty Cardiology [--limit 20]
+"""
+import argparse
+import math
+import sys
+from collections import namedtuple
+
+CRISIS_SYSTOLIC, CRISIS_DIASTOLIC = 180, 120  # mmHg, hypertensive crisis at or above
+LOW_SYSTOLIC, LOW_DIASTOLIC = 90, 60  # mmHg, hypotension below
+Z_THRESHOLD = 3.0  # Standard deviations from the baseline that count as an anomaly
+MIN_BASELINE = 5  # Readings needed before the baselines are trusted
+MIN_STD = {"weight": 1.0, "steps": 1000.0}  # Floors, so very regular users don't alert on noise
+PAGE_SIZE = 20  # Alerts per page for doctors
+BACKFILL_CHUNK = 20000  # Readings read per query by the backfill
+
+# Specialty that reviews each kind of alert
+SPECIALTY = {
+    "bp_crisis": "Cardiology",
+    "bp_low": "Cardiology",
+    "weight_change": "General Medicine",
+    "steps_drop": "General Medicine",
+}
+
+Alert = namedtuple("Alert", ["kind", "severity", "specialty", "message", "value", "baseline", "zscore"])
+AlertRow = namedtuple("AlertRow", ["id", "user_id", "username", "kind", "severity", "message", "date_logged"])
+
+ALERT_COLUMNS = "user_id, reading_id, kind, severity, specialty, message, value, baseline, zscore, date_logged"
+
+
+def _zscore(value, mean, variance, metric):
+    return (value - mean) / max(math.sqrt(max(variance, 0.0)), MIN_STD[metric])
+
+
+def detect(summary, reading):
+    """Alerts for a Reading, judged against a UserSummary from before it (None: thresholds only)."""
+    alerts = []
+    systolic, diastolic = reading.systolic, reading.diastolic
+    if systolic is not None and diastolic is not None:
+        if systolic >= CRISIS_SYSTOLIC or diastolic >= CRISIS_DIASTOLIC:
+            alerts.append(Alert("bp_crisis", "critical", SPECIALTY["bp_crisis"],
+                                f"Hypertensive crisis: {systolic}/{diastolic} mmHg", systolic, None, None))
+        elif systolic < LOW_SYSTOLIC or diastolic < LOW_DIASTOLIC:
+            alerts.append(Alert("bp_low", "warning", SPECIALTY["bp_low"],
+                                f"Low blood pressure: {systolic}/{diastolic} mmHg", systolic, None, None))
+
+    if summary is None or summary.readings < MIN_BASELINE or summary.weight_ewma is None:
+        return alerts
+    # Older rows may hold NULL weight or steps (NaN readings); they have no value to judge
+    if reading.weight is not None:
+        z = _zscore(reading.weight, summary.weight_ewma, summary.weight_ewvar, "weight")
+        if abs(z) >= Z_THRESHOLD:
+            alerts.append(Alert("weight_change", "warning", SPECIALTY["weight_change"],
+                                f"Weight {reading.weight:g} kg is {z:+.1f} SD from the usual "
+                                f"{summary.weight_ewma:.1f} kg", reading.weight, summary.weight_ewma, z))
+    if reading.steps is None:
+        return alerts
+    z = _zscore(reading.steps, summary.steps_ewma, summary.steps_ewvar, "steps")
+    if z <= -Z_THRESHOLD:
+        alerts.append(Alert("steps_drop", "info", SPECIALTY["steps_drop"],
+                            f"Steps {reading.steps} are {z:+.1f} SD below the usual "
+                            f"{summary.steps_ewma:.0f}", reading.steps, summary.steps_ewma, z))
+    return alerts
+
+
+def _insert_sql(dialect):
+    # Re-checking a reading must not duplicate its alerts (unique reading_id, kind)
+    ignore = "INSERT IGNORE" if dialect == "mysql" else "INSERT OR IGNORE"
+    return f"{ignore} INTO alerts ({ALERT_COLUMNS}) VALUES ({', '.join(['%s'] * 10)})"
+
+
+def _alert_params(user_id, reading_id, date_logged, alert):
+    return (user_id, reading_id, alert.kind, alert.severity, alert.specialty, alert.message,
+            alert.value, alert.baseline, alert.zscore, date_logged)
+
+
+def save_alerts(tx, user_id, anomalies):
+    """Store (reading id, date_logged, Alert) tuples of one user."""
+    tx.executemany(_insert_sql(tx.dialect),
+                   [_alert_params(user_id, reading_id, date_logged, alert)
+                    for reading_id, date_logged, alert in anomalies])
+
+
+def alerts_for_specialty(db, specialty, before=None, page_size=PAGE_SIZE):
+    """One page of a specialty's alerts, newest first; before is the (date_logged, id) of the last row seen."""
+    where, params = "a.specialty = %s", [specialty]
+    if before is not None:
+        where += " AND (a.date_logged < %s OR (a.date_logged = %s AND a.id < %s))"
+        params += [before[0], before[0], before[1]]
+    rows = db.fetchall(
+        "SELECT a.id, a.user_id, u.username, a.kind, a.severity, a.message, a.date_logged "
+        "FROM alerts a JOIN users u ON u.id = a.user_id "
+        f"WHERE {where} ORDER BY a.date_logged DESC, a.id DESC LIMIT {int(page_size)}",
+        params,
+    )
+    return [AlertRow(*row) for row in rows]
+
+
+def backfill_range(backend, first_user, last_user, chunk=BACKFILL_CHUNK):
+    """Check every reading of users first_user..last_user oldest first; returns (readings, new alerts)."""
+    from health_tracker.summaries import UserSummary
+    from health_tracker.validation import Reading
+
+    key, summary = None, None
+    readings = found = 0
+    while True:
+        where, params = "user_id BETWEEN %s AND %s", [first_user, last_user]
+        if key is not None:
+            where += (" AND (user_id > %s OR (user_id = %s AND "
+                      "(date_logged > %s OR (date_logged = %s AND id > %s))))")
+            params += [key[0], key[0], key[1], key[1], key[2]]
+        rows = backend.fetchall(
+            "SELECT id, user_id, date_logged, weight, systolic, diastolic, steps FROM health_data "
+            f"WHERE {where} ORDER BY user_id, date_logged, id LIMIT {int(chunk)}",
+            params,
+        )
+        batch = []
+        for reading_id, user_id, date_logged, weight, systolic, diastolic, steps in rows:
+            if summary is None or summary.user_id != user_id:
+                summary = UserSummary(user_id)  # Rows come grouped by user
+            reading = Reading(weight, systolic, diastolic, steps)
+            batch.extend(_alert_params(user_id, reading_id, date_logged, alert)
+                         for alert in detect(summary, reading))
+            summary.add(reading_id, date_logged, weight, systolic, diastolic, steps)
+        if batch:
+            with backend.transaction() as tx:
+                found += tx.executemany(_insert_sql(tx.dialect), batch).rowcount  # Already stored ones are skipped
+        readings += len(rows)
+        if len(rows) < chunk:
+            return readings, found
+        key = (rows[-1][1], rows[-1][2], rows[-1][0])
+
+
+def _backfill_worker(task):
+    from health_tracker.storage import get_backend
+
+    url, first_user, last_user, chunk = task
+    return backfill_range(get_backend(url), first_user, last_user, chunk)
+
+
+def backfill(url, workers=None, chunk=BACKFILL_CHUNK):
+    """Check all existing readings on several processes; returns (readings, new alerts)."""
+    from health_tracker.storage import get_backend
+    from health_tracker.workers import run_tasks, user_ranges, worker_count
+
+    workers = worker_count(workers)
+    first_user, last_user = get_backend(url).fetchone("SELECT MIN(user_id), MAX(user_id) FROM health_data")
+    if first_user is None:
+        return 0, 0
+    tasks = [(url, lo, hi, chunk) for lo, hi in user_ranges(first_user, last_user, workers)]
+    return tuple(map(sum, zip(*run_tasks(_backfill_worker, tasks, workers))))
+
+
+def main(argv=None):
+    from tabulate import tabulate
+
+    from health_tracker.storage import database_url, get_backend
+
+    parser = argparse.ArgumentParser(description="Backfill or list health alerts.")
+    parser.add_argument("--db", help="database URL (default: HEALTH_TRACKER_DB)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("backfill", help="check readings logged before alerts existed")
+    run.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    run.add_argument("--chunk", type=int, default=BACKFILL_CHUNK, help="readings per query")
+    show = commands.add_parser("list", help="newest alerts of a specialty")
+    show.add_argument("--specialty", required=True)
+    show.add_argument("--limit", type=int, default=PAGE_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.command == "backfill":
+        readings, found = backfill(database_url(args.db), args.workers, args.chunk)
+        print(f"Checked {readings} readings, found {found} alerts.")
+        return 0
+    rows = alerts_for_specialty(get_backend(args.db), args.specialty, page_size=args.limit)
+    print(tabulate([(row.date_logged, row.username, row.severity, row.message) for row in rows],
+                   headers=["Date", "Patient", "Severity", "Alert"], tablefmt="grid"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+"""Population analytics over health_data using NumPy.
+
+Readings are loaded in column blocks (one array per column, read in primary
+key order a block at a time) and every statistic is computed with grouped
+array operations (bincount, cumulative sums, percentiles) rather than Python
+loops over fetched tuples:
+
+* daily population means of weight and steps with rolling 7/30-day averages
+* blood pressure category counts (normal / elevated / stage 1 / stage 2)
+* percentile bands of the per-user averages across all users
+
+Blocks of the columnar archive (health_tracker.archive) are read straight
+from their memory-mapped files before the live table; live rows that are
+also archived (an interrupted archive run) are skipped.
+
+There is no community column in the schema, so the population is everyone in
+the database the tracker is connected to (one database per community).
+
+Usage::
+
+    python -m health_tracker.analytics [--db URL] [--start 2024-01-01] [--end 2024-12-31]
+"""
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np  # Optional dependency, only needed for analytics
+
+from health_tracker.archive import (
+    COLUMNS as ARCHIVE_COLUMNS, MISSING as ARCHIVE_MISSING, configured_archive, to_seconds,
+)
+from health_tracker.history import date_range_filter
+from health_tracker.validation import BP_CATEGORIES
+
+BLOCK_SIZE = 100000  # Rows fetched per column block
+ROLLING_WINDOWS = (7, 30)  # Days
+PERCENTILES = (5, 25, 50, 75, 95)
+
+SELECT_COLUMNS = "id, user_id, date_logged, weight, systolic, diastolic, steps"
+
+
+class HealthColumns:
+    """health_data readings as parallel NumPy arrays (missing values are NaN)."""
+
+    __slots__ = ("user_id", "day", "weight", "systolic", "diastolic", "steps")
+
+    def __init__(self, user_id, day, weight, systolic, diastolic, steps):
+        self.user_id = user_id  # int32
+        self.day = day  # int32, days since 1970-01-01
+        self.weight = weight  # float32, kg
+        self.systolic = systolic  # float32, mmHg
+        self.diastolic = diastolic  # float32, mmHg
+        self.steps = steps  # float32
+
+    def __len__(self):
+        return len(self.user_id)
+
+    @classmethod
+    def empty(cls):
+        return cls(*(np.empty(0, dtype) for dtype in (np.int32, np.int32) + (np.float32,) * 4))
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a block from ``SELECT_COLUMNS`` tuples."""
+        _, user_id, date_logged, weight, systolic, diastolic, steps = zip(*rows)
+        days = np.array(date_logged, dtype="datetime64[s]").astype("datetime64[D]").astype(np.int32)
+        return cls(
+            np.array(user_id, dtype=np.int32),
+            days,
+            np.array(weight, dtype=np.float32),  # None becomes NaN
+            np.array(systolic, dtype=np.float32),
+            np.array(diastolic, dtype=np.float32),
+            np.array(steps, dtype=np.float32),
+        )
+
+    @classmethod
+    def from_archive(cls, block, start=None, end=None):
+        """Build a block from an archive block's mapped columns, limited to [start, end)."""
+        column = {name: np.frombuffer(block.buffer(name), np.dtype(code)) for name, code in ARCHIVE_COLUMNS.items()}
+        logged = column["logged"]
+        rows = slice(None)
+        if start is not None or end is not None:
+            keep = np.ones(len(logged), bool)
+            if start is not None:
+                keep &= logged >= to_seconds(start)
+            if end is not None:
+                keep &= logged < to_seconds(end)
+            rows = np.flatnonzero(keep)
+
+        def measurement(name):
+            values = column[name][rows].astype(np.float32)
+            values[values == ARCHIVE_MISSING] = np.nan
+            return values
+
+        return cls(
+            column["user_id"][rows],  # Zero-copy view when the whole block is in range
+            (logged[rows] // 86400).astype(np.int32),
+            column["weight"][rows].astype(np.float32),
+            measurement("systolic"),
+            measurement("diastolic"),
+            measurement("steps"),
+        )
+
+    def subset(self, rows):
+        """A block of the selected rows (index array or boolean mask)."""
+        return type(self)(*(getattr(self, name)[rows] for name in self.__slots__))
+
+    @classmethod
+    def concat(cls, blocks):
+        blocks = list(blocks)
+        if not blocks:
+            return cls.empty()
+        return cls(*(np.concatenate([getattr(block, name) for block in blocks]) for name in cls.__slots__))
+
+
+def iter_archive_blocks(archive, start=None, end=None):
+    """Yield a HealthColumns per archive block with readings in the date range."""
+    end = end + timedelta(days=1) if end is not None else None  # end is an inclusive day
+    after = to_seconds(start) if start is not None else None
+    before = to_seconds(end) if end is not None else None
+    for block in archive.blocks_between(after, before):
+        # Blocks entirely inside the range are used without a filtering copy
+        inside = (after is None or block.min_logged >= after) and (before is None or block.max_logged < before)
+        yield HealthColumns.from_archive(block, *((None, None) if inside else (start, end)))
+
+
+def archived_mask(blocks, ids, user_ids, days):
+    """True for live rows whose id is also in one of the archive blocks."""
+    mask = np.zeros(len(ids), bool)
+    if not blocks:
+        return mask
+    # Archived rows are older than every live row except those of an interrupted run
+    old = np.flatnonzero(days <= max(block.max_logged for block in blocks) // 86400)
+    for block in blocks:
+        if not len(old):
+            break
+        near = old[(user_ids[old] >= block.user_lo) & (user_ids[old] <= block.user_hi)
+                   & (ids[old] >= block.min_id) & (ids[old] <= block.max_id)]
+        if len(near):
+            mask[near] |= np.isin(ids[near], np.frombuffer(block.buffer("id"), np.int64))
+    return mask
+
+
+def iter_column_blocks(backend, start=None, end=None, block_size=BLOCK_SIZE):
+    """Yield HealthColumns blocks of at most block_size readings, archived blocks first, then in id order."""
+    archive = configured_archive()
+    blocks = archive.refresh() if archive is not None else []
+    if archive is not None:
+        yield from iter_archive_blocks(archive, start, end)
+    last_id = 0
+    while True:
+        clauses, params = date_range_filter(start, end)
+        clauses.insert(0, "id > %s")
+        params.insert(0, last_id)
+        rows = backend.fetchall(
+            f"SELECT {SELECT_COLUMNS} FROM health_data WHERE {' AND '.join(clauses)} "
+            f"ORDER BY id LIMIT {int(block_size)}",
+            params,
+        )
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        cols = HealthColumns.from_rows(rows)
+        if blocks:
+            # Counted from the archive already, like history and summaries do
+            ids = np.fromiter((row[0] for row in rows), np.int64, len(rows))
+            archived = archived_mask(blocks, ids, cols.user_id, cols.day)
+            if archived.any():
+                cols = cols.subset(~archived)
+        yield cols
+        if len(rows) < block_size:
+            return
+
+
+def load_columns(backend, start=None, end=None, block_size=BLOCK_SIZE):
+    """Load every reading in the date range into one HealthColumns."""
+    return HealthColumns.concat(iter_column_blocks(backend, start, end, block_size))
+
+
+def _grouped_sum(groups, values, size):
+    # Sum and count of the non-missing values per group
+    ok = ~np.isnan(values)
+    sums = np.bincount(groups[ok], weights=values[ok], minlength=size)
+    counts = np.bincount(groups[ok], minlength=size)
+    return sums, counts
+
+
+def _divide(sums, counts):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def rolling_mean(sums, counts, window):
+    """Mean over the trailing window of groups, from per-group sums and counts."""
+    total = np.concatenate(([0.0], np.cumsum(sums)))
+    number = np.concatenate(([0], np.cumsum(counts)))
+    hi = np.arange(1, len(sums) + 1)
+    lo = np.maximum(hi - window, 0)
+    return _divide(total[hi] - total[lo], number[hi] - number[lo])
+
+
+def daily_trends(cols, windows=ROLLING_WINDOWS):
+    """Population daily means of weight and steps, with rolling window averages.
+
+    Returns a dict of equally long arrays keyed by ``day``, ``readings``,
+    ``weight``, ``steps`` and ``weight_<n>d`` / ``steps_<n>d`` per window.
+    """
+    if not len(cols):
+        return {"day": np.empty(0, "datetime64[D]"), "readings": np.empty(0, np.int64)}
+    first = int(cols.day.min())
+    index = cols.day - first  # Day number relative to the first reading
+    size = int(index.max()) + 1
+
+    trends = {
+        "day": np.arange(first, first + size).astype("datetime64[D]"),
+        "readings": np.bincount(index, minlength=size),
+    }
+    for name in ("weight", "steps"):
+        sums, counts = _grouped_sum(index, getattr(cols, name), size)
+        trends[name] = _divide(sums, counts)
+        for window in windows:
+            trends[f"{name}_{window}d"] = rolling_mean(sums, counts, window)
+    return trends
+
+
+def bp_category_codes(systolic, diastolic):
+    """Vectorised validation.blood_pressure_category: index into BP_CATEGORIES (-1 if missing)."""
+    codes = np.select(
+        [(systolic >= 140) | (diastolic >= 90), (systolic >= 130) | (diastolic >= 80), systolic >= 120],
+        [3, 2, 1],
+        default=0,
+    )
+    return np.where(np.isnan(systolic) | np.isnan(diastolic), -1, codes)
+
+
+def bp_category_counts(cols):
+    """Number of readings in each blood pressure category."""
+    codes = bp_category_codes(cols.systolic, cols.diastolic)
+    counts = np.bincount(codes[codes >= 0], minlength=len(BP_CATEGORIES))
+    return dict(zip(BP_CATEGORIES, counts.tolist()))
+
+
+def per_user_means(cols, metric):
+    """Return (user ids, mean of metric per user) for users with at least one value."""
+    # User ids are dense auto-increment keys, so they index the bins directly (no sort)
+    size = int(cols.user_id.max()) + 1 if len(cols) else 0
+    sums, counts = _grouped_sum(cols.user_id, getattr(cols, metric), size)
+    users = np.flatnonzero(counts)
+    return users, sums[users] / counts[users]
+
+
+def percentile_bands(cols, metrics=("weight", "steps", "systolic", "diastolic"), percentiles=PERCENTILES):
+    """Percentiles of the per-user averages, keyed by metric."""
+    bands = {}
+    for metric in metrics:
+        _, means = per_user_means(cols, metric)
+        bands[metric] = np.percentile(means, percentiles) if len(means) else np.full(len(percentiles), np.nan)
+    return bands
+
+
+def population_report(cols):
+    """All population statistics for one set of readings."""
+    return {
+        "readings": len(cols),
+        "users": int(np.count_nonzero(np.bincount(cols.user_id))) if len(cols) else 0,
+        "trends": daily_trends(cols),
+        "bp_categories": bp_category_counts(cols),
+        "percentiles": percentile_bands(cols),
+    }
+
+
+def main(argv=None):
+    from tabulate import tabulate
+
+    from health_tracker.storage import get_backend
+
+    parser = argparse.ArgumentParser(description="Population health statistics.")
+    parser.add_argument("--db", help="database URL (default: HEALTH_TRACKER_DB)")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="first day (YYYY-MM-DD)")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="last day (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=14, help="days of trend to print")
+    args = parser.parse_args(argv)
+
+    report = population_report(load_columns(get_backend(args.db), args.start, args.end))
+    print(f"{report['readings']} readings from {report['users']} users\n")
+
+    trends = report["trends"]
+    recent = slice(-args.days, None)
+    print(tabulate(
+        zip(trends["day"][recent].astype(str), trends["readings"][recent],
+            *(trends[f"{name}_{window}d"][recent] for name in ("weight", "steps") for window in ROLLING_WINDOWS)),
+        headers=["Day", "Readings"] + [f"{name.title()} {window}d avg" for name in ("weight", "steps")
+                                       for window in ROLLING_WINDOWS],
+        tablefmt="grid", floatfmt=".1f",
+    ))
+    print("\nBlood pressure categories:")
+    print(tabulate(report["bp_categories"].items(), headers=["Category", "Readings"], tablefmt="grid"))
+    print("\nPer-user averages:")
+    print(tabulate(
+        ([metric, *values] for metric, values in report["percentiles"].items()),
+        headers=["Metric"] + [f"p{p}" for p in PERCENTILES], tablefmt="grid", floatfmt=".1f",
+    ))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,375 @@
+"""Columnar archive of cold health history.
+
+Readings older than ARCHIVE_AGE_DAYS (rounded down to the start of a month)
+are moved out of health_data into archive blocks, one per range of
+USER_RANGE user ids and calendar month::
+
+    <root>/index.json
+    <root>/users-000001-001000/2023-04.1/id.q
+                                         user_id.i
+                                         logged.q      (seconds since 1970-01-01)
+                                         ...
+
+Each column is a raw array of fixed-width native values whose file suffix
+is its ``array`` typecode, with rows sorted by (user_id, date_logged, id).
+Files are memory-mapped and read through typed memoryviews, so a lookup
+bisects straight into the mapped pages and copies nothing; analytics wraps
+the same buffers with numpy.frombuffer.  The columns are not compressed,
+which is what keeps them mappable; narrow types (int16 blood pressure,
+int32 user ids and steps) keep them small.  index.json lists every block
+with its user id range, row count and min/max date_logged and id, so
+readers skip blocks that cannot match.
+
+With HEALTH_TRACKER_ARCHIVE pointing at the archive directory, history
+pages, summary rebuilds and population analytics read archived rows
+together with the live table.  A run writes the blocks and replaces the
+index before deleting the rows it moved; readers ignore archived ids that
+are still in health_data, and running the archiver again finishes an
+interrupted run::
+
+    python -m health_tracker.archive run [--older-than-days 365] [--dir DIR] [--db URL]
+    python -m health_tracker.archive info [--dir DIR]
+"""
+import argparse
+import json
+import mmap
+import os
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+ARCHIVE_AGE_DAYS = 365  # Readings at least this old (from the start of that month) are archived
+USER_RANGE = 1000  # User ids per archive directory
+ARCHIVE_CHUNK = 20000  # Rows read per query while archiving
+INDEX_FILE = "index.json"
+INDEX_VERSION = 1
+MISSING = -1  # Stored for a missing blood pressure or step count
+
+# Column name -> array typecode (file suffix)
+COLUMNS = {
+    "id": "q",
+    "user_id": "i",
+    "logged": "q",
+    "weight": "d",
+    "systolic": "h",
+    "diastolic": "h",
+    "steps": "i",
+}
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_seconds(value):
+    """Seconds since 1970-01-01 of a naive datetime (or date, taken at midnight)."""
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    return int((value - EPOCH).total_seconds())
+
+
+def from_seconds(seconds):
+    return EPOCH + timedelta(seconds=seconds)
+
+
+def month_start(day):
+    return datetime(day.year, day.month, 1)
+
+
+class Block:
+    """One archive block: memory-mapped columns of one user range and month."""
+
+    def __init__(self, root, meta):
+        self.meta = meta
+        self.path = os.path.join(root, meta["path"])
+        self._columns = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # user_lo, user_hi, rows, min_logged, ... straight from the index entry
+        try:
+            return self.meta[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def buffer(self, name):
+        """The read-only mapped bytes of a column."""
+        return self._mapped()[name][0]
+
+    def column(self, name):
+        """A typed memoryview over a column (no copy)."""
+        return self._mapped()[name][1]
+
+    def _mapped(self):
+        with self._lock:
+            if self._columns is None:
+                columns = {}
+                for name, code in COLUMNS.items():
+                    with open(os.path.join(self.path, f"{name}.{code}"), "rb") as handle:
+                        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+                    columns[name] = (mapped, memoryview(mapped).cast(code))
+                self._columns = columns
+            return self._columns
+
+    def user_slice(self, user_id):
+        """(first, end) row positions of a user's rows."""
+        user_ids = self.column("user_id")
+        return bisect_left(user_ids, user_id), bisect_left(user_ids, user_id + 1)
+
+
+def _position(logged, ids, key, lo, hi, inclusive):
+    # First row in [lo, hi) whose (logged, id) is >= key (> key when not inclusive)
+    seconds, key_id = key
+    i = bisect_left(logged, seconds, lo, hi)
+    while i < hi and logged[i] == seconds and (ids[i] < key_id or (not inclusive and ids[i] == key_id)):
+        i += 1
+    return i
+
+
+class Archive:
+    """Reader of an archive directory; reloads the index when another process rewrites it."""
+
+    def __init__(self, root):
+        self.root = root
+        self.blocks = []
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        path = os.path.join(self.root, INDEX_FILE)
+        try:
+            stamp = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            stamp = None
+        with self._lock:
+            if stamp == self._stamp:
+                return self.blocks
+            opened = {block.meta["path"]: block for block in self.blocks}
+            blocks = []
+            for meta in load_index(self.root)["blocks"]:
+                block = opened.get(meta["path"])
+                blocks.append(block if block is not None and block.meta == meta else Block(self.root, meta))
+            blocks.sort(key=lambda block: (block.min_logged, block.user_lo))
+            self.blocks, self._stamp = blocks, stamp
+            return blocks
+
+    def blocks_between(self, after=None, before=None, user_id=None):
+        """Blocks that may hold rows logged in [after, before) (seconds), optionally of one user."""
+        return [
+            block for block in self.refresh()
+            if (user_id is None or block.user_lo <= user_id <= block.user_hi)
+            and (after is None or block.max_logged >= after)
+            and (before is None or block.min_logged < before)
+        ]
+
+    def user_rows(self, user_id, after=None, before=None, descending=False):
+        """Yield (id, date_logged, weight, systolic, diastolic, steps) of a user.
+
+        after and before are exclusive (datetime, id) keys; rows come oldest
+        first, or newest first when descending.
+        """
+        after = (to_seconds(after[0]), after[1]) if after is not None else None
+        before = (to_seconds(before[0]), before[1]) if before is not None else None
+        blocks = self.blocks_between(after and after[0], before and before[0] + 1, user_id)
+        for block in reversed(blocks) if descending else blocks:
+            first, end = block.user_slice(user_id)
+            if first == end:
+                continue
+            logged, ids = block.column("logged"), block.column("id")
+            if after is not None:
+                first = _position(logged, ids, after, first, end, inclusive=False)
+            if before is not None:
+                end = _position(logged, ids, before, first, end, inclusive=True)
+            weight, steps = block.column("weight"), block.column("steps")
+            systolic, diastolic = block.column("systolic"), block.column("diastolic")
+            for i in range(end - 1, first - 1, -1) if descending else range(first, end):
+                yield (ids[i], from_seconds(logged[i]), weight[i] if weight[i] == weight[i] else None,  # NaN: missing
+                       systolic[i] if systolic[i] != MISSING else None,
+                       diastolic[i] if diastolic[i] != MISSING else None,
+                       steps[i] if steps[i] != MISSING else None)
+
+
+def load_index(root):
+    try:
+        with open(os.path.join(root, INDEX_FILE), encoding="utf-8") as handle:
+            index = json.load(handle)
+    except FileNotFoundError:
+        return {"version": INDEX_VERSION, "byteorder": sys.byteorder, "user_range": USER_RANGE, "blocks": []}
+    if index.get("byteorder") != sys.byteorder:
+        raise ValueError(f"Archive {root} was written on a {index.get('byteorder')}-endian machine")
+    return index
+
+
+def save_index(root, index):
+    temporary = os.path.join(root, INDEX_FILE + ".tmp")
+    with open(temporary, "w", encoding="utf-8") as handle:
+        json.dump(index, handle, indent=1)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temporary, os.path.join(root, INDEX_FILE))  # Readers see the old or the new index, never half
+
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def archive_at(root):
+    """Return the process-wide Archive reader for a directory."""
+    root = os.path.abspath(root)
+    with _archives_lock:
+        archive = _archives.get(root)
+        if archive is None:
+            archive = _archives[root] = Archive(root)
+        return archive
+
+
+def configured_archive():
+    """The Archive named by HEALTH_TRACKER_ARCHIVE, or None when archiving is off."""
+    root = os.environ.get("HEALTH_TRACKER_ARCHIVE")
+    return archive_at(root) if root else None
+
+
+def _empty_columns():
+    return {name: array(code) for name, code in COLUMNS.items()}
+
+
+def _append(columns, row):
+    reading_id, user_id, date_logged, weight, systolic, diastolic, steps = row
+    columns["id"].append(reading_id)
+    columns["user_id"].append(user_id)
+    columns["logged"].append(to_seconds(date_logged))
+    columns["weight"].append(float("nan") if weight is None else weight)
+    columns["systolic"].append(MISSING if systolic is None else systolic)
+    columns["diastolic"].append(MISSING if diastolic is None else diastolic)
+    columns["steps"].append(MISSING if steps is None else steps)
+
+
+def _merge(existing, columns):
+    # Combine with the rows already archived for this block, sorted and without duplicate ids
+    merged = _empty_columns()
+    for name in COLUMNS:
+        merged[name].frombytes(existing.buffer(name))
+        merged[name].extend(columns[name])
+    keys = {}
+    for i, reading_id in enumerate(merged["id"]):
+        keys[reading_id] = (merged["user_id"][i], merged["logged"][i], reading_id, i)
+    order = [key[3] for key in sorted(keys.values())]
+    return {name: array(COLUMNS[name], (values[i] for i in order)) for name, values in merged.items()}
+
+
+def write_block(root, index, user_lo, user_hi, month, columns):
+    """Write (or extend) the block of a user range and month, and record it in index."""
+    blocks = index["blocks"]
+    directory = f"users-{user_lo:06d}-{user_hi:06d}"
+    old = next((meta for meta in blocks if meta["user_lo"] == user_lo and meta["month"] == month), None)
+    if old is not None:
+        columns = _merge(Block(root, old), columns)
+    generation = old["generation"] + 1 if old else 1
+    path = f"{directory}/{month}.{generation}"  # A new directory, so mapped readers keep the old one
+    full_path = os.path.join(root, path)
+    os.makedirs(full_path, exist_ok=True)
+    for name, code in COLUMNS.items():
+        with open(os.path.join(full_path, f"{name}.{code}"), "wb") as handle:
+            columns[name].tofile(handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    meta = {
+        "path": path, "user_lo": user_lo, "user_hi": user_hi, "month": month, "generation": generation,
+        "rows": len(columns["id"]),
+        "min_logged": min(columns["logged"]), "max_logged": max(columns["logged"]),
+        "min_id": min(columns["id"]), "max_id": max(columns["id"]),
+    }
+    if old is not None:
+        blocks.remove(old)
+    blocks.append(meta)
+    return old
+
+
+def archive_readings(backend, root, older_than_days=ARCHIVE_AGE_DAYS, now=None, chunk=ARCHIVE_CHUNK):
+    """Move readings logged before the start of the month older_than_days ago; returns the count."""
+    import shutil  # Only needed to drop replaced blocks
+
+    cutoff = month_start((now or datetime.now()) - timedelta(days=older_than_days))
+    # Rows inserted while we run get higher ids; only rows up to this one are moved
+    first_user, last_user, max_id = backend.fetchone(
+        "SELECT MIN(user_id), MAX(user_id), MAX(id) FROM health_data WHERE date_logged < %s", (cutoff,))
+    if max_id is None:
+        return 0
+    os.makedirs(root, exist_ok=True)
+    index = load_index(root)
+    moved = 0
+    for user_lo in range((first_user - 1) // USER_RANGE * USER_RANGE + 1, last_user + 1, USER_RANGE):
+        user_hi = user_lo + USER_RANGE - 1
+        months, key, count = {}, None, 0
+        while True:
+            where = "user_id BETWEEN %s AND %s AND date_logged < %s AND id <= %s"
+            params = [user_lo, user_hi, cutoff, max_id]
+            if key is not None:
+                where += (" AND (user_id > %s OR (user_id = %s AND "
+                          "(date_logged > %s OR (date_logged = %s AND id > %s))))")
+                params += [key[0], key[0], key[1], key[1], key[2]]
+            rows = backend.fetchall(
+                "SELECT id, user_id, date_logged, weight, systolic, diastolic, steps FROM health_data "
+                f"WHERE {where} ORDER BY user_id, date_logged, id LIMIT {int(chunk)}",
+                params,
+            )
+            for row in rows:
+                month = row[2].strftime("%Y-%m")
+                if month not in months:
+                    months[month] = _empty_columns()
+                _append(months[month], row)
+            count += len(rows)
+            if len(rows) < chunk:
+                break
+            key = (rows[-1][1], rows[-1][2], rows[-1][0])
+        if not count:
+            continue
+
+        replaced = [write_block(root, index, user_lo, user_hi, month, columns)
+                    for month, columns in sorted(months.items())]
+        save_index(root, index)
+        for old in replaced:
+            if old is not None:
+                shutil.rmtree(os.path.join(root, old["path"]), ignore_errors=True)
+        with backend.transaction() as tx:
+            tx.execute("DELETE FROM health_data WHERE user_id BETWEEN %s AND %s AND date_logged < %s AND id <= %s",
+                       (user_lo, user_hi, cutoff, max_id))
+        moved += count
+    return moved
+
+
+def main(argv=None):
+    from health_tracker.storage import get_backend
+
+    parser = argparse.ArgumentParser(description="Move cold health history into the columnar archive.")
+    parser.add_argument("--dir", default=os.environ.get("HEALTH_TRACKER_ARCHIVE"),
+                        help="archive directory (default: HEALTH_TRACKER_ARCHIVE)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="archive old readings")
+    run.add_argument("--older-than-days", type=int, default=ARCHIVE_AGE_DAYS)
+    run.add_argument("--db", help="database URL (default: HEALTH_TRACKER_DB)")
+    commands.add_parser("info", help="describe the archive")
+    args = parser.parse_args(argv)
+    if not args.dir:
+        parser.error("no archive directory: pass --dir or set HEALTH_TRACKER_ARCHIVE")
+
+    if args.command == "run":
+        moved = archive_readings(get_backend(args.db), args.dir, args.older_than_days)
+        print(f"Archived {moved} readings to {args.dir}.")
+        return 0
+    blocks = load_index(args.dir)["blocks"]
+    if not blocks:
+        print("The archive is empty.")
+        return 0
+    size = sum(os.path.getsize(os.path.join(args.dir, meta["path"], f"{name}.{code}"))
+               for meta in blocks for name, code in COLUMNS.items())
+    first = from_seconds(min(meta["min_logged"] for meta in blocks))
+    last = from_seconds(max(meta["max_logged"] for meta in blocks))
+    print(f"{sum(meta['rows'] for meta in blocks)} readings in {len(blocks)} blocks ({size / 2 ** 20:.1f} MiB), "
+          f"logged {first.date()} to {last.date()}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""Bulk import of historical health metrics from CSV or JSON Lines files.
+
+Each input row needs ``username``, ``weight``, ``blood_pressure`` and ``steps``;
+``date_logged`` (ISO format, e.g. ``2024-03-01 08:30:00``) is optional and
+defaults to the import time.  Rows are checked with the same rules as the
+interactive menu, usernames are resolved to ids once, and valid rows are
+inserted with ``executemany`` in batches that are committed one at a time.
+The per-user summaries of everyone who received readings are rebuilt at the end,
+and their readings are checked for alerts (see health_tracker.alerts).
+
+Usage::
+
+    python -m health_tracker.bulk_import readings.csv more_readings.jsonl
+"""
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime
+
+from health_tracker.alerts import backfill_range
+from health_tracker.session import user_id_cache
+from health_tracker.storage import StorageError, get_backend
+from health_tracker.summaries import rebuild as rebuild_summaries
+from health_tracker.validation import parse_health_metrics
+
+DEFAULT_BATCH_SIZE = 5000
+
+INSERT_SQL = (
+    "INSERT INTO health_data (user_id, weight, blood_pressure, systolic, diastolic, steps, date_logged) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s)"
+)
+
+
+class ImportReport:
+    """Outcome of a bulk import: inserted count and rejected rows."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.rejected = []  # (source, line number, reason)
+
+    def reject(self, source, line_no, reason):
+        self.rejected.append((source, line_no, reason))
+
+    @property
+    def processed(self):
+        return self.inserted + len(self.rejected)
+
+
+def read_csv(path):
+    """Yield (line number, row dict) for every data row of a CSV file."""
+    with open(path, newline="", encoding="utf-8") as handle:
+        reader = csv.DictReader(handle)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def read_jsonl(path):
+    """Yield (line number, row dict) for every non-empty line of a JSON Lines file."""
+    with open(path, encoding="utf-8") as handle:
+        for line_no, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as err:
+                row = err  # Reported as a rejected row by the importer
+            yield line_no, row
+
+
+def read_rows(path, fmt=None):
+    """Pick the reader from fmt ('csv'/'jsonl') or the file extension."""
+    fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".ndjson", ".json")) else "csv")
+    if fmt == "csv":
+        return read_csv(path)
+    if fmt == "jsonl":
+        return read_jsonl(path)
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def parse_row(row, now):
+    """Validate one input row; returns (username, insert params without user id)."""
+    if not isinstance(row, dict):
+        raise ValueError(f"Invalid JSON: {row}")
+    username = str(row.get("username") or "").strip()
+    if not username:
+        raise ValueError("Missing username")
+
+    reading = parse_health_metrics(row.get("weight"), row.get("blood_pressure"), row.get("steps"))
+
+    date_logged = row.get("date_logged")
+    if date_logged:
+        try:
+            date_logged = datetime.fromisoformat(str(date_logged).strip())
+        except ValueError:
+            raise ValueError(f"Invalid date_logged: {date_logged}") from None
+    else:
+        date_logged = now
+    return username, (reading.weight, reading.blood_pressure, reading.systolic, reading.diastolic,
+                      reading.steps, date_logged)
+
+
+class HealthDataImporter:
+    """Streams rows into health_data in large, separately committed batches."""
+
+    def __init__(self, backend, batch_size=DEFAULT_BATCH_SIZE):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.user_ids = user_id_cache(backend)  # Process-wide username -> id LRU
+        self.touched_users = set()  # Users whose summaries need a rebuild and readings a check
+
+    def import_file(self, path, fmt=None, report=None):
+        """Import one file and return the ImportReport."""
+        report = report or ImportReport()
+        now = datetime.now()
+        batch = []  # (line number, username, params)
+
+        for line_no, row in read_rows(path, fmt):
+            try:
+                username, params = parse_row(row, now)
+            except ValueError as err:
+                report.reject(path, line_no, str(err))
+                continue
+            batch.append((line_no, username, params))
+            if len(batch) >= self.batch_size:
+                self._flush(path, batch, report)
+                batch = []
+
+        if batch:
+            self._flush(path, batch, report)
+        return report
+
+    def _flush(self, path, batch, report):
+        # Resolve the batch's usernames, then insert and commit it as one transaction
+        user_ids = self.user_ids.resolve(username for _, username, _ in batch)
+        rows, line_numbers = [], []
+        for line_no, username, params in batch:
+            user_id = user_ids.get(username)
+            if user_id is None:
+                report.reject(path, line_no, f"User not found: {username}")
+                continue
+            rows.append((user_id,) + params)
+            line_numbers.append(line_no)
+
+        if not rows:
+            return
+        try:
+            with self.backend.transaction() as tx:
+                tx.executemany(INSERT_SQL, rows)
+        except StorageError as err:
+            # The whole batch was rolled back
+            for line_no in line_numbers:
+                report.reject(path, line_no, f"Error saving health data: {err}")
+            return
+        report.inserted += len(rows)
+        self.touched_users.update(row[0] for row in rows)
+
+    def rebuild_summaries(self):
+        """Recompute the summaries of every user that received readings and check them for alerts."""
+        # Imported history can predate existing readings, so summaries are rebuilt, not updated, and
+        # the users' readings are checked again oldest first (alerts already stored are kept, not duplicated)
+        user_ids = sorted(self.touched_users)
+        rebuild_summaries(self.backend, user_ids)
+        for user_id in user_ids:
+            backfill_range(self.backend, user_id, user_id)
+        self.touched_users.clear()
+
+
+def import_files(paths, backend=None, batch_size=DEFAULT_BATCH_SIZE, fmt=None):
+    """Import several files with one shared username cache."""
+    importer = HealthDataImporter(backend or get_backend(), batch_size)
+    report = ImportReport()
+    for path in paths:
+        importer.import_file(path, fmt, report)
+    importer.rebuild_summaries()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import health metrics from CSV/JSONL files.")
+    parser.add_argument("files", nargs="+", help="CSV or JSON Lines files to import")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="input format (default: from file extension)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per committed batch")
+    parser.add_argument("--db", help="database URL (default: HEALTH_TRACKER_DB)")
+    args = parser.parse_args(argv)
+
+    report = import_files(args.files, get_backend(args.db), args.batch_size, args.format)
+    for source, line_no, reason in sorted(report.rejected):
+        print(f"{source}:{line_no}: {reason}", file=sys.stderr)
+    print(f"Imported {report.inserted} readings, rejected {len(report.rejected)}.")
+    return 1 if report.rejected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
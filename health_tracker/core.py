@@ -0,0 +1,327 @@
+"""Non-interactive core of the Community Health Tracker.
+
+HealthTracker holds everything that does not need a terminal: login (for
+patients and doctors), registration, logging metrics, history, doctor
+lookups and messages between patients and doctors.  It never prints, sleeps
+or waits for input, so it serves as the programmatic API, as the engine of
+the headless command runner, and as the base class of the interactive menus
+(AdvancedHealthTracker in community-health_tracker.py).
+"""
+import math
+import re  # For regular expression operations (password validation)
+from datetime import datetime
+
+from health_tracker import messages, metrics
+from health_tracker.doctors import doctor_directory
+from health_tracker.history import PAGE_SIZE, fetch_page as fetch_history_page, format_rows as format_history_rows
+from health_tracker.passwords import hash_password_async, verify_password_async  # For password hashing
+from health_tracker.ratelimit import login_limiter
+from health_tracker.session import ROLE_DOCTOR, ROLE_USER, Session, user_id_cache
+from health_tracker.storage import StorageError, get_backend
+from health_tracker.summaries import load_summary, record_reading
+from health_tracker.tips import tip_rules
+from health_tracker.validation import parse_health_metrics
+
+
+class HealthTracker:
+    """Programmatic API of the tracker; methods return data or (success, message)."""
+
+    def __init__(self, db=None, ingest=None):
+        self.db = db or get_backend()  # Connections are borrowed from the pool per query, the first opens them
+        # Write-behind queue for readings; False (or no configured log) commits every reading on its own
+        self._ingest = ingest  # None: the configured queue, opened (and its log replayed) by the first reading
+        self.session = None  # Identity of the logged-in user (id, username, role)
+        self.initialize_health_tips()  # Set up health tips database
+
+    @property
+    def ingest(self):
+        if self._ingest is None:
+            from health_tracker.ingest import ingest_queue
+
+            self._ingest = ingest_queue(self.db) or False
+        return self._ingest
+
+    @property
+    def username(self):
+        # Current user's username, None when nobody is logged in
+        return self.session.username if self.session else None
+
+    @property
+    def is_patient(self):
+        return self.session is not None and self.session.role == ROLE_USER
+
+    @property
+    def is_doctor(self):
+        return self.session is not None and self.session.role == ROLE_DOCTOR
+
+    def initialize_health_tips(self):
+        # Tips and personalisation rules, compiled once per process from the tips data file
+        self.health_tips = tip_rules()
+
+    def get_health_tips(self, category="general", user_metrics=None):
+        """Get health tips by category, or tips chosen from given metric values.
+
+        user_metrics is a dict with any of ``weight``, ``blood_pressure``
+        ('120/80') and ``steps``; invalid values raise ValueError.
+        """
+        if user_metrics:  # If specific metrics are provided(Return relevant metric-based tips)
+            return list(self.health_tips.tips_for(self.health_tips.buckets_for_reading(**user_metrics)))
+
+        # General, nutrition or exercise tips (general for an unknown category)
+        return list(self.health_tips.category(category))
+
+    @metrics.instrumented("personal_tips")
+    def personal_tips(self, today=None):
+        """Tips chosen from the logged-in user's progress summary (empty without readings)."""
+        if not self.is_patient:
+            return []
+        summary = load_summary(self.db, self.session.user_id)
+        if not summary or not summary.readings:
+            return []
+        return list(self.health_tips.tips_for(self.health_tips.buckets_for_summary(summary, today)))
+
+    @metrics.instrumented("log_health_metrics")
+    def log_health_metrics(self, weight, blood_pressure, steps):
+        """Log user's health metrics in the MySQL database."""
+        try:
+            # Convert and validate inputs (same rules as the bulk importer)
+            reading = parse_health_metrics(weight, blood_pressure, steps)
+        except ValueError as err:
+            return False, str(err)
+
+        if not self.is_patient:
+            return False, "User not found!"
+
+        try:
+            logged_at = datetime.now().replace(microsecond=0)
+            if self.ingest:
+                # Durable in the local log now, committed with the next group
+                self.ingest.submit(self.session.user_id, reading, logged_at)
+                metrics.increment("readings_queued")
+                return True, "Health metrics logged successfully!"
+            with self.db.transaction() as tx:
+                # Insert health metrics into database
+                reading_id = tx.execute(
+                    "INSERT INTO health_data (user_id, weight, blood_pressure, systolic, diastolic, steps, date_logged) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                    (self.session.user_id, reading.weight, reading.blood_pressure,
+                     reading.systolic, reading.diastolic, reading.steps, logged_at)
+                ).lastrowid
+                # Keep the user's progress summary in step with the new reading
+                record_reading(tx, self.session.user_id, reading_id, logged_at, reading)
+            metrics.increment("readings_logged")
+            return True, "Health metrics logged successfully!"
+        except (StorageError, OSError) as err:
+            return False, f"Error saving health data: {err}"
+
+    @metrics.instrumented("display_health_history")
+    def display_health_history(self, older_than=None, newer_than=None, start=None, end=None):
+        """Return one page of the user's health history in a tabular format."""
+        if not self.is_patient:
+            return [],[], "User not found!", None
+        
+        # Retrieve one page of health data, newest first (keyset pagination on date and id)
+        page = self.history_page(older_than, newer_than, start, end)
+        if not page.rows:
+            return [],[], "No health history found!", page
+        
+        # Prepare data for tabulation (table display)
+        table_data = list(format_history_rows(page.rows))
+        
+        # Create headers
+        headers = ["Date of Entry", "Weight", "Blood Pressure", "Steps"]
+        
+        return table_data, headers, "Health history !!!", page
+
+    def validate_password(self, password):
+        """We have to ensure that the password is strong."""
+        if len(password) < 8:
+            return False, "Password must be at least 8 characters long!"
+        if not re.search(r"\d", password):
+            return False, "Password must contain at least one number!"
+        if not re.search(r"[A-Za-z]", password):
+            return False, "Password must contain at least one letter!"
+        return True, "Password is strong."
+
+    @metrics.instrumented("login_user")
+    def login_user(self, username, password, source=None):
+        """Log in a user by validating their credentials.
+
+        source identifies where the attempt came from (e.g. a client address)
+        for rate limiting; local terminals leave it out.
+        """
+        limiter = login_limiter()
+        wait = limiter.retry_after(username, source)
+        if wait:
+            return False, f"Too many failed logins, try again in {math.ceil(wait)} seconds."
+
+        try:
+            # Patients and doctors log in the same way; a name taken in both tables before
+            # registration checked both is tried as a patient first
+            accounts = self.db.fetchall(
+                "SELECT 0, id, password FROM users WHERE username = %s "
+                "UNION ALL SELECT 1, id, password FROM doctors WHERE username = %s ORDER BY 1",
+                (username, username))
+        except StorageError as err:
+            return False, str(err)
+        if not accounts:
+            limiter.failed(username, source)
+            metrics.increment("login_failures")
+            return False, "Username not found!, try again!..."
+
+        # Verify password (on the hashing pool, no database connection is held meanwhile)
+        for is_doctor, account_id, stored_password in accounts:
+            matches, needs_upgrade = verify_password_async(password, stored_password).result()
+            if matches:
+                break
+        else:
+            limiter.failed(username, source)
+            metrics.increment("login_failures")
+            return False, "Incorrect password!, try again!..."
+        limiter.succeeded(username)
+        table = "doctors" if is_doctor else "users"
+
+        if needs_upgrade:
+            # Legacy sha256 or outdated cost: store a fresh scrypt hash now that we know the password
+            try:
+                self.db.execute(f"UPDATE {table} SET password = %s WHERE id = %s AND password = %s",
+                                (hash_password_async(password).result(), account_id, stored_password))
+            except StorageError:
+                pass  # Upgraded on a later login instead
+
+        # Keep the identity for the whole session instead of looking it up per action
+        if is_doctor:
+            self.session = Session(account_id, username, ROLE_DOCTOR)  # user_id is the doctors.id
+            return True, "Login successful!"
+        self.session = Session(account_id, username)
+        user_id_cache(self.db).put(username, account_id)
+        try:
+            self.ingest  # Open the write-behind queue now, so readings a crashed run left behind show in history
+        except (StorageError, OSError):
+            pass  # Retried by the first logged reading
+        return True, "Login successful!"
+
+    @metrics.instrumented("register_user")
+    def register_user(self, username, password, is_doctor=False, specialty=None, name=None, email=None, tel=None):
+        """Register a new user or doctor in the MySQL database with hashed password."""
+        if not username or len(username) < 3:
+            return False, "Username must be at least 3 characters long!"
+        
+        try:
+            # Unique across patients and doctors, who log in through the same form
+            if self.db.fetchone("SELECT id FROM users WHERE username = %s "
+                                "UNION ALL SELECT id FROM doctors WHERE username = %s", (username, username)):
+                return False, "Username already exists!"
+        except StorageError as err:
+            return False, str(err)
+        
+        valid_password, msg = self.validate_password(password)
+        if not valid_password:
+            return False, msg
+        
+        password_hash = hash_password_async(password).result()  # Salted scrypt
+
+        try:
+            if is_doctor:
+                # Insert doctor with specialty
+                self.db.execute("INSERT INTO doctors (name,specialty,email,phone,username, password) VALUES (%s, %s, %s,%s,%s,%s)", 
+                                (name,specialty,email,tel,username, password_hash))
+                doctor_directory(self.db).invalidate()  # New doctor must show up in the directory
+            else:
+                # Insert general user
+                self.db.execute("INSERT INTO users (username, password) VALUES (%s, %s)", 
+                                (username, password_hash))
+            return True, "Registration successful!"
+        except StorageError as err:
+            return False, f"Error saving user data: {err}"
+
+    def logout_user(self):
+        """Forget the logged-in identity."""
+        self.session = None
+
+    @metrics.instrumented("history_page")
+    def history_page(self, older_than=None, newer_than=None, start=None, end=None, page_size=PAGE_SIZE):
+        """Return one HistoryPage of the logged-in user's readings, or None if nobody is logged in."""
+        if not self.is_patient:
+            return None
+        return fetch_history_page(self.db, self.session.user_id, older_than, newer_than, start, end, page_size)
+
+    @metrics.instrumented("find_doctors")
+    def find_doctors(self, name_prefix="", specialty=None):
+        """Doctors whose name starts with name_prefix, optionally in one specialty."""
+        return doctor_directory(self.db).search(name_prefix, specialty)
+
+    def get_doctor(self, doctor_id):
+        """Contact details of one doctor, or None for an unknown id."""
+        return doctor_directory(self.db).get(doctor_id)
+
+    @metrics.instrumented("message_doctor")
+    def message_doctor(self, doctor_id, text, appointment_at=None):
+        """Send a doctor a message, or an appointment request for appointment_at, with recent metrics attached."""
+        if not self.is_patient:
+            return False, "User not found!"
+        doctor = doctor_directory(self.db).get(doctor_id)
+        if not doctor:
+            return False, "Invalid doctor ID."
+        if appointment_at is not None and appointment_at <= datetime.now():
+            return False, "The appointment time must be in the future!"
+        try:
+            snapshot = messages.metrics_snapshot(self.db, self.session.user_id)
+            messages.send(self.db, self.session.user_id, doctor.id, text,
+                          "appointment" if appointment_at else "message", appointment_at, snapshot)
+        except ValueError as err:
+            return False, str(err)
+        except StorageError as err:
+            return False, f"Error sending your message: {err}"
+        if appointment_at:
+            return True, f"Appointment request sent to Dr. {doctor.name}."
+        return True, f"Message sent to Dr. {doctor.name}."
+
+    def sent_messages(self, before=None, page_size=messages.PAGE_SIZE):
+        """MessagePage of what the logged-in patient sent, with replies; None for anyone else."""
+        if not self.is_patient:
+            return None
+        return messages.sent_page(self.db, self.session.user_id, before, page_size)
+
+    @metrics.instrumented("inbox_page")
+    def inbox_page(self, statuses=messages.OPEN_STATUSES, before=None, page_size=messages.PAGE_SIZE):
+        """MessagePage of the logged-in doctor's inbox; None for anyone else."""
+        if not self.is_doctor:
+            return None
+        return messages.inbox_page(self.db, self.session.user_id, statuses, before, page_size)
+
+    def inbox_counts(self):
+        """(unread, total) messages of the logged-in doctor, or None for anyone else."""
+        if not self.is_doctor:
+            return None
+        return messages.inbox_counts(self.db, self.session.user_id)
+
+    def open_message(self, message_id):
+        """A message of the doctor's inbox with its metrics snapshot (now marked read), or None."""
+        if not self.is_doctor:
+            return None
+        return messages.open_message(self.db, self.session.user_id, message_id)
+
+    def reply_message(self, message_id, text, appointment_at=None):
+        """Answer a message of the doctor's inbox, confirming appointment_at for appointment requests."""
+        if not self.is_doctor:
+            return False, "Only doctors can reply to messages."
+        try:
+            if not messages.reply(self.db, self.session.user_id, message_id, text, appointment_at):
+                return False, "Message not found or already closed."
+        except ValueError as err:
+            return False, str(err)
+        except StorageError as err:
+            return False, f"Error saving your reply: {err}"
+        return True, "Reply sent."
+
+    def close_message(self, message_id):
+        """Close a message of the doctor's inbox."""
+        if not self.is_doctor:
+            return False, "Only doctors can close messages."
+        try:
+            if not messages.close(self.db, self.session.user_id, message_id):
+                return False, "Message not found or already closed."
+        except StorageError as err:
+            return False, f"Error closing the message: {err}"
+        return True, "Message closed."
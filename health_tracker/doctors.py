@@ -0,0 +1,125 @@
+"""In-memory doctor directory with specialty filtering and name search.
+
+The doctors table is read once and indexed by id, by specialty and by name
+word prefix.  The directory is shared by every session using the same
+database; register_user invalidates it when a doctor signs up, and it is
+reloaded after DIRECTORY_TTL seconds to pick up doctors registered by
+other processes.
+"""
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import namedtuple
+
+# Specialties doctors choose from when registering
+SPECIALTIES = [
+    "Cardiology",
+    "Dermatology",
+    "Neurology",
+    "Orthopedics",
+    "Pediatrics",
+    "Psychiatry",
+    "General Medicine"
+]
+
+DIRECTORY_TTL = 300.0  # Seconds before the directory is reloaded from the database
+PAGE_SIZE = 10  # Doctors listed per page in the menu
+
+Doctor = namedtuple("Doctor", ["id", "name", "specialty", "email", "phone"])
+
+
+class DoctorDirectory:
+    """Doctors indexed by id, specialty and name prefix."""
+
+    def __init__(self, backend, ttl=DIRECTORY_TTL, clock=time.monotonic):
+        self.backend = backend
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._loaded_at = None  # None means the indexes must be (re)built
+        self._by_id = {}
+        self._by_specialty = {}
+        self._names = []  # Sorted (lowercase name word, doctor id) pairs
+        self._all = []
+
+    def invalidate(self):
+        """Drop the indexes; they are rebuilt on the next lookup."""
+        with self._lock:
+            self._loaded_at = None
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if self._loaded_at is not None and self._clock() - self._loaded_at < self.ttl:
+                return
+            rows = self.backend.fetchall("SELECT id, name, specialty, email, phone FROM doctors ORDER BY id")
+            doctors = [Doctor(*row) for row in rows]
+            by_specialty = {}
+            names = []
+            for doctor in doctors:
+                by_specialty.setdefault(doctor.specialty, []).append(doctor)
+                for word in set((doctor.name or "").lower().split()):
+                    names.append((word, doctor.id))
+            names.sort()
+            self._all = doctors
+            self._by_id = {doctor.id: doctor for doctor in doctors}
+            self._by_specialty = by_specialty
+            self._names = names
+            self._loaded_at = self._clock()
+
+    def all(self):
+        self._ensure_loaded()
+        return self._all
+
+    def get(self, doctor_id):
+        """Return the Doctor with this id, or None."""
+        self._ensure_loaded()
+        return self._by_id.get(doctor_id)
+
+    def by_specialty(self, specialty):
+        self._ensure_loaded()
+        return self._by_specialty.get(specialty, [])
+
+    def specialty_counts(self):
+        """Number of doctors per specialty."""
+        self._ensure_loaded()
+        return {specialty: len(doctors) for specialty, doctors in self._by_specialty.items()}
+
+    def search(self, prefix, specialty=None):
+        """Doctors with a name word starting with prefix (case-insensitive), sorted by name."""
+        self._ensure_loaded()
+        prefix = prefix.strip().lower()
+        if prefix.startswith("dr."):
+            prefix = prefix[3:].strip()
+        if not prefix:
+            return self.by_specialty(specialty) if specialty else self._all
+
+        matches = set()
+        position = bisect_left(self._names, (prefix,))
+        while position < len(self._names) and self._names[position][0].startswith(prefix):
+            matches.add(self._names[position][1])
+            position += 1
+        doctors = (self._by_id[doctor_id] for doctor_id in matches)
+        if specialty:
+            doctors = (doctor for doctor in doctors if doctor.specialty == specialty)
+        return sorted(doctors, key=lambda doctor: ((doctor.name or "").lower(), doctor.id))
+
+
+def page_of(items, page, page_size=PAGE_SIZE):
+    """Return (items on the zero-based page, number of pages)."""
+    pages = max(1, -(-len(items) // page_size))
+    page = min(max(page, 0), pages - 1)
+    return items[page * page_size:(page + 1) * page_size], pages
+
+
+_directories = weakref.WeakKeyDictionary()  # One directory per storage backend
+_directories_lock = threading.Lock()
+
+
+def doctor_directory(backend):
+    """Return the process-wide doctor directory for a storage backend."""
+    with _directories_lock:
+        directory = _directories.get(backend)
+        if directory is None:
+            directory = _directories[backend] = DoctorDirectory(backend)
+        return directory
@@ -0,0 +1,363 @@
+"""Headless command runner for intake terminals, scripts and tests.
+
+Drives the non-interactive HealthTracker core: no screen clears, sleeps,
+animations or keyboard hooks.  Commands are read one per line from a script
+file or stdin (shell-style quoting, ``#`` starts a comment) and one JSON
+object is written per command::
+
+    register USERNAME PASSWORD
+    register-doctor USERNAME PASSWORD SPECIALTY "FULL NAME" EMAIL PHONE
+    login USERNAME PASSWORD
+    log WEIGHT BLOOD_PRESSURE STEPS
+    history [size=N] [from=YYYY-MM-DD] [to=YYYY-MM-DD] [older=KEY]
+    doctors [name=PREFIX] [specialty=NAME] [page=N] [size=N]
+    doctor ID
+    message DOCTOR_ID TEXT [at=YYYY-MM-DDTHH:MM]
+    messages [size=N] [older=KEY]
+    inbox [status=unread,read,replied,closed] [size=N] [older=KEY]
+    open ID
+    reply ID TEXT [at=YYYY-MM-DDTHH:MM]
+    close ID
+    logout
+
+``history``, ``messages`` and ``inbox`` return an ``older`` key to pass back
+for the next page; ``size`` is 1 to MAX_PAGE_SIZE.  ``message ... at=`` requests an appointment; doctors log
+in like patients and use ``inbox``, ``open``, ``reply`` and ``close``.
+
+Usage::
+
+    python community-health_tracker.py --headless [--script commands.txt] [--db URL] [--metrics FILE]
+    python -m health_tracker.headless < commands.txt
+"""
+import argparse
+import json
+import shlex
+import sys
+import traceback
+from datetime import datetime
+
+from health_tracker import metrics
+from health_tracker.core import HealthTracker
+from health_tracker.doctors import PAGE_SIZE as DOCTOR_PAGE_SIZE, page_of
+from health_tracker.history import PAGE_SIZE as HISTORY_PAGE_SIZE
+from health_tracker.messages import OPEN_STATUSES, PAGE_SIZE as MESSAGE_PAGE_SIZE, STATUSES
+from health_tracker.storage import StorageError, get_backend
+
+
+MAX_PAGE_SIZE = 100  # Largest page a history, doctors, messages or inbox command returns
+
+
+class CommandError(Exception):
+    """Raised for a malformed command line."""
+
+
+def _options(args, allowed):
+    # Parse key=value arguments
+    options = {}
+    for arg in args:
+        key, sep, value = arg.partition("=")
+        if not sep or key not in allowed:
+            raise CommandError(f"Unknown argument: {arg} (expected {', '.join(k + '=...' for k in allowed)})")
+        options[key] = value
+    return options
+
+
+def _expect(args, count, usage):
+    if len(args) != count:
+        raise CommandError(f"Usage: {usage}")
+    return args
+
+
+def _date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d") if value else None
+    except ValueError:
+        raise CommandError(f"Invalid date: {value} (expected YYYY-MM-DD)") from None
+
+
+def _datetime(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M") if value else None
+    except (TypeError, ValueError):
+        raise CommandError(f"Invalid time: {value} (expected YYYY-MM-DDTHH:MM)") from None
+
+
+def _int(value, default):
+    try:
+        return int(value) if value else default
+    except ValueError:
+        raise CommandError(f"Invalid number: {value}") from None
+
+
+def _size(value, default):
+    # Page size option, 1..MAX_PAGE_SIZE
+    size = _int(value, default)
+    if not 1 <= size <= MAX_PAGE_SIZE:
+        raise CommandError(f"Invalid page size: {value} (expected 1 to {MAX_PAGE_SIZE})")
+    return size
+
+
+def format_key(key):
+    # History or message page key as text: <date>@<id>
+    return f"{key[0].isoformat()}@{key[1]}" if key else None
+
+
+def parse_key(text):
+    date_text, _, row_id = text.rpartition("@")
+    try:
+        return datetime.fromisoformat(date_text), int(row_id)
+    except ValueError:
+        raise CommandError(f"Invalid page key: {text}") from None
+
+
+def cmd_register(tracker, args):
+    username, password = _expect(args, 2, "register USERNAME PASSWORD")
+    return tracker.register_user(username, password) + (None,)
+
+
+def cmd_register_doctor(tracker, args):
+    username, password, specialty, name, email, phone = _expect(
+        args, 6, 'register-doctor USERNAME PASSWORD SPECIALTY "FULL NAME" EMAIL PHONE')
+    return tracker.register_user(username, password, True, specialty, name, email, phone) + (None,)
+
+
+def cmd_login(tracker, args):
+    username, password = _expect(args, 2, "login USERNAME PASSWORD")
+    return tracker.login_user(username, password) + (None,)
+
+
+def cmd_log(tracker, args):
+    weight, blood_pressure, steps = _expect(args, 3, "log WEIGHT BLOOD_PRESSURE STEPS")
+    return tracker.log_health_metrics(weight, blood_pressure, steps) + (None,)
+
+
+def history_result(tracker, options):
+    """One history page as (success, message, data) from string options size/from/to/older."""
+    older = parse_key(options["older"]) if options.get("older") else None
+    page = tracker.history_page(older_than=older, start=_date(options.get("from")), end=_date(options.get("to")),
+                                page_size=_size(options.get("size"), HISTORY_PAGE_SIZE))
+    if page is None:
+        return False, "User not found!", None
+    rows = [
+        {"date_logged": row.date_logged, "weight": row.weight, "blood_pressure": row.blood_pressure,
+         "steps": row.steps}
+        for row in page.rows
+    ]
+    data = {"rows": rows, "older": format_key(page.last_key) if page.has_older and page.rows else None}
+    return True, "Health history !!!" if rows else "No health history found!", data
+
+
+def doctors_result(tracker, options):
+    """One page of the doctor directory from string options name/specialty/page/size."""
+    doctors = tracker.find_doctors(options.get("name", ""), options.get("specialty") or None)
+    page = _int(options.get("page"), 1) - 1
+    shown, pages = page_of(doctors, page, _size(options.get("size"), DOCTOR_PAGE_SIZE))
+    data = {
+        "doctors": [{"id": doctor.id, "name": doctor.name, "specialty": doctor.specialty} for doctor in shown],
+        "page": min(max(page, 0), pages - 1) + 1,
+        "pages": pages,
+        "total": len(doctors),
+    }
+    return True, f"{len(doctors)} doctors found", data
+
+
+def doctor_result(tracker, doctor_id):
+    doctor = tracker.get_doctor(_int(doctor_id, None))
+    if not doctor:
+        return False, "Invalid doctor ID.", None
+    return True, f"Dr. {doctor.name}", doctor._asdict()
+
+
+def _message_data(message):
+    data = message._asdict()
+    if data["snapshot"] is None:
+        del data["snapshot"]  # Only loaded when a doctor opens the message
+    return data
+
+
+def _message_page(page, empty):
+    data = {
+        "messages": [_message_data(message) for message in page.rows],
+        "older": format_key(page.last_key) if page.has_more and page.rows else None,
+    }
+    return True, f"{len(page.rows)} messages" if page.rows else empty, data
+
+
+def messages_result(tracker, options):
+    """One page of the patient's sent messages from string options size/older."""
+    older = parse_key(options["older"]) if options.get("older") else None
+    page = tracker.sent_messages(older, _size(options.get("size"), MESSAGE_PAGE_SIZE))
+    if page is None:
+        return False, "User not found!", None
+    return _message_page(page, "No messages sent yet.")
+
+
+def inbox_result(tracker, options):
+    """One page of the doctor's inbox, with the cached counts, from string options status/size/older."""
+    statuses = tuple(options["status"].split(",")) if options.get("status") else OPEN_STATUSES
+    unknown = [status for status in statuses if status not in STATUSES]
+    if unknown:
+        raise CommandError(f"Unknown status: {', '.join(unknown)} (expected {', '.join(STATUSES)})")
+    older = parse_key(options["older"]) if options.get("older") else None
+    page = tracker.inbox_page(statuses, older, _size(options.get("size"), MESSAGE_PAGE_SIZE))
+    if page is None:
+        return False, "Only doctors have an inbox.", None
+    success, message, data = _message_page(page, "No messages.")
+    data["unread"], data["total"] = tracker.inbox_counts()
+    return success, message, data
+
+
+def message_result(tracker, message_id):
+    """One message of the doctor's inbox with its metrics snapshot; marks it read."""
+    message = tracker.open_message(_int(message_id, None))
+    if message is None:
+        return False, "Message not found.", None
+    return True, f"{message.kind.capitalize()} from {message.username}", message._asdict()
+
+
+def send_result(tracker, doctor_id, text, appointment_at=None):
+    """Message a doctor (an appointment request when appointment_at is given) from string arguments."""
+    return tracker.message_doctor(_int(doctor_id, None), text, _datetime(appointment_at)) + (None,)
+
+
+def reply_result(tracker, message_id, text, appointment_at=None):
+    """Reply to a message of the doctor's inbox from string arguments."""
+    return tracker.reply_message(_int(message_id, None), text, _datetime(appointment_at)) + (None,)
+
+
+def close_result(tracker, message_id):
+    return tracker.close_message(_int(message_id, None)) + (None,)
+
+
+def cmd_history(tracker, args):
+    return history_result(tracker, _options(args, ("size", "from", "to", "older")))
+
+
+def cmd_doctors(tracker, args):
+    return doctors_result(tracker, _options(args, ("name", "specialty", "page", "size")))
+
+
+def cmd_doctor(tracker, args):
+    (doctor_id,) = _expect(args, 1, "doctor ID")
+    return doctor_result(tracker, doctor_id)
+
+
+def cmd_message(tracker, args):
+    if len(args) < 2:
+        raise CommandError("Usage: message DOCTOR_ID TEXT [at=YYYY-MM-DDTHH:MM]")
+    return send_result(tracker, args[0], args[1], _options(args[2:], ("at",)).get("at"))
+
+
+def cmd_messages(tracker, args):
+    return messages_result(tracker, _options(args, ("size", "older")))
+
+
+def cmd_inbox(tracker, args):
+    return inbox_result(tracker, _options(args, ("status", "size", "older")))
+
+
+def cmd_open(tracker, args):
+    (message_id,) = _expect(args, 1, "open ID")
+    return message_result(tracker, message_id)
+
+
+def cmd_reply(tracker, args):
+    if len(args) < 2:
+        raise CommandError("Usage: reply ID TEXT [at=YYYY-MM-DDTHH:MM]")
+    return reply_result(tracker, args[0], args[1], _options(args[2:], ("at",)).get("at"))
+
+
+def cmd_close(tracker, args):
+    (message_id,) = _expect(args, 1, "close ID")
+    return close_result(tracker, message_id)
+
+
+def cmd_logout(tracker, args):
+    _expect(args, 0, "logout")
+    tracker.logout_user()
+    return True, "You have successfully logged out.", None
+
+
+COMMANDS = {
+    "register": cmd_register,
+    "register-doctor": cmd_register_doctor,
+    "login": cmd_login,
+    "log": cmd_log,
+    "history": cmd_history,
+    "doctors": cmd_doctors,
+    "doctor": cmd_doctor,
+    "message": cmd_message,
+    "messages": cmd_messages,
+    "inbox": cmd_inbox,
+    "open": cmd_open,
+    "reply": cmd_reply,
+    "close": cmd_close,
+    "logout": cmd_logout,
+}
+
+
+def run_command(tracker, line):
+    """Run one command line; returns (command name, success, message, data)."""
+    try:
+        argv = shlex.split(line, comments=True)
+    except ValueError as err:
+        return None, False, f"Could not parse command: {err}", None
+    if not argv:
+        return None, None, None, None  # Blank line or comment
+    name, args = argv[0].lower(), argv[1:]
+    handler = COMMANDS.get(name)
+    if handler is None:
+        return name, False, f"Unknown command: {name} (expected one of {', '.join(COMMANDS)})", None
+    try:
+        success, message, data = handler(tracker, args)
+    except (CommandError, StorageError) as err:
+        return name, False, str(err), None
+    except Exception as err:
+        # A bug in one command must not end the whole script
+        traceback.print_exc()
+        return name, False, f"Internal error: {err!r}", None
+    return name, success, message, data
+
+
+def run_script(tracker, lines, out, stop_on_error=False):
+    """Run command lines, writing one JSON result per command; returns the number of failures."""
+    failures = 0
+    for line_no, line in enumerate(lines, start=1):
+        name, success, message, data = run_command(tracker, line)
+        if success is None:
+            continue
+        result = {"line": line_no, "command": name, "ok": success, "message": message}
+        if data is not None:
+            result["data"] = data
+        out.write(json.dumps(result, default=str) + "\n")
+        out.flush()  # One result per line as soon as it is ready
+        if not success:
+            failures += 1
+            if stop_on_error:
+                break
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run tracker commands without the interactive menus.")
+    parser.add_argument("--script", help="file with one command per line (default: stdin)")
+    parser.add_argument("--db", help="database URL (default: HEALTH_TRACKER_DB)")
+    parser.add_argument("--stop-on-error", action="store_true", help="stop at the first failed command")
+    parser.add_argument("--metrics", help="collect timings and write them to this file (Prometheus text)")
+    parser.add_argument("--profile", help="save a cProfile capture of the run to this file")
+    args = parser.parse_args(argv)
+
+    if args.metrics:
+        metrics.enable(args.metrics)
+    tracker = HealthTracker(get_backend(args.db))
+    with metrics.profiled(args.profile):
+        if args.script:
+            with open(args.script, encoding="utf-8") as lines:
+                failures = run_script(tracker, lines, sys.stdout, args.stop_on_error)
+        else:
+            failures = run_script(tracker, sys.stdin, sys.stdout, args.stop_on_error)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Keyset-paginated access to a user's health history.
+
+Pages are ordered newest first by ``(date_logged, id)`` and located with a
+key from the previous page instead of an OFFSET, so every page is a short
+range scan on the ``(user_id, date_logged)`` index no matter how long the
+history is.  Only one page is held in memory at a time.  Rows moved to the
+columnar archive (health_tracker.archive) are merged into the same pages.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from health_tracker.archive import configured_archive
+
+PAGE_SIZE = 20  # Rows per page in the interactive view
+STREAM_PAGE_SIZE = 1000  # Rows fetched per query when streaming a whole history
+
+# blood_pressure is the '120/80' text shown to users; systolic/diastolic are the integer columns
+HistoryRow = namedtuple("HistoryRow", ["id", "date_logged", "weight", "blood_pressure", "steps", "systolic", "diastolic"])
+
+COLUMNS = "id, date_logged, weight, blood_pressure, steps, systolic, diastolic"
+
+
+class HistoryPage(namedtuple("HistoryPage", ["rows", "has_older", "has_newer"])):
+    """One page of history rows, newest first."""
+
+    __slots__ = ()
+
+    @property
+    def first_key(self):
+        # Key of the newest row, used to fetch the newer (previous) page; None for an empty page
+        if not self.rows:
+            return None
+        row = self.rows[0]
+        return (row.date_logged, row.id)
+
+    @property
+    def last_key(self):
+        # Key of the oldest row, used to fetch the older (next) page; None for an empty page
+        if not self.rows:
+            return None
+        row = self.rows[-1]
+        return (row.date_logged, row.id)
+
+
+def date_range_filter(start, end):
+    """SQL clauses and params for an optional date range (end is an inclusive day)."""
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("date_logged >= %s")
+        params.append(start)
+    if end is not None:
+        clauses.append("date_logged < %s")
+        params.append(end + timedelta(days=1))
+    return clauses, params
+
+
+def fetch_page(backend, user_id, older_than=None, newer_than=None, start=None, end=None, page_size=PAGE_SIZE):
+    """Fetch one page of a user's history.
+
+    With no key the newest page is returned; ``older_than``/``newer_than``
+    take a ``(date_logged, id)`` key from a neighbouring page.  ``start`` and
+    ``end`` are optional dates limiting the range.
+    """
+    clauses, params = date_range_filter(start, end)
+    clauses.insert(0, "user_id = %s")
+    params.insert(0, user_id)
+
+    if newer_than is not None:
+        # Walk forward in time from the key, then flip back to newest first
+        clauses.append("(date_logged > %s OR (date_logged = %s AND id > %s))")
+        params.extend([newer_than[0], newer_than[0], newer_than[1]])
+        order = "ORDER BY date_logged ASC, id ASC"
+    else:
+        if older_than is not None:
+            clauses.append("(date_logged < %s OR (date_logged = %s AND id < %s))")
+            params.extend([older_than[0], older_than[0], older_than[1]])
+        order = "ORDER BY date_logged DESC, id DESC"
+
+    rows = backend.fetchall(
+        f"SELECT {COLUMNS} FROM health_data WHERE {' AND '.join(clauses)} {order} LIMIT {int(page_size) + 1}",
+        params,
+    )
+    archive = configured_archive()
+    if archive is not None:
+        rows = _with_archived(archive, rows, user_id, older_than, newer_than, start, end, page_size + 1)
+    more = len(rows) > page_size  # The extra row only tells us another page exists
+    rows = [HistoryRow(*row) for row in rows[:page_size]]
+
+    if newer_than is not None:
+        rows.reverse()
+        return HistoryPage(rows, has_older=True, has_newer=more)
+    return HistoryPage(rows, has_older=more, has_newer=older_than is not None)
+
+
+def _with_archived(archive, rows, user_id, older_than, newer_than, start, end, limit):
+    # Merge the archived rows of the same range into the live ones (in the query's order)
+    after = newer_than or ((start, 0) if start is not None else None)
+    before = older_than
+    if end is not None:
+        before = min(before, (end + timedelta(days=1), 0)) if before else (end + timedelta(days=1), 0)
+    if start is not None and after is not None:
+        after = max(after, (start, 0))
+    descending = newer_than is None
+    live_ids = {row[0] for row in rows}
+    archived = []
+    for reading_id, date_logged, weight, systolic, diastolic, steps in archive.user_rows(
+            user_id, after, before, descending):
+        if len(archived) == limit:
+            break
+        if reading_id not in live_ids:  # Still in health_data while an archive run is finishing
+            blood_pressure = f"{systolic}/{diastolic}" if systolic is not None else None
+            archived.append((reading_id, date_logged, weight, blood_pressure, steps, systolic, diastolic))
+    if not archived:
+        return rows
+    return sorted(list(rows) + archived, key=lambda row: (row[1], row[0]), reverse=descending)[:limit]
+
+
+def iter_history(backend, user_id, start=None, end=None, page_size=STREAM_PAGE_SIZE):
+    """Yield every HistoryRow of a user, newest first, one page query at a time."""
+    older_than = None
+    while True:
+        page = fetch_page(backend, user_id, older_than=older_than, start=start, end=end, page_size=page_size)
+        yield from page.rows
+        if not page.has_older:
+            return
+        older_than = page.last_key
+
+
+def format_rows(rows):
+    """Yield history rows in the layout used by the history table."""
+    for row in rows:
+        yield [
+            row.date_logged,  # Date
+            f"{row.weight} kg",  # Weight
+            row.blood_pressure,  # Blood Pressure
+            row.steps  # Steps
+        ]
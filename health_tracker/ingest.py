@@ -0,0 +1,384 @@
+"""Write-behind ingestion of health readings with group commit.
+
+When ``HEALTH_TRACKER_INGEST_WAL`` names a file, log_health_metrics no longer
+commits each reading on its own.  The reading is validated, appended to that
+local write-ahead log and fsynced before the call returns.  A background
+worker then inserts the queued readings, with their summary updates, in one
+transaction per group: GROUP_SIZE readings, or whatever has arrived within
+GROUP_INTERVAL seconds.  Concurrent callers also share the log fsyncs.
+
+Every group transaction also stores the sequence number of its last log
+record in ``ingest_checkpoints``.  On startup the log is replayed from that
+point, so no acknowledged reading is lost after a crash and none is inserted
+twice.  The log file is emptied whenever everything in it has been committed.
+
+Readings show up in history and progress once their group is committed,
+normally within GROUP_INTERVAL seconds.  One log file belongs to one process
+at a time.
+
+Groups that fail for a transient reason (lost connection, locked database)
+are retried every RETRY_DELAY seconds.  When the database rejects a group
+outright (a constraint violation, bad data), its readings are committed one
+by one and the ones that still fail are appended to a dead-letter file next
+to the log (``<log>.dead``, one JSON line per reading with the error), so
+one bad reading never blocks the ones queued after it.  If the worker
+thread ever stops, submit() and flush() raise StorageError instead of
+reporting readings as logged.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+import uuid
+import weakref
+from collections import deque, namedtuple
+from datetime import datetime
+
+from health_tracker.bulk_import import INSERT_SQL
+from health_tracker.storage import StorageError
+from health_tracker.summaries import record_readings
+from health_tracker.validation import Reading
+
+try:
+    import fcntl  # For locking the log file to one process (POSIX only)
+except ImportError:
+    fcntl = None
+
+GROUP_SIZE = 500  # Readings committed per transaction at most
+GROUP_INTERVAL = 0.05  # Seconds a reading may wait for its group to fill up
+RETRY_DELAY = 1.0  # Seconds before a failed group is retried
+TRUNCATE_BYTES = 1 << 20  # Empty the log once it is fully committed and this large
+DEAD_LETTER_SUFFIX = ".dead"  # Readings the database rejected, next to the log file
+# DB-API errors that retrying the same statement cannot fix
+PERMANENT_ERRORS = {"IntegrityError", "DataError", "ProgrammingError", "NotSupportedError"}
+
+QueuedReading = namedtuple("QueuedReading", ["seq", "user_id", "logged_at", "reading"])
+
+
+def is_transient(err):
+    """True for failures worth retrying: StorageErrors not caused by a rejected statement."""
+    return isinstance(err, StorageError) and type(err.__cause__).__name__ not in PERMANENT_ERRORS
+
+
+def record_entry(record):
+    """JSON-ready dict of a QueuedReading, as written to the log."""
+    reading = record.reading
+    return {
+        "seq": record.seq, "user_id": record.user_id, "logged_at": record.logged_at.isoformat(),
+        "weight": reading.weight, "systolic": reading.systolic, "diastolic": reading.diastolic,
+        "steps": reading.steps,
+    }
+
+
+class WriteAheadLog:
+    """Append-only JSON Lines file of queued readings with shared (group) fsyncs.
+
+    The first line names the log; every other line is one reading with its
+    sequence number.  A torn last line left by a crash is cut off on open.
+    """
+
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o600)
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(self._fd)
+                raise StorageError(f"Write-ahead log {path} is in use by another process") from None
+        self._lock = threading.Lock()  # Serialises appends
+        self._sync_lock = threading.Lock()  # One fsync at a time; waiters ride along
+        self._written = self._synced = 0  # Bytes appended / known durable since open
+        self.records = self._load()
+
+    def _load(self):
+        with open(self.path, "rb") as handle:
+            lines = handle.read().split(b"\n")
+        records, good = [], 0
+        header = None
+        for line in lines[:-1]:  # The part after the last newline is incomplete
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if header is None:
+                header = entry
+            else:
+                records.append(QueuedReading(
+                    entry["seq"], entry["user_id"], datetime.fromisoformat(entry["logged_at"]),
+                    Reading(entry["weight"], entry["systolic"], entry["diastolic"], entry["steps"]),
+                ))
+            good += len(line) + 1
+        if header is None:
+            self.wal_id = uuid.uuid4().hex
+            os.ftruncate(self._fd, 0)
+            self._write(json.dumps({"wal": self.wal_id}).encode() + b"\n")
+            os.fsync(self._fd)
+            return []
+        self.wal_id = header["wal"]
+        if good < os.fstat(self._fd).st_size:
+            os.ftruncate(self._fd, good)  # Drop the torn tail
+        return records
+
+    def _write(self, data):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._fd, view):]
+
+    def append(self, record):
+        """Append one QueuedReading; returns the position to pass to sync()."""
+        line = json.dumps(record_entry(record)).encode() + b"\n"
+        with self._lock:
+            self._write(line)
+            self._written += len(line)
+            return self._written
+
+    def sync(self, position):
+        """Make everything appended up to position durable."""
+        if not self.fsync:
+            return
+        with self._sync_lock:
+            if self._synced >= position:
+                return  # Another caller's fsync already covered it
+            with self._lock:
+                target = self._written
+            os.fsync(self._fd)
+            self._synced = target
+
+    def size(self):
+        return os.fstat(self._fd).st_size
+
+    def reset(self):
+        """Drop every record, keeping the header (callers make sure all are committed)."""
+        with self._lock:
+            os.ftruncate(self._fd, 0)
+            self._write(json.dumps({"wal": self.wal_id}).encode() + b"\n")
+            os.fsync(self._fd)
+
+    def close(self):
+        os.close(self._fd)
+
+
+def load_checkpoint(db, wal_id):
+    """Sequence number of the last committed record of a log (0 if none)."""
+    row = db.fetchone("SELECT last_seq FROM ingest_checkpoints WHERE wal_id = %s", (wal_id,))
+    return row[0] if row else 0
+
+
+def save_checkpoint(tx, wal_id, seq):
+    tx.execute("UPDATE ingest_checkpoints SET last_seq = %s, updated_at = %s WHERE wal_id = %s",
+               (seq, datetime.now().replace(microsecond=0), wal_id))
+    if not tx.rowcount:
+        tx.execute("INSERT INTO ingest_checkpoints (wal_id, last_seq) VALUES (%s, %s)", (wal_id, seq))
+
+
+class IngestQueue:
+    """Accepts validated readings, logs them durably and commits them in groups."""
+
+    def __init__(self, backend, path, group_size=GROUP_SIZE, group_interval=GROUP_INTERVAL, fsync=True):
+        self.backend = backend
+        self.group_size = group_size
+        self.group_interval = group_interval
+        self.last_error = None  # Most recent failure of a group commit, retried until it succeeds
+        self.wal = WriteAheadLog(path, fsync)
+        self.dead_letter_path = path + DEAD_LETTER_SUFFIX
+        self.rejected = 0  # Readings sent to the dead-letter file by this queue
+        self._stopped = None  # Exception that ended the worker thread
+        self._append_lock = threading.Lock()  # Keeps sequence numbers in log order
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._closing = False
+
+        # Replay whatever the last run logged but did not commit
+        self._committed = load_checkpoint(backend, self.wal.wal_id)
+        self._pending.extend(record for record in self.wal.records if record.seq > self._committed)
+        self.recovered = len(self._pending)
+        self._next_seq = max([self._committed] + [record.seq for record in self.wal.records]) + 1
+        self.wal.records = None
+
+        self._worker = threading.Thread(target=self._run, name="health-ingest", daemon=True)
+        self._worker.start()
+
+    def submit(self, user_id, reading, logged_at):
+        """Queue a validated Reading; returns its sequence number once it is durable."""
+        with self._append_lock:
+            if self._closing:
+                raise StorageError("Ingestion queue is closed")
+            self._check_worker()
+            record = QueuedReading(self._next_seq, user_id, logged_at, reading)
+            position = self.wal.append(record)
+            self._next_seq += 1
+            with self._cond:
+                self._pending.append(record)
+                if len(self._pending) == 1 or len(self._pending) >= self.group_size:
+                    self._cond.notify_all()  # Start the group timer, or commit a full group now
+        self.wal.sync(position)
+        return record.seq
+
+    def pending(self):
+        """Number of readings not committed to the database yet."""
+        with self._cond:
+            return len(self._pending)
+
+    def flush(self, timeout=None):
+        """Wait until everything submitted so far is committed; returns False on timeout."""
+        with self._append_lock:
+            target = self._next_seq - 1
+        with self._cond:
+            done = self._cond.wait_for(lambda: self._committed >= target or self._stopped is not None, timeout)
+            if self._committed < target:
+                self._check_worker()
+            return done
+
+    def _check_worker(self):
+        if self._stopped is not None:
+            raise StorageError(f"Ingestion worker stopped: {self._stopped!r}")
+
+    def close(self):
+        """Commit what is queued and stop the worker."""
+        with self._append_lock:
+            if self._closing:
+                return
+            self._closing = True
+        with self._cond:
+            self._cond.notify_all()
+        self._worker.join()
+        self.wal.close()
+
+    def _next_group(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending or self._closing)
+            deadline = time.monotonic() + self.group_interval
+            while len(self._pending) < self.group_size and not self._closing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            count = min(len(self._pending), self.group_size)
+            return [self._pending.popleft() for _ in range(count)]
+
+    def _run(self):
+        try:
+            self._loop()
+        except BaseException as err:
+            # Whatever is still queued stays in the log for the next run to replay
+            print("Ingestion: worker stopped:", file=sys.stderr)
+            traceback.print_exc()
+            with self._cond:
+                self._stopped = err
+                self._cond.notify_all()
+
+    def _loop(self):
+        while True:
+            group = self._next_group()
+            if not group:
+                return  # Closing and nothing left
+            retry = self._store(group)
+            if not retry:
+                self.last_error = None
+                continue
+            with self._cond:
+                self._pending.extendleft(reversed(retry))
+                if self._closing:
+                    return  # Left in the log for the next run to replay
+                self._cond.wait(RETRY_DELAY)
+
+    def _store(self, group):
+        """Commit a group; returns the records to retry later (empty when none are left)."""
+        try:
+            self._commit(group)
+        except Exception as err:
+            self.last_error = err
+            if is_transient(err):
+                print(f"Ingestion: group commit failed, retrying: {err}", file=sys.stderr)
+                return group
+            if len(group) > 1:
+                # Find the rejected reading(s): commit the group one reading at a time
+                for index, record in enumerate(group):
+                    if self._store([record]):
+                        return group[index:]
+                return []
+            try:
+                self._reject(group[0], err)
+            except Exception as reject_err:
+                print(f"Ingestion: could not set rejected reading {group[0].seq} aside, retrying: {reject_err}",
+                      file=sys.stderr)
+                return group
+        self._done(group[-1].seq)
+        return []
+
+    def _reject(self, record, err):
+        # Dead-letter the reading, then move the checkpoint past it so it is not replayed
+        print(f"Ingestion: reading {record.seq} rejected, written to {self.dead_letter_path}: {err}",
+              file=sys.stderr)
+        line = json.dumps(dict(record_entry(record), error=str(err))).encode() + b"\n"
+        with open(self.dead_letter_path, "ab") as handle:
+            handle.write(line)
+            handle.flush()
+            os.fsync(handle.fileno())
+        with self.backend.transaction() as tx:
+            save_checkpoint(tx, self.wal.wal_id, record.seq)
+        self.rejected += 1
+
+    def _done(self, seq):
+        with self._cond:
+            self._committed = seq
+            self._cond.notify_all()
+        self._maybe_truncate()
+
+    def _commit(self, group):
+        by_user = {}
+        with self.backend.transaction() as tx:
+            for record in group:
+                reading = record.reading
+                reading_id = tx.execute(INSERT_SQL, (
+                    record.user_id, reading.weight, reading.blood_pressure, reading.systolic,
+                    reading.diastolic, reading.steps, record.logged_at,
+                )).lastrowid
+                by_user.setdefault(record.user_id, []).append((reading_id, record.logged_at, reading))
+            # One summary update per user and group
+            for user_id, readings in by_user.items():
+                record_readings(tx, user_id, readings)
+            save_checkpoint(tx, self.wal.wal_id, group[-1].seq)
+
+    def _maybe_truncate(self):
+        if self.wal.size() < TRUNCATE_BYTES:
+            return
+        with self._append_lock:
+            with self._cond:
+                drained = self._committed == self._next_seq - 1
+            if drained:
+                self.wal.reset()
+
+
+_queues = weakref.WeakKeyDictionary()  # One queue per storage backend
+_queues_lock = threading.Lock()
+
+
+def ingest_queue(backend, path=None):
+    """Return the process-wide write-behind queue of a backend.
+
+    The log file defaults to ``HEALTH_TRACKER_INGEST_WAL``; None is returned
+    when no log is configured (readings are then committed one by one).
+    """
+    path = path or os.environ.get("HEALTH_TRACKER_INGEST_WAL")
+    if not path:
+        return None
+    with _queues_lock:
+        queue = _queues.get(backend)
+        if queue is None:
+            queue = _queues[backend] = IngestQueue(backend, path)
+        return queue
+
+
+@atexit.register
+def _close_queues():
+    # Commit what is queued on a normal exit; anything left is replayed next time
+    with _queues_lock:
+        queues = list(_queues.values())
+    for queue in queues:
+        queue.close()
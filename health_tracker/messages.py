@@ -0,0 +1,234 @@
+"""Doctor-patient messages and appointment requests.
+
+A patient sends a doctor a message or an appointment request, with a
+snapshot of their recent metrics (progress summary and latest readings)
+attached as JSON.  Each doctor has an inbox:
+
+* messages are ``unread`` until the doctor opens them, then ``read``,
+  ``replied`` (for appointments, with the confirmed time) or ``closed``;
+* inbox pages are keyset paginated on the ``(doctor_id, status, created_at)``
+  index, newest first, so a page costs the same however full the inbox is;
+  a page across several statuses merges one short range scan per status;
+* unread and total counts are kept per doctor in ``inbox_counts`` and
+  updated in the same transaction as the messages, so opening the inbox
+  never counts rows.
+
+Patients page through what they sent (with the doctors' replies) on the
+``(user_id, created_at)`` index.  To rebuild the counts from the messages::
+
+    python -m health_tracker.messages recount [--db URL]
+"""
+import argparse
+import heapq
+import json
+import sys
+from collections import namedtuple
+from datetime import datetime
+
+from health_tracker.history import fetch_page as fetch_history_page
+from health_tracker.summaries import load_summary
+from health_tracker.validation import blood_pressure_category
+
+KINDS = ("message", "appointment")
+STATUSES = ("unread", "read", "replied", "closed")
+OPEN_STATUSES = ("unread", "read", "replied")  # Shown in the inbox unless asked for closed ones
+PAGE_SIZE = 10  # Messages per inbox page
+MAX_BODY = 2000  # Characters per message or reply
+SNAPSHOT_READINGS = 5  # Latest readings attached to a request
+
+Message = namedtuple("Message", [
+    "id", "doctor_id", "doctor_name", "user_id", "username", "kind", "status", "body", "requested_at",
+    "reply", "appointment_at", "created_at", "snapshot",
+])
+
+SELECT_MESSAGES = (
+    "SELECT m.id, m.doctor_id, d.name, m.user_id, u.username, m.kind, m.status, m.body, m.requested_at, "
+    "m.reply, m.appointment_at, m.created_at, {snapshot} "
+    "FROM messages m JOIN users u ON u.id = m.user_id JOIN doctors d ON d.id = m.doctor_id"
+)
+
+
+class MessagePage(namedtuple("MessagePage", ["rows", "has_more"])):
+    """One page of messages, newest first (snapshots are not loaded)."""
+
+    __slots__ = ()
+
+    @property
+    def last_key(self):
+        # Key of the oldest row, used to fetch the next page; None for an empty page
+        if not self.rows:
+            return None
+        row = self.rows[-1]
+        return (row.created_at, row.id)
+
+
+def _now():
+    return datetime.now().replace(microsecond=0)
+
+
+def _text(text, what):
+    text = (text or "").strip()
+    if not text:
+        raise ValueError(f"{what} cannot be empty!")
+    if len(text) > MAX_BODY:
+        raise ValueError(f"{what} is too long (at most {MAX_BODY} characters)!")
+    return text
+
+
+def metrics_snapshot(db, user_id, today=None):
+    """Recent metrics of a user as a JSON-ready dict, or None without readings."""
+    summary = load_summary(db, user_id)
+    if not summary or not summary.readings:
+        return None
+    latest = {
+        "date_logged": summary.latest_logged.isoformat(" "),
+        "weight": summary.latest_weight,
+        "blood_pressure": f"{summary.latest_systolic}/{summary.latest_diastolic}",
+        "steps": summary.latest_steps,
+    }
+    if summary.latest_systolic is not None and summary.latest_diastolic is not None:
+        latest["bp_category"] = blood_pressure_category(summary.latest_systolic, summary.latest_diastolic)
+    snapshot = {"readings": summary.readings, "latest": latest, "bp_categories": summary.bp_counts}
+    for days in (7, 30):
+        count, weight, steps = summary.window(days, today)
+        if count:
+            snapshot[f"last_{days}_days"] = {"readings": count, "weight": round(weight, 1), "steps": round(steps)}
+    snapshot["recent"] = [
+        {"date_logged": row.date_logged.isoformat(" "), "weight": row.weight,
+         "blood_pressure": row.blood_pressure, "steps": row.steps}
+        for row in fetch_history_page(db, user_id, page_size=SNAPSHOT_READINGS).rows
+    ]
+    return snapshot
+
+
+def _count(tx, doctor_id, unread, total):
+    # Counter row first (ignored when it exists), so concurrent senders only ever update it
+    ignore = "INSERT IGNORE" if tx.dialect == "mysql" else "INSERT OR IGNORE"
+    tx.execute(f"{ignore} INTO inbox_counts (doctor_id, unread, total) VALUES (%s, 0, 0)", (doctor_id,))
+    tx.execute("UPDATE inbox_counts SET unread = unread + %s, total = total + %s WHERE doctor_id = %s",
+               (unread, total, doctor_id))
+
+
+def send(db, user_id, doctor_id, body, kind="message", requested_at=None, snapshot=None):
+    """Store a patient's message or appointment request; returns its id.
+
+    Raises ValueError for an empty or overlong body or an unknown kind.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown request kind: {kind}")
+    body = _text(body, "Message")
+    with db.transaction() as tx:
+        message_id = tx.execute(
+            "INSERT INTO messages (doctor_id, user_id, kind, status, body, snapshot, requested_at, created_at) "
+            "VALUES (%s, %s, %s, 'unread', %s, %s, %s, %s)",
+            (doctor_id, user_id, kind, body, json.dumps(snapshot) if snapshot else None, requested_at, _now()),
+        ).lastrowid
+        _count(tx, doctor_id, 1, 1)
+    return message_id
+
+
+def _page(db, where, params, before, page_size):
+    if before is not None:
+        where += " AND (m.created_at < %s OR (m.created_at = %s AND m.id < %s))"
+        params = params + [before[0], before[0], before[1]]
+    rows = db.fetchall(
+        SELECT_MESSAGES.format(snapshot="NULL") +
+        f" WHERE {where} ORDER BY m.created_at DESC, m.id DESC LIMIT {int(page_size) + 1}",
+        params,
+    )
+    return [Message(*row) for row in rows]
+
+
+def inbox_page(db, doctor_id, statuses=OPEN_STATUSES, before=None, page_size=PAGE_SIZE):
+    """One MessagePage of a doctor's inbox; before is the last_key of the previous page."""
+    # One range scan per status on (doctor_id, status, created_at), merged newest first
+    runs = [_page(db, "m.doctor_id = %s AND m.status = %s", [doctor_id, status], before, page_size)
+            for status in statuses]
+    rows = list(heapq.merge(*runs, key=lambda row: (row.created_at, row.id), reverse=True))[:page_size + 1]
+    return MessagePage(rows[:page_size], len(rows) > page_size)
+
+
+def sent_page(db, user_id, before=None, page_size=PAGE_SIZE):
+    """One MessagePage of what a patient sent, with the doctors' replies."""
+    rows = _page(db, "m.user_id = %s", [user_id], before, page_size)
+    return MessagePage(rows[:page_size], len(rows) > page_size)
+
+
+def _mark_read(tx, doctor_id, message_id):
+    # Only the transition out of unread changes the count, however often a message is opened
+    if tx.execute("UPDATE messages SET status = 'read', updated_at = %s "
+                  "WHERE id = %s AND doctor_id = %s AND status = 'unread'",
+                  (_now(), message_id, doctor_id)).rowcount:
+        _count(tx, doctor_id, -1, 0)
+
+
+def open_message(db, doctor_id, message_id):
+    """A message of the doctor's inbox with its snapshot (marked read), or None."""
+    with db.transaction() as tx:
+        _mark_read(tx, doctor_id, message_id)
+        row = tx.fetchone(SELECT_MESSAGES.format(snapshot="m.snapshot") + " WHERE m.id = %s AND m.doctor_id = %s",
+                          (message_id, doctor_id))
+    if row is None:
+        return None
+    message = Message(*row)
+    return message._replace(snapshot=json.loads(message.snapshot) if message.snapshot else None)
+
+
+def _set_status(db, doctor_id, message_id, status, reply=None, appointment_at=None):
+    with db.transaction() as tx:
+        _mark_read(tx, doctor_id, message_id)
+        assignments, params = "status = %s, updated_at = %s", [status, _now()]
+        if reply is not None:
+            assignments += ", reply = %s, appointment_at = %s"
+            params += [reply, appointment_at]
+        return tx.execute(f"UPDATE messages SET {assignments} WHERE id = %s AND doctor_id = %s AND status <> 'closed'",
+                          params + [message_id, doctor_id]).rowcount > 0
+
+
+def reply(db, doctor_id, message_id, text, appointment_at=None):
+    """Answer a message (confirming appointment_at for appointments); False if it is unknown or closed.
+
+    Raises ValueError for an empty or overlong reply or an appointment time that has passed.
+    """
+    text = _text(text, "Reply")
+    if appointment_at is not None and appointment_at <= _now():
+        raise ValueError("The appointment time must be in the future!")
+    return _set_status(db, doctor_id, message_id, "replied", text, appointment_at)
+
+
+def close(db, doctor_id, message_id):
+    """Close a message; False if it is unknown or already closed."""
+    return _set_status(db, doctor_id, message_id, "closed")
+
+
+def inbox_counts(db, doctor_id):
+    """Return (unread, total) messages of a doctor from the counters."""
+    row = db.fetchone("SELECT unread, total FROM inbox_counts WHERE doctor_id = %s", (doctor_id,))
+    return tuple(row) if row else (0, 0)
+
+
+def recount(backend):
+    """Rebuild every doctor's counters from the messages; returns the number of doctors."""
+    with backend.transaction() as tx:
+        rows = tx.fetchall("SELECT doctor_id, SUM(CASE WHEN status = 'unread' THEN 1 ELSE 0 END), COUNT(*) "
+                           "FROM messages GROUP BY doctor_id")
+        tx.execute("DELETE FROM inbox_counts")
+        if rows:
+            tx.executemany("INSERT INTO inbox_counts (doctor_id, unread, total) VALUES (%s, %s, %s)", rows)
+    return len(rows)
+
+
+def main(argv=None):
+    from health_tracker.storage import get_backend
+
+    parser = argparse.ArgumentParser(description="Maintain the doctors' message inboxes.")
+    parser.add_argument("command", choices=["recount"])
+    parser.add_argument("--db", help="database URL (default: HEALTH_TRACKER_DB)")
+    args = parser.parse_args(argv)
+
+    print(f"Recounted the inboxes of {recount(get_backend(args.db))} doctors.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""Opt-in instrumentation of the tracker's hot paths.
+
+When enabled, the registry keeps:
+
+* a latency histogram per operation (log_health_metrics,
+  display_health_history, login_user, table rendering in the menus, ...);
+* a latency histogram and a rows-returned count per SQL statement, keyed by
+  the statement text with numbers and placeholder lists collapsed;
+* plain event counters (readings logged, failed logins).
+
+Everything is exported in the Prometheus text format, to a file rewritten
+every FLUSH_INTERVAL seconds and at exit, or from the service's
+``GET /metrics`` endpoint.  Metrics are turned on with ``--metrics FILE``
+on the command line or ``HEALTH_TRACKER_METRICS=FILE`` in the environment.
+While disabled, every hook is a single check of the module-level ENABLED
+flag.
+
+``--profile FILE`` captures one whole session with cProfile instead; read
+it with ``python -m pstats FILE``.
+"""
+import atexit
+import contextlib
+import functools
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+
+ENABLED = False  # Checked by every hook; flipped by enable()
+FLUSH_INTERVAL = 10.0  # Seconds between rewrites of the metrics file
+# Upper bounds of the latency buckets, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+MAX_STATEMENTS = 1000  # Distinct SQL labels kept before new ones are grouped as "other"
+
+_NUMBERS = re.compile(r"\b\d+\b")
+_PLACEHOLDER_LIST = re.compile(r"%s(?:\s*,\s*%s)+")
+_SPACES = re.compile(r"\s+")
+
+
+class Histogram:
+    """Counts of observations per latency bucket, plus their sum."""
+
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class Registry:
+    """Operation and query histograms and event counters of one process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.operations = {}  # Operation name -> Histogram
+        self.queries = {}  # Statement label -> Histogram
+        self.rows = {}  # Statement label -> rows returned
+        self.events = {}  # Event name -> count
+        self._labels = {}  # Raw SQL -> statement label
+
+    def statement(self, sql):
+        """Label of a SQL statement: whitespace, numbers and %s lists collapsed."""
+        label = self._labels.get(sql)
+        if label is None:
+            label = _SPACES.sub(" ", sql).strip()
+            label = _PLACEHOLDER_LIST.sub("%s, ...", _NUMBERS.sub("?", label))
+            if len(self._labels) < MAX_STATEMENTS:
+                self._labels[sql] = label
+            elif label not in self.queries:
+                label = "other"
+        return label
+
+    def observe_operation(self, name, seconds):
+        with self._lock:
+            histogram = self.operations.get(name)
+            if histogram is None:
+                histogram = self.operations[name] = Histogram()
+            histogram.observe(seconds)
+
+    def observe_query(self, sql, seconds, rows=None):
+        label = self.statement(sql)
+        with self._lock:
+            histogram = self.queries.get(label)
+            if histogram is None:
+                histogram = self.queries[label] = Histogram()
+            histogram.observe(seconds)
+            if rows is not None:
+                self.rows[label] = self.rows.get(label, 0) + rows
+
+    def increment(self, event, amount=1):
+        with self._lock:
+            self.events[event] = self.events.get(event, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self.operations, self.queries, self.rows, self.events = {}, {}, {}, {}
+
+    def render(self):
+        """The registry in the Prometheus text exposition format."""
+        with self._lock:
+            lines = []
+            _histograms(lines, "health_tracker_operation_seconds", "Latency of tracker operations.",
+                        "operation", self.operations)
+            _histograms(lines, "health_tracker_query_seconds", "Latency of SQL statements.",
+                        "statement", self.queries)
+            lines.append("# HELP health_tracker_query_rows_total Rows returned by SQL statements.")
+            lines.append("# TYPE health_tracker_query_rows_total counter")
+            for label, rows in sorted(self.rows.items()):
+                lines.append(f'health_tracker_query_rows_total{{statement="{_escape(label)}"}} {rows}')
+            lines.append("# HELP health_tracker_events_total Tracker events.")
+            lines.append("# TYPE health_tracker_events_total counter")
+            for event, count in sorted(self.events.items()):
+                lines.append(f'health_tracker_events_total{{event="{_escape(event)}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Replace the file at path with the rendered metrics."""
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as handle:
+            handle.write(self.render())
+        os.replace(temporary, path)  # Readers never see a half-written file
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histograms(lines, metric, help_text, label, histograms):
+    lines.append(f"# HELP {metric} {help_text}")
+    lines.append(f"# TYPE {metric} histogram")
+    for name, histogram in sorted(histograms.items()):
+        key = f'{label}="{_escape(name)}"'
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), histogram.counts):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{{key},le="{bound}"}} {cumulative}')
+        lines.append(f"{metric}_sum{{{key}}} {histogram.total:.6f}")
+        lines.append(f"{metric}_count{{{key}}} {histogram.count}")
+
+
+_registry = Registry()
+_flusher = None
+
+
+def registry():
+    """Return the process-wide metrics registry."""
+    return _registry
+
+
+def enable(path=None, interval=FLUSH_INTERVAL):
+    """Start collecting; with a path, the metrics are written there periodically and at exit."""
+    global ENABLED, _flusher
+    ENABLED = True
+    if path and _flusher is None:
+        stop = threading.Event()
+
+        def flush():
+            while not stop.wait(interval):
+                _registry.write(path)
+
+        _flusher = threading.Thread(target=flush, name="health-metrics", daemon=True)
+        _flusher.start()
+        atexit.register(lambda: (stop.set(), _registry.write(path)))
+
+
+def timed(name):
+    """Context manager recording the duration of a block as operation `name`."""
+    if not ENABLED:
+        return contextlib.nullcontext()
+    return _timer(name)
+
+
+@contextlib.contextmanager
+def _timer(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _registry.observe_operation(name, time.perf_counter() - started)
+
+
+def instrumented(name):
+    """Decorator recording every call of a function as operation `name`."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return function(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _registry.observe_operation(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+def increment(event, amount=1):
+    """Count an event (no-op while disabled)."""
+    if ENABLED:
+        _registry.increment(event, amount)
+
+
+def profiled(path):
+    """Context manager capturing the block with cProfile into path (no-op without a path)."""
+    if not path:
+        return contextlib.nullcontext()
+    return _profile(path)
+
+
+@contextlib.contextmanager
+def _profile(path):
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+if os.environ.get("HEALTH_TRACKER_METRICS"):
+    enable(os.environ["HEALTH_TRACKER_METRICS"])
@@ -0,0 +1,277 @@
+"""Versioned schema migrations for MySQL and the embedded SQLite engine.
+
+Applied versions are recorded in the ``schema_migrations`` table; running
+the migrations again only applies the ones that are missing.  Every
+migration also checks what already exists, so databases created by hand
+from the old README schema are upgraded in place.
+
+Usage::
+
+    python -m health_tracker.migrations [--db URL]
+"""
+import argparse
+from collections import namedtuple
+
+Migration = namedtuple("Migration", ["version", "name", "apply"])
+
+MIGRATIONS = []  # Applied in version order
+
+
+def migration(version, name):
+    """Register a function(tx, dialect) as a schema migration."""
+    def register(apply):
+        MIGRATIONS.append(Migration(version, name, apply))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return apply
+    return register
+
+
+VERSION_TABLE = {
+    "mysql": """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+    "sqlite": """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+}
+
+
+def index_exists(tx, dialect, table, index):
+    if dialect == "sqlite":
+        row = tx.fetchone("SELECT 1 FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name = %s",
+                          (table, index))
+    else:
+        row = tx.fetchone("SELECT 1 FROM information_schema.statistics "
+                          "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1",
+                          (table, index))
+    return row is not None
+
+
+def column_exists(tx, dialect, table, column):
+    if dialect == "sqlite":
+        return any(row[1] == column for row in tx.fetchall(f"PRAGMA table_info({table})"))
+    row = tx.fetchone("SELECT 1 FROM information_schema.columns "
+                      "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+                      (table, column))
+    return row is not None
+
+
+def create_index(tx, dialect, table, index, columns):
+    """Create an index unless one with that name already exists."""
+    if not index_exists(tx, dialect, table, index):
+        tx.execute(f"CREATE INDEX {index} ON {table} ({columns})")
+
+
+@migration(1, "create users, doctors and health_data tables")
+def create_base_tables(tx, dialect):
+    key = "INT AUTO_INCREMENT PRIMARY KEY" if dialect == "mysql" else "INTEGER PRIMARY KEY AUTOINCREMENT"
+    tx.execute(f"""
+        CREATE TABLE IF NOT EXISTS users (
+            id {key},
+            username VARCHAR(255) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL
+        )""")
+    tx.execute(f"""
+        CREATE TABLE IF NOT EXISTS doctors (
+            id {key},
+            name VARCHAR(255) NOT NULL,
+            specialty VARCHAR(255) NOT NULL,
+            email VARCHAR(255),
+            phone VARCHAR(20),
+            username VARCHAR(255) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL
+        )""")
+    tx.execute(f"""
+        CREATE TABLE IF NOT EXISTS health_data (
+            id {key},
+            user_id INT,
+            weight FLOAT,
+            blood_pressure VARCHAR(10),
+            steps INT,
+            date_logged TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )""")
+
+
+@migration(2, "index health_data by user and date")
+def index_health_history(tx, dialect):
+    # Serves the history pages ordered by (date_logged, id); both engines append the primary key
+    create_index(tx, dialect, "health_data", "idx_health_data_user_date", "user_id, date_logged")
+
+
+@migration(3, "split blood_pressure into systolic and diastolic")
+def split_blood_pressure(tx, dialect):
+    for column in ("systolic", "diastolic"):
+        if not column_exists(tx, dialect, "health_data", column):
+            tx.execute(f"ALTER TABLE health_data ADD COLUMN {column} SMALLINT")
+
+    # Fill the new columns from the existing '120/80' strings
+    if dialect == "mysql":
+        systolic = "SUBSTRING_INDEX(blood_pressure, '/', 1)"
+        diastolic = "SUBSTRING_INDEX(blood_pressure, '/', -1)"
+        integer = "SIGNED"
+    else:
+        systolic = "substr(blood_pressure, 1, instr(blood_pressure, '/') - 1)"
+        diastolic = "substr(blood_pressure, instr(blood_pressure, '/') + 1)"
+        integer = "INTEGER"
+    tx.execute(f"""
+        UPDATE health_data
+        SET systolic = CAST(TRIM({systolic}) AS {integer}),
+            diastolic = CAST(TRIM({diastolic}) AS {integer})
+        WHERE systolic IS NULL AND blood_pressure LIKE '%/%'""")
+
+
+@migration(4, "create health_summaries")
+def create_health_summaries(tx, dialect):
+    # One row per user, maintained by health_tracker.summaries
+    tx.execute("""
+        CREATE TABLE IF NOT EXISTS health_summaries (
+            user_id INT PRIMARY KEY,
+            readings INT NOT NULL DEFAULT 0,
+            first_logged TIMESTAMP NULL,
+            latest_id INT,
+            latest_logged TIMESTAMP NULL,
+            latest_weight FLOAT,
+            latest_systolic SMALLINT,
+            latest_diastolic SMALLINT,
+            latest_steps INT,
+            weight_sum DOUBLE,
+            weight_min FLOAT,
+            weight_max FLOAT,
+            steps_sum BIGINT,
+            steps_min INT,
+            steps_max INT,
+            current_streak INT,
+            longest_streak INT,
+            last_day INT,
+            bp_normal INT,
+            bp_elevated INT,
+            bp_stage1 INT,
+            bp_stage2 INT,
+            recent_days TEXT,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )""")
+
+
+@migration(5, "create ingest_checkpoints")
+def create_ingest_checkpoints(tx, dialect):
+    # Last write-ahead log record committed per log, maintained by health_tracker.ingest
+    tx.execute("""
+        CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+            wal_id VARCHAR(64) PRIMARY KEY,
+            last_seq BIGINT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""")
+
+
+@migration(6, "create alerts and per-user baselines")
+def create_alerts(tx, dialect):
+    # Rolling (EWMA) baselines the anomaly detector compares new readings with
+    for column in ("weight_ewma", "weight_ewvar", "steps_ewma", "steps_ewvar"):
+        if not column_exists(tx, dialect, "health_summaries", column):
+            tx.execute(f"ALTER TABLE health_summaries ADD COLUMN {column} DOUBLE")
+
+    key = "INT AUTO_INCREMENT PRIMARY KEY" if dialect == "mysql" else "INTEGER PRIMARY KEY AUTOINCREMENT"
+    tx.execute(f"""
+        CREATE TABLE IF NOT EXISTS alerts (
+            id {key},
+            user_id INT NOT NULL,
+            reading_id INT NOT NULL,
+            kind VARCHAR(32) NOT NULL,
+            severity VARCHAR(16) NOT NULL,
+            specialty VARCHAR(255) NOT NULL,
+            message VARCHAR(255) NOT NULL,
+            value DOUBLE,
+            baseline DOUBLE,
+            zscore DOUBLE,
+            date_logged TIMESTAMP NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (reading_id, kind),
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )""")
+    # Doctors page through the alerts of their specialty, newest first
+    create_index(tx, dialect, "alerts", "idx_alerts_specialty_date", "specialty, date_logged")
+
+
+@migration(7, "create messages and inbox counts")
+def create_messages(tx, dialect):
+    # Patient messages and appointment requests to doctors, maintained by health_tracker.messages
+    key = "INT AUTO_INCREMENT PRIMARY KEY" if dialect == "mysql" else "INTEGER PRIMARY KEY AUTOINCREMENT"
+    tx.execute(f"""
+        CREATE TABLE IF NOT EXISTS messages (
+            id {key},
+            doctor_id INT NOT NULL,
+            user_id INT NOT NULL,
+            kind VARCHAR(16) NOT NULL,
+            status VARCHAR(16) NOT NULL,
+            body TEXT NOT NULL,
+            snapshot TEXT,
+            requested_at TIMESTAMP NULL,
+            reply TEXT,
+            appointment_at TIMESTAMP NULL,
+            created_at TIMESTAMP NOT NULL,
+            updated_at TIMESTAMP NULL,
+            FOREIGN KEY (doctor_id) REFERENCES doctors(id),
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )""")
+    # Inbox pages per status, newest first; both engines append the primary key for the tie-break
+    create_index(tx, dialect, "messages", "idx_messages_inbox", "doctor_id, status, created_at")
+    # A patient's sent messages, newest first
+    create_index(tx, dialect, "messages", "idx_messages_user", "user_id, created_at")
+    # Unread and total messages per doctor, updated with every message
+    tx.execute("""
+        CREATE TABLE IF NOT EXISTS inbox_counts (
+            doctor_id INT PRIMARY KEY,
+            unread INT NOT NULL DEFAULT 0,
+            total INT NOT NULL DEFAULT 0
+        )""")
+
+
+def applied_versions(backend):
+    """Return the set of migration versions already applied."""
+    with backend.transaction() as tx:
+        tx.execute(VERSION_TABLE[backend.name])
+        return {row[0] for row in tx.fetchall("SELECT version FROM schema_migrations")}
+
+
+def migrate(backend, target=None):
+    """Apply every pending migration (up to target); returns the versions applied.
+
+    Each migration runs in its own transaction.  MySQL commits DDL
+    implicitly, which is why the migrations check for existing objects.
+    """
+    done = applied_versions(backend)
+    applied = []
+    for step in MIGRATIONS:
+        if step.version in done or (target is not None and step.version > target):
+            continue
+        with backend.transaction() as tx:
+            step.apply(tx, backend.name)
+            tx.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (step.version, step.name))
+        applied.append(step.version)
+    return applied
+
+
+def main(argv=None):
+    from health_tracker.storage import create_backend, database_url
+
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations.")
+    parser.add_argument("--db", help="database URL (default: HEALTH_TRACKER_DB)")
+    parser.add_argument("--target", type=int, help="stop after this version")
+    args = parser.parse_args(argv)
+
+    backend = create_backend(database_url(args.db), migrate=False)
+    applied = migrate(backend, args.target)
+    versions = applied_versions(backend)
+    print(f"Schema at version {max(versions, default=0)}"
+          + (f" (applied {', '.join(map(str, applied))})." if applied else "."))
+
+
+if __name__ == "__main__":
+    main()
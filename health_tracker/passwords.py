@@ -0,0 +1,85 @@
+"""Salted scrypt password hashes with tunable cost.
+
+Hashes are stored as ``scrypt$<n>$<r>$<p>$<salt>$<hash>`` (base64 salt and
+hash) so the cost can be raised later: a password verified against a hash
+made with other parameters, or against a legacy unsalted sha256 hex digest,
+is reported as needing an upgrade and is rehashed on login.
+
+The cost defaults to n=2**14, r=8, p=1 (16 MiB and roughly 50 ms per hash)
+and can be tuned with ``HEALTH_TRACKER_SCRYPT_N``, ``_R`` and ``_P``; measure
+candidates with ``python benchmarks/bench_passwords.py``.  Hashing runs on a
+small worker pool (one thread per CPU; hashlib.scrypt releases the GIL), so
+a burst of logins cannot use more memory and CPU than that at once.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import re
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+SCRYPT_N = int(os.environ.get("HEALTH_TRACKER_SCRYPT_N", 2 ** 14))  # CPU/memory cost, a power of 2
+SCRYPT_R = int(os.environ.get("HEALTH_TRACKER_SCRYPT_R", 8))  # Block size
+SCRYPT_P = int(os.environ.get("HEALTH_TRACKER_SCRYPT_P", 1))  # Parallelism
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+_LEGACY_SHA256 = re.compile(r"[0-9a-f]{64}")
+
+
+def _scrypt(password, salt, n, r, p):
+    # maxmem must cover the 128 * n * r * p bytes scrypt needs
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, dklen=HASH_BYTES,
+                          maxmem=128 * n * r * p + 2 ** 20)
+
+
+def hash_password(password, n=None, r=None, p=None):
+    """Return the scrypt hash string of a password, with a fresh random salt."""
+    n, r, p = n or SCRYPT_N, r or SCRYPT_R, p or SCRYPT_P
+    salt = secrets.token_bytes(SALT_BYTES)
+    digest = _scrypt(password, salt, n, r, p)
+    return "$".join(["scrypt", str(n), str(r), str(p),
+                     base64.b64encode(salt).decode(), base64.b64encode(digest).decode()])
+
+
+def verify_password(password, stored):
+    """Check a password against a stored hash; returns (matches, needs upgrade)."""
+    if _LEGACY_SHA256.fullmatch(stored or ""):
+        # Unsalted sha256 digest written by earlier versions
+        matches = hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+        return matches, matches
+    try:
+        scheme, n, r, p, salt, digest = stored.split("$")
+        n, r, p = int(n), int(r), int(p)
+        salt, digest = base64.b64decode(salt), base64.b64decode(digest)
+    except (AttributeError, ValueError):
+        return False, False
+    if scheme != "scrypt":
+        return False, False
+    matches = hmac.compare_digest(_scrypt(password, salt, n, r, p), digest)
+    return matches, matches and (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def hash_pool():
+    """Process-wide worker pool that runs the password hashing."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="password-hash")
+        return _pool
+
+
+def hash_password_async(password):
+    """Future of hash_password(password) computed on the worker pool."""
+    return hash_pool().submit(hash_password, password)
+
+
+def verify_password_async(password, stored):
+    """Future of verify_password(password, stored) computed on the worker pool."""
+    return hash_pool().submit(verify_password, password, stored)
@@ -0,0 +1,94 @@
+"""In-memory token buckets for throttling login attempts.
+
+Each failed login takes a token from the bucket of the username and from the
+bucket of the source (client address) it came from; a bucket refills at a
+steady rate up to its burst size.  While either bucket is empty, further
+attempts are refused with the number of seconds to wait, without sleeping
+or tying up the process.  Buckets that have refilled completely are
+forgotten, so memory only holds recent offenders.
+"""
+import threading
+import time
+
+USER_BURST = 5  # Failed attempts allowed per username before throttling
+USER_REFILL = 1 / 30.0  # Attempts regained per second (one every 30 s)
+SOURCE_BURST = 20  # Failed attempts allowed per client address
+SOURCE_REFILL = 1 / 3.0
+MAX_BUCKETS = 100000  # Buckets kept per limiter before full ones are swept
+
+
+class RateLimiter:
+    """Token buckets keyed by an arbitrary hashable key."""
+
+    def __init__(self, burst, refill, max_buckets=MAX_BUCKETS, clock=time.monotonic):
+        self.burst = burst
+        self.refill = refill
+        self.max_buckets = max_buckets
+        self._clock = clock
+        self._buckets = {}  # key -> [tokens, last update]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _tokens(self, key, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return self.burst
+        return min(self.burst, bucket[0] + (now - bucket[1]) * self.refill)
+
+    def retry_after(self, key):
+        """Seconds until key has a token again (0 if it has one now)."""
+        with self._lock:
+            tokens = self._tokens(key, self._clock())
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.refill
+
+    def consume(self, key):
+        """Take one token from key's bucket (it may go empty, never negative)."""
+        with self._lock:
+            now = self._clock()
+            if key not in self._buckets and len(self._buckets) >= self.max_buckets:
+                self._sweep(now)
+            self._buckets[key] = [max(0.0, self._tokens(key, now) - 1), now]
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def _sweep(self, now):
+        # Forget refilled buckets, then the oldest ones if that was not enough
+        for key in [key for key in self._buckets if self._tokens(key, now) >= self.burst]:
+            del self._buckets[key]
+        while len(self._buckets) >= self.max_buckets:
+            del self._buckets[next(iter(self._buckets))]
+
+
+class LoginLimiter:
+    """Per-username and per-source limits on failed logins."""
+
+    def __init__(self, clock=time.monotonic):
+        self.users = RateLimiter(USER_BURST, USER_REFILL, clock=clock)
+        self.sources = RateLimiter(SOURCE_BURST, SOURCE_REFILL, clock=clock)
+
+    def retry_after(self, username, source=None):
+        """Seconds the caller must wait before trying this login again (0 if allowed)."""
+        wait = self.users.retry_after(username)
+        if source is not None:
+            wait = max(wait, self.sources.retry_after(source))
+        return wait
+
+    def failed(self, username, source=None):
+        self.users.consume(username)
+        if source is not None:
+            self.sources.consume(source)
+
+    def succeeded(self, username):
+        self.users.reset(username)
+
+
+_login_limiter = LoginLimiter()
+
+
+def login_limiter():
+    """The process-wide login limiter."""
+    return _login_limiter
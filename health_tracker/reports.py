@@ -0,0 +1,372 @@
+"""Patient and cohort reports streamed straight to CSV, JSON Lines, text or HTML.
+
+A report lists a patient's readings newest first, then monthly trends
+(readings and mean weight, blood pressure and steps per month) and blood
+pressure category counts.  Readings are pulled one history page at a time
+(health_tracker.history.iter_history, archived rows included) and written as
+they arrive, so memory stays constant however long the history is; only
+the per-month totals are kept until the end of each patient.
+
+Formats:
+
+* ``csv`` / ``jsonl`` - one record per reading, month, category and patient
+  total, with a ``record`` field saying which;
+* ``text`` - fixed-width grid tables, the same renderer the history menu uses;
+* ``html`` - a self-contained page with print styles, ready to save as PDF.
+
+Cohort reports split the users into id ranges rendered by a pool of worker
+processes into part files, which are then joined in user id order::
+
+    python -m health_tracker.reports patient alice --format html --out alice.html
+    python -m health_tracker.reports cohort --format csv --out cohort.csv [--workers 4]
+"""
+import argparse
+import csv
+import html
+import json
+import os
+import sys
+from datetime import datetime
+
+from health_tracker.history import format_rows, iter_history
+from health_tracker.validation import BP_CATEGORIES, blood_pressure_category
+
+FORMATS = ("csv", "jsonl", "text", "html")
+COPY_BUFFER = 1024 * 1024  # Bytes per read when joining part files
+
+CSV_FIELDS = ["record", "username", "period", "readings", "weight", "systolic", "diastolic", "steps",
+              "bp_category"]
+
+# (header, width) of the history table, shared with the interactive view
+HISTORY_COLUMNS = [("Date of Entry", 19), ("Weight", 10), ("Blood Pressure", 14), ("Steps", 7)]
+TREND_COLUMNS = [("Month", 7), ("Readings", 8), ("Weight", 8), ("Blood Pressure", 14), ("Steps", 7)]
+CATEGORY_COLUMNS = [("Blood Pressure Category", 23), ("Readings", 8)]
+
+
+class TextTable:
+    """A grid table written line by line, so no rows are held to size the columns.
+
+    Columns have fixed widths; longer values widen their own line only.
+    """
+
+    def __init__(self, out, columns, row_lines=True):
+        self.out = out
+        self.widths = [width for _, width in columns]
+        self.row_lines = row_lines  # Rule between rows, like tabulate's "grid"
+        self._rule = "+" + "+".join("-" * (width + 2) for width in self.widths) + "+\n"
+        self._rows = 0
+        self.out.write(self._rule)
+        self._line([header for header, _ in columns])
+        self.out.write(self._rule.replace("-", "="))
+
+    def _line(self, values):
+        self.out.write("| " + " | ".join(str("" if value is None else value).ljust(width)
+                                         for value, width in zip(values, self.widths)) + " |\n")
+
+    def row(self, values):
+        if self._rows and self.row_lines:
+            self.out.write(self._rule)
+        self._line(values)
+        self._rows += 1
+
+    def close(self):
+        self.out.write(self._rule)
+
+
+def write_table(out, columns, rows, row_lines=True):
+    """Stream rows (sequences of values) into a grid table on out."""
+    table = TextTable(out, columns, row_lines)
+    for row in rows:
+        table.row(row)
+    table.close()
+
+
+class PatientStats:
+    """Monthly totals and blood pressure category counts of one patient's readings."""
+
+    def __init__(self):
+        self.months = {}  # "YYYY-MM" -> [readings, weight sum, weights, systolic sum, diastolic sum, bp readings, steps sum, steps]
+        self.categories = dict.fromkeys(BP_CATEGORIES, 0)
+
+    def add(self, date_logged, weight, systolic, diastolic, steps):
+        totals = self.months.get(f"{date_logged:%Y-%m}")
+        if totals is None:
+            totals = self.months[f"{date_logged:%Y-%m}"] = [0, 0.0, 0, 0, 0, 0, 0, 0]
+        totals[0] += 1
+        if weight is not None:
+            totals[1] += weight
+            totals[2] += 1
+        if systolic is not None:
+            totals[3] += systolic
+            totals[4] += diastolic
+            totals[5] += 1
+        if steps is not None:
+            totals[6] += steps
+            totals[7] += 1
+
+    def trends(self):
+        """Yield (period, readings, mean weight, mean systolic, mean diastolic, mean steps), oldest month first,
+        then the patient's totals with period "all"."""
+        overall = [0] * 8
+        for month in sorted(self.months):
+            totals = self.months[month]
+            overall = [a + b for a, b in zip(overall, totals)]
+            yield _means(month, totals)
+        yield _means("all", overall)
+
+
+def _means(period, totals):
+    readings, weight_sum, weights, systolic_sum, diastolic_sum, pressures, steps_sum, steps = totals
+    return (period, readings,
+            round(weight_sum / weights, 1) if weights else None,
+            round(systolic_sum / pressures) if pressures else None,
+            round(diastolic_sum / pressures) if pressures else None,
+            round(steps_sum / steps) if steps else None)
+
+
+class Renderer:
+    """Writes a report; begin and end are called once per output file, the rest per patient."""
+
+    def __init__(self, out):
+        self.out = out
+
+    def begin(self):
+        pass
+
+    def patient(self, username):
+        pass
+
+    def reading(self, username, row, systolic, diastolic, category):
+        raise NotImplementedError
+
+    def summary(self, username, stats):
+        pass
+
+    def end(self):
+        pass
+
+
+class CSVRenderer(Renderer):
+    def __init__(self, out):
+        super().__init__(out)
+        self.writer = csv.writer(out)
+
+    def begin(self):
+        self.writer.writerow(CSV_FIELDS)
+
+    def reading(self, username, row, systolic, diastolic, category):
+        self.writer.writerow(["reading", username, row.date_logged, 1, row.weight, systolic, diastolic, row.steps,
+                              category])
+
+    def summary(self, username, stats):
+        for period, readings, weight, systolic, diastolic, steps in stats.trends():
+            self.writer.writerow(["month" if period != "all" else "total", username, period, readings, weight,
+                                  systolic, diastolic, steps, None])
+        for category, count in stats.categories.items():
+            self.writer.writerow(["category", username, "all", count, None, None, None, None, category])
+
+
+class JSONLinesRenderer(Renderer):
+    def _record(self, **fields):
+        self.out.write(json.dumps(fields, default=str) + "\n")
+
+    def reading(self, username, row, systolic, diastolic, category):
+        self._record(record="reading", username=username, date_logged=row.date_logged, weight=row.weight,
+                     systolic=systolic, diastolic=diastolic, steps=row.steps, bp_category=category)
+
+    def summary(self, username, stats):
+        for period, readings, weight, systolic, diastolic, steps in stats.trends():
+            self._record(record="month" if period != "all" else "total", username=username, period=period,
+                         readings=readings, weight=weight, systolic=systolic, diastolic=diastolic, steps=steps)
+        self._record(record="categories", username=username, counts=stats.categories)
+
+
+class TextRenderer(Renderer):
+    def patient(self, username):
+        self.out.write(f"Health report: {username}\n\nHistory\n")
+        self.table = TextTable(self.out, HISTORY_COLUMNS, row_lines=False)
+
+    def reading(self, username, row, systolic, diastolic, category):
+        self.table.row(next(format_rows((row,))))
+
+    def summary(self, username, stats):
+        self.table.close()
+        self.out.write("\nMonthly trends\n")
+        write_table(self.out, TREND_COLUMNS, (
+            (period, readings, weight, f"{systolic}/{diastolic}" if systolic is not None else None, steps)
+            for period, readings, weight, systolic, diastolic, steps in stats.trends()
+        ), row_lines=False)
+        self.out.write("\nBlood pressure categories\n")
+        write_table(self.out, CATEGORY_COLUMNS, stats.categories.items(), row_lines=False)
+        self.out.write("\n")
+
+
+HTML_HEAD = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Health report</title>
+<style>
+body { font-family: sans-serif; font-size: 11pt; }
+table { border-collapse: collapse; margin-bottom: 1em; }
+th, td { border: 1px solid #999; padding: 2px 8px; text-align: left; }
+section { page-break-after: always; }
+@page { size: A4; margin: 15mm; }
+</style></head><body>
+"""
+
+
+class HTMLRenderer(Renderer):
+    def _row(self, cells, tag="td"):
+        self.out.write("<tr>" + "".join(f"<{tag}>{html.escape(str('' if cell is None else cell))}</{tag}>"
+                                        for cell in cells) + "</tr>\n")
+
+    def _table(self, columns):
+        self.out.write("<table>\n")
+        self._row([header for header, _ in columns], "th")
+
+    def begin(self):
+        self.out.write(HTML_HEAD)
+
+    def patient(self, username):
+        self.out.write(f"<section><h1>Health report: {html.escape(username)}</h1>\n<h2>History</h2>\n")
+        self._table(HISTORY_COLUMNS)
+
+    def reading(self, username, row, systolic, diastolic, category):
+        self._row(next(format_rows((row,))))
+
+    def summary(self, username, stats):
+        self.out.write("</table>\n<h2>Monthly trends</h2>\n")
+        self._table(TREND_COLUMNS)
+        for period, readings, weight, systolic, diastolic, steps in stats.trends():
+            self._row((period, readings, weight, f"{systolic}/{diastolic}" if systolic is not None else None, steps))
+        self.out.write("</table>\n<h2>Blood pressure categories</h2>\n")
+        self._table(CATEGORY_COLUMNS)
+        for row in stats.categories.items():
+            self._row(row)
+        self.out.write("</table></section>\n")
+
+    def end(self):
+        self.out.write("</body></html>\n")
+
+
+RENDERERS = {"csv": CSVRenderer, "jsonl": JSONLinesRenderer, "text": TextRenderer, "html": HTMLRenderer}
+
+
+def render_patient(backend, renderer, user_id, username, start=None, end=None):
+    """Stream one patient's report section; returns the number of readings."""
+    stats = PatientStats()
+    renderer.patient(username)
+    count = 0
+    for row in iter_history(backend, user_id, start=start, end=end):
+        systolic, diastolic = row.systolic, row.diastolic  # Integer columns, not the '120/80' text
+        category = blood_pressure_category(systolic, diastolic) if None not in (systolic, diastolic) else None
+        if category is not None:
+            stats.categories[category] += 1
+        stats.add(row.date_logged, row.weight, systolic, diastolic, row.steps)
+        renderer.reading(username, row, systolic, diastolic, category)
+        count += 1
+    renderer.summary(username, stats)
+    return count
+
+
+def export_patient(backend, username, out, fmt="csv", start=None, end=None):
+    """Write one patient's report to out; returns the number of readings (None for an unknown user)."""
+    user = backend.fetchone("SELECT id FROM users WHERE username = %s", (username,))
+    if user is None:
+        return None
+    renderer = RENDERERS[fmt](out)
+    renderer.begin()
+    count = render_patient(backend, renderer, user[0], username, start, end)
+    renderer.end()
+    return count
+
+
+def _users(backend, first_user, last_user):
+    # Users of a range in id order, a page at a time
+    last_id = first_user - 1
+    while True:
+        rows = backend.fetchall("SELECT id, username FROM users WHERE id > %s AND id <= %s ORDER BY id LIMIT 1000",
+                                (last_id, last_user))
+        yield from rows
+        if len(rows) < 1000:
+            return
+        last_id = rows[-1][0]
+
+
+def _cohort_worker(task):
+    from health_tracker.storage import get_backend
+
+    url, path, fmt, first_user, last_user, start, end = task
+    backend = get_backend(url)
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as out:
+        renderer = RENDERERS[fmt](out)
+        for user_id, username in _users(backend, first_user, last_user):
+            count += render_patient(backend, renderer, user_id, username, start, end)
+    return count
+
+
+def export_cohort(url, path, fmt="csv", workers=None, start=None, end=None):
+    """Write every user's report to path, rendered on several processes; returns the readings written."""
+    import shutil  # Only cohort reports need part files
+    import tempfile
+
+    from health_tracker.storage import get_backend
+    from health_tracker.workers import run_tasks, user_ranges, worker_count
+
+    workers = worker_count(workers)
+    first_user, last_user = get_backend(url).fetchone("SELECT MIN(id), MAX(id) FROM users")
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(path))) as parts_dir:
+        tasks = []
+        if first_user is not None:
+            for number, (lo, hi) in enumerate(user_ranges(first_user, last_user, workers)):
+                tasks.append((url, os.path.join(parts_dir, f"part-{number:05d}"), fmt, lo, hi, start, end))
+        count = sum(run_tasks(_cohort_worker, tasks, workers))
+
+        with open(path, "w", newline="", encoding="utf-8") as out:
+            renderer = RENDERERS[fmt](out)
+            renderer.begin()
+            for task in tasks:
+                with open(task[1], encoding="utf-8") as part:
+                    shutil.copyfileobj(part, out, COPY_BUFFER)
+            renderer.end()
+    return count
+
+
+def main(argv=None):
+    from health_tracker.storage import database_url, get_backend
+
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument("--db", help="database URL (default: HEALTH_TRACKER_DB)")
+    options.add_argument("--format", choices=FORMATS, default="csv")
+    options.add_argument("--out", help="output file (default: stdout for a patient report)")
+    options.add_argument("--start", type=datetime.fromisoformat, help="first day (YYYY-MM-DD)")
+    options.add_argument("--end", type=datetime.fromisoformat, help="last day (YYYY-MM-DD)")
+    parser = argparse.ArgumentParser(description="Export patient or cohort health reports.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    patient = commands.add_parser("patient", parents=[options], help="one patient's report")
+    patient.add_argument("username")
+    cohort = commands.add_parser("cohort", parents=[options], help="every patient's report")
+    cohort.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    if args.command == "cohort":
+        if not args.out:
+            parser.error("cohort reports need --out")
+        count = export_cohort(database_url(args.db), args.out, args.format, args.workers, args.start, args.end)
+        print(f"Exported {count} readings to {args.out}.", file=sys.stderr)
+        return 0
+
+    backend = get_backend(args.db)
+    if args.out:
+        with open(args.out, "w", newline="", encoding="utf-8") as out:
+            count = export_patient(backend, args.username, out, args.format, args.start, args.end)
+    else:
+        count = export_patient(backend, args.username, sys.stdout, args.format, args.start, args.end)
+    if count is None:
+        print(f"Unknown user: {args.username}", file=sys.stderr)
+        return 1
+    print(f"Exported {count} readings.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,396 @@
+"""Asynchronous HTTP/JSON service exposing the tracker to many clients at once.
+
+One asyncio event loop accepts and parses every connection (HTTP/1.1 with
+keep-alive), so thousands of idle or slow devices cost a few kilobytes each.
+Database work runs on a thread pool no larger than the storage backend's
+connection pool, through the same HealthTracker core the menus and the
+headless runner use, so readings and passwords are validated exactly like
+log_health_metrics and validate_password do.
+
+Endpoints (request and response bodies are JSON)::
+
+    POST /register        {"username", "password"}  (+ "specialty", "name", "email", "phone" for doctors)
+    POST /login           {"username", "password"}  -> {"token": ...}
+    POST /logout
+    POST /readings        {"weight", "blood_pressure", "steps"}
+    GET  /history         ?size=N&from=YYYY-MM-DD&to=YYYY-MM-DD&older=KEY
+    GET  /doctors         ?name=PREFIX&specialty=NAME&page=N&size=N
+    GET  /doctors/ID
+    POST /messages        {"doctor_id", "text"}  (+ "appointment_at": "YYYY-MM-DDTHH:MM" to request one)
+    GET  /messages        ?size=N&older=KEY
+    GET  /inbox           ?status=unread,read,replied,closed&size=N&older=KEY
+    GET  /inbox/ID        the message with its metrics snapshot, now marked read
+    POST /inbox/ID/reply  {"text"}  (+ "appointment_at" to confirm an appointment)
+    POST /inbox/ID/close
+    GET  /metrics         Prometheus text, when started with --metrics
+
+Everything but /register, /login and /doctors needs an
+``Authorization: Bearer <token>`` header from /login; /inbox is for doctors.
+``size`` is at most 100 (headless.MAX_PAGE_SIZE).  Every response is
+``{"ok", "message", "data"}``, with status 500 for unexpected errors.
+
+Usage::
+
+    python -m health_tracker.service [--host 127.0.0.1] [--port 8080] [--db URL] [--metrics [FILE]]
+"""
+import argparse
+import asyncio
+import json
+import secrets
+import sys
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+from health_tracker import metrics
+from health_tracker.core import HealthTracker
+from health_tracker.headless import (
+    CommandError, close_result, doctor_result, doctors_result, history_result, inbox_result, message_result,
+    messages_result, reply_result, send_result,
+)
+from health_tracker.ratelimit import login_limiter
+from health_tracker.storage import StorageError, get_backend
+
+MAX_HEADER_BYTES = 16 * 1024  # Request line plus headers
+MAX_BODY_BYTES = 64 * 1024
+IDLE_TIMEOUT = 60.0  # Seconds a keep-alive connection may wait for its next request
+SESSION_TTL = 8 * 3600.0  # Seconds a login token stays valid without use
+MAX_SESSIONS = 100000
+PROMETHEUS_TYPE = "text/plain; version=0.0.4"
+
+
+class HTTPError(Exception):
+    """Ends a request with an error status and message."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class SessionStore:
+    """Login tokens -> logged-in HealthTracker, expired after SESSION_TTL idle seconds.
+
+    Only touched from the event loop thread, so it needs no lock.
+    """
+
+    def __init__(self, ttl=SESSION_TTL, max_sessions=MAX_SESSIONS, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._clock = clock
+        # token -> [tracker, expires at], least recently used first (so also soonest to expire first)
+        self._sessions = OrderedDict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def create(self, tracker):
+        self._evict()
+        token = secrets.token_urlsafe(32)
+        self._sessions[token] = [tracker, self._clock() + self.ttl]
+        return token
+
+    def get(self, token):
+        entry = self._sessions.get(token)
+        if entry is None:
+            return None
+        now = self._clock()
+        if entry[1] <= now:
+            del self._sessions[token]
+            return None
+        entry[1] = now + self.ttl
+        self._sessions.move_to_end(token)
+        return entry[0]
+
+    def drop(self, token):
+        self._sessions.pop(token, None)
+
+    def _evict(self):
+        # Expire idle sessions, then the least recently used ones beyond the limit; only the front is looked at
+        now = self._clock()
+        while self._sessions and next(iter(self._sessions.values()))[1] <= now:
+            self._sessions.popitem(last=False)
+        while len(self._sessions) >= self.max_sessions:
+            self._sessions.popitem(last=False)
+
+
+class HealthService:
+    """Routes JSON requests to HealthTracker methods on a worker thread pool."""
+
+    def __init__(self, db=None, workers=None):
+        self.db = db or get_backend()
+        # More workers than pooled connections would only queue inside the pool
+        workers = workers or self.db.pool.max_size
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="health-service")
+        # Logins wait for password hashing; keep them off the database workers
+        self.login_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="health-login")
+        self.sessions = SessionStore()
+        self.anonymous = HealthTracker(self.db)  # For requests that need no login
+        self.routes = {
+            ("POST", "/register"): self.register,
+            ("POST", "/login"): self.login,
+            ("POST", "/logout"): self.logout,
+            ("POST", "/readings"): self.log_reading,
+            ("GET", "/history"): self.history,
+            ("GET", "/doctors"): self.doctors,
+            ("POST", "/messages"): self.send_message,
+            ("GET", "/messages"): self.messages,
+            ("GET", "/inbox"): self.inbox,
+        }
+
+    async def _run(self, function, *args, executor=None):
+        return await asyncio.get_running_loop().run_in_executor(executor or self.executor, function, *args)
+
+    def _tracker(self, request):
+        token = request["token"]
+        tracker = self.sessions.get(token) if token else None
+        if tracker is None:
+            raise HTTPError(HTTPStatus.UNAUTHORIZED, "Please log in first.")
+        return tracker
+
+    @staticmethod
+    def _fields(request, *names):
+        body = request["json"]
+        missing = [name for name in names if body.get(name) in (None, "")]
+        if missing:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Missing fields: {', '.join(missing)}")
+        return [str(body[name]) for name in names]
+
+    async def register(self, request):
+        username, password = self._fields(request, "username", "password")
+        body = request["json"]
+        if body.get("specialty"):
+            specialty, name, email, phone = self._fields(request, "specialty", "name", "email", "phone")
+            success, message = await self._run(self.anonymous.register_user, username, password,
+                                               True, specialty, name, email, phone)
+        else:
+            success, message = await self._run(self.anonymous.register_user, username, password)
+        return success, message, None
+
+    async def login(self, request):
+        username, password = self._fields(request, "username", "password")
+        throttled = login_limiter().retry_after(username, request["source"])
+        tracker = HealthTracker(self.db)
+        success, message = await self._run(tracker.login_user, username, password, request["source"],
+                                           executor=self.login_executor)
+        if not success:
+            raise HTTPError(HTTPStatus.TOO_MANY_REQUESTS if throttled else HTTPStatus.UNAUTHORIZED, message)
+        return True, message, {"token": self.sessions.create(tracker)}
+
+    async def logout(self, request):
+        self._tracker(request)
+        self.sessions.drop(request["token"])
+        return True, "You have successfully logged out.", None
+
+    async def log_reading(self, request):
+        tracker = self._tracker(request)
+        weight, blood_pressure, steps = self._fields(request, "weight", "blood_pressure", "steps")
+        success, message = await self._run(tracker.log_health_metrics, weight, blood_pressure, steps)
+        return success, message, None
+
+    async def history(self, request):
+        return await self._run(history_result, self._tracker(request), request["query"])
+
+    async def doctors(self, request):
+        return await self._run(doctors_result, self.anonymous, request["query"])
+
+    async def doctor(self, request, doctor_id):
+        success, message, data = await self._run(doctor_result, self.anonymous, doctor_id)
+        if not success:
+            raise HTTPError(HTTPStatus.NOT_FOUND, message)
+        return success, message, data
+
+    async def send_message(self, request):
+        tracker = self._tracker(request)
+        doctor_id, text = self._fields(request, "doctor_id", "text")
+        return await self._run(send_result, tracker, doctor_id, text, request["json"].get("appointment_at"))
+
+    async def messages(self, request):
+        return await self._run(messages_result, self._tracker(request), request["query"])
+
+    async def inbox(self, request):
+        return await self._run(inbox_result, self._tracker(request), request["query"])
+
+    async def inbox_message(self, request, method, rest):
+        # GET /inbox/ID, POST /inbox/ID/reply, POST /inbox/ID/close
+        tracker = self._tracker(request)
+        message_id, _, action = rest.partition("/")
+        if (method, action) == ("GET", ""):
+            success, message, data = await self._run(message_result, tracker, message_id)
+            if not success:
+                raise HTTPError(HTTPStatus.NOT_FOUND, message)
+            return success, message, data
+        if (method, action) == ("POST", "reply"):
+            (text,) = self._fields(request, "text")
+            return await self._run(reply_result, tracker, message_id, text, request["json"].get("appointment_at"))
+        if (method, action) == ("POST", "close"):
+            return await self._run(close_result, tracker, message_id)
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown endpoint: /inbox/{rest}")
+
+    async def dispatch(self, request):
+        """Return (status, response dict) for a parsed request."""
+        method, path = request["method"], request["path"].rstrip("/") or "/"
+        handler = self.routes.get((method, path))
+        try:
+            if handler is not None:
+                success, message, data = await handler(request)
+            elif method == "GET" and path.startswith("/doctors/"):
+                success, message, data = await self.doctor(request, path[len("/doctors/"):])
+            elif path.startswith("/inbox/"):
+                success, message, data = await self.inbox_message(request, method, path[len("/inbox/"):])
+            elif any(route_path == path for _, route_path in self.routes):
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not allowed on {path}")
+            else:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown endpoint: {path}")
+        except HTTPError as err:
+            return err.status, {"ok": False, "message": str(err), "data": None}
+        except CommandError as err:
+            return HTTPStatus.BAD_REQUEST, {"ok": False, "message": str(err), "data": None}
+        except StorageError as err:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"ok": False, "message": f"Database error: {err}", "data": None}
+        except Exception:
+            # A bug must still get a response, not a dropped connection
+            print(f"Service: {method} {path} failed:", file=sys.stderr)
+            traceback.print_exc()
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"ok": False, "message": "Internal server error", "data": None}
+        status = HTTPStatus.OK if success else HTTPStatus.BAD_REQUEST
+        return status, {"ok": success, "message": message, "data": data}
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection until it is closed or goes idle."""
+        peer = writer.get_extra_info("peername")
+        source = peer[0] if peer else None  # Client address, for login rate limiting
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), IDLE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except HTTPError as err:
+                    await write_response(writer, err.status, {"ok": False, "message": str(err), "data": None},
+                                         keep_alive=False)
+                    break
+                if request is None:
+                    break
+                request["source"] = source
+                if metrics.ENABLED and request["method"] == "GET" and request["path"] == "/metrics":
+                    await write_body(writer, HTTPStatus.OK, metrics.registry().render().encode(), PROMETHEUS_TYPE,
+                                     request["keep_alive"])
+                else:
+                    status, payload = await self.dispatch(request)
+                    await write_response(writer, status, payload, request["keep_alive"])
+                if not request["keep_alive"]:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080, ready=None):
+        """Listen until cancelled; ready(host, port) is called once the socket is bound."""
+        server = await asyncio.start_server(self.handle_connection, host, port,
+                                            limit=MAX_HEADER_BYTES, backlog=1024)
+        if ready:
+            ready(*server.sockets[0].getsockname()[:2])
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.login_executor.shutdown(wait=True)
+
+
+async def read_request(reader):
+    """Parse one HTTP/1.1 request; returns None when the client closed the connection."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as err:
+        if not err.partial.strip():
+            return None
+        raise
+    except asyncio.LimitOverrunError:
+        raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Request headers too large") from None
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line") from None
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+
+    length = headers.get("content-length", "0")
+    if not length.isdigit():
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if int(length) > MAX_BODY_BYTES:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+    body = await reader.readexactly(int(length)) if int(length) else b""
+
+    try:
+        payload = json.loads(body) if body else {}
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body is not valid JSON") from None
+    if not isinstance(payload, dict):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object")
+
+    url = urlsplit(target)
+    connection = headers.get("connection", "").lower()
+    authorization = headers.get("authorization", "")
+    return {
+        "method": method.upper(),
+        "path": url.path,
+        "query": dict(parse_qsl(url.query)),
+        "json": payload,
+        "token": authorization[7:].strip() if authorization.lower().startswith("bearer ") else None,
+        "keep_alive": connection != "close" if version == "HTTP/1.1" else connection == "keep-alive",
+    }
+
+
+async def write_response(writer, status, payload, keep_alive=True):
+    await write_body(writer, status, json.dumps(payload, default=str).encode(), "application/json", keep_alive)
+
+
+async def write_body(writer, status, body, content_type, keep_alive=True):
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the tracker as an HTTP/JSON API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="0 picks a free port")
+    parser.add_argument("--db", help="database URL (default: HEALTH_TRACKER_DB)")
+    parser.add_argument("--workers", type=int, help="database worker threads (default: pool size)")
+    parser.add_argument("--metrics", nargs="?", const="", metavar="FILE",
+                        help="serve GET /metrics, and also write the metrics to FILE if given")
+    args = parser.parse_args(argv)
+
+    if args.metrics is not None:
+        metrics.enable(args.metrics)
+    service = HealthService(get_backend(args.db), args.workers)
+
+    def ready(host, port):
+        print(f"Serving on http://{host}:{port}", flush=True)
+
+    try:
+        asyncio.run(service.serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Logged-in identity and cached username -> user id lookups.
+
+The interactive tracker creates a Session at login and reuses its user id
+for every per-user query.  Non-interactive entry points (bulk imports,
+reports) have no login, so they resolve usernames through a process-wide
+LRU cache with TTL eviction instead.
+"""
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+DEFAULT_CACHE_SIZE = 10000  # Usernames kept per database
+DEFAULT_CACHE_TTL = 300.0  # Seconds before a cached id is looked up again
+LOOKUP_CHUNK = 500  # Usernames resolved per SELECT ... IN (...) query
+
+ROLE_USER = "user"
+ROLE_DOCTOR = "doctor"
+
+
+class Session:
+    """Identity of the logged-in user: created by login, cleared on logout."""
+
+    __slots__ = ("user_id", "username", "role")
+
+    def __init__(self, user_id, username, role=ROLE_USER):
+        self.user_id = user_id
+        self.username = username
+        self.role = role
+
+    def __repr__(self):
+        return f"Session(user_id={self.user_id!r}, username={self.username!r}, role={self.role!r})"
+
+
+class UserIdCache:
+    """Thread-safe LRU of username -> users.id with time-based expiry."""
+
+    def __init__(self, backend, maxsize=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL, clock=time.monotonic):
+        self.backend = backend
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()  # username -> (user_id, expires at)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, username):
+        """Return the cached id, or None when it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            if entry[1] <= self._clock():
+                del self._entries[username]
+                return None
+            self._entries.move_to_end(username)
+            return entry[0]
+
+    def put(self, username, user_id):
+        with self._lock:
+            self._entries[username] = (user_id, self._clock() + self.ttl)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)  # Evict the least recently used name
+
+    def invalidate(self, username=None):
+        """Forget one username, or everything when no name is given."""
+        with self._lock:
+            if username is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(username, None)
+
+    def lookup(self, username):
+        """Return the id for one username (None if no such user)."""
+        return self.resolve([username]).get(username)
+
+    def resolve(self, usernames):
+        """Return {username: id} for the names that exist, querying only cache misses."""
+        found, missing = {}, []
+        for name in set(usernames):
+            user_id = self.get(name)
+            if user_id is None:
+                missing.append(name)
+            else:
+                found[name] = user_id
+
+        for start in range(0, len(missing), LOOKUP_CHUNK):
+            chunk = missing[start:start + LOOKUP_CHUNK]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            rows = self.backend.fetchall(
+                f"SELECT username, id FROM users WHERE username IN ({placeholders})", chunk
+            )
+            for name, user_id in rows:
+                self.put(name, user_id)  # Unknown names are not cached, they may register later
+                found[name] = user_id
+        return found
+
+
+_caches = weakref.WeakKeyDictionary()  # One cache per storage backend
+_caches_lock = threading.Lock()
+
+
+def user_id_cache(backend):
+    """Return the process-wide username -> id cache for a storage backend."""
+    with _caches_lock:
+        cache = _caches.get(backend)
+        if cache is None:
+            cache = _caches[backend] = UserIdCache(backend)
+        return cache
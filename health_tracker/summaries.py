@@ -0,0 +1,311 @@
+"""Per-user health summaries, kept up to date on every logged reading.
+
+The ``health_summaries`` table holds one row per user with the latest
+reading, running mean/min/max of weight and steps, day streaks, daily
+buckets for the last 30 days and blood pressure category counts.
+log_health_metrics updates it in the same transaction as the insert, so
+progress can be shown with a single primary-key lookup instead of a scan
+over the user's whole history.  The summary also carries the rolling
+(EWMA) baselines of weight and steps that health_tracker.alerts checks
+every new reading against.
+
+Summaries can be recomputed from health_data at any time::
+
+    python -m health_tracker.summaries rebuild [--user USERNAME]
+    python -m health_tracker.summaries check [--user USERNAME]
+"""
+import argparse
+import heapq
+import json
+import math
+import sys
+from datetime import date
+
+from health_tracker.alerts import detect as detect_anomalies, save_alerts
+from health_tracker.archive import configured_archive
+from health_tracker.validation import BP_CATEGORIES, blood_pressure_category
+
+WINDOW_DAYS = 30  # Daily buckets kept for the last-7 and last-30-day windows
+REPLAY_CHUNK = 5000  # Rows read per query when replaying a history
+EWMA_ALPHA = 0.1  # Weight of a new reading in the rolling baselines
+
+COLUMNS = (
+    "user_id", "readings", "first_logged", "latest_id", "latest_logged", "latest_weight",
+    "latest_systolic", "latest_diastolic", "latest_steps", "weight_sum", "weight_min", "weight_max",
+    "steps_sum", "steps_min", "steps_max", "current_streak", "longest_streak", "last_day",
+    "bp_normal", "bp_elevated", "bp_stage1", "bp_stage2", "recent_days",
+    "weight_ewma", "weight_ewvar", "steps_ewma", "steps_ewvar",
+)
+BP_COLUMNS = dict(zip(BP_CATEGORIES, ("bp_normal", "bp_elevated", "bp_stage1", "bp_stage2")))
+
+
+def ewma_update(mean, variance, value, alpha=EWMA_ALPHA):
+    """Fold value into an exponentially weighted mean and variance."""
+    if mean is None:
+        return float(value), 0.0
+    diff = value - mean
+    increment = alpha * diff
+    return mean + increment, (1 - alpha) * (variance + diff * increment)
+
+
+class UserSummary:
+    """Running statistics of one user's readings."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.readings = 0
+        self.first_logged = None
+        self.latest_id = self.latest_logged = None
+        self.latest_weight = self.latest_systolic = self.latest_diastolic = self.latest_steps = None
+        self.weight_sum, self.weight_min, self.weight_max = 0.0, None, None
+        self.steps_sum, self.steps_min, self.steps_max = 0, None, None
+        self.current_streak = self.longest_streak = 0
+        self.last_day = None  # Ordinal of the most recent day with a reading
+        self.bp_counts = dict.fromkeys(BP_CATEGORIES, 0)
+        self.recent_days = {}  # Day ordinal -> [readings, weight sum, steps sum]
+        self.weight_ewma = self.weight_ewvar = None  # Rolling baselines (None until the first reading)
+        self.steps_ewma = self.steps_ewvar = None
+
+    def add(self, reading_id, date_logged, weight, systolic, diastolic, steps):
+        """Fold one reading into the summary in constant time."""
+        if weight is None or steps is None:
+            return  # NaN readings stored as NULL by older versions have nothing to add up
+        self.readings += 1
+        if self.first_logged is None or date_logged < self.first_logged:
+            self.first_logged = date_logged
+        if self.latest_logged is None or (date_logged, reading_id) > (self.latest_logged, self.latest_id):
+            self.latest_id, self.latest_logged = reading_id, date_logged
+            self.latest_weight, self.latest_steps = weight, steps
+            self.latest_systolic, self.latest_diastolic = systolic, diastolic
+
+        self.weight_sum += weight
+        self.weight_min = weight if self.weight_min is None else min(self.weight_min, weight)
+        self.weight_max = weight if self.weight_max is None else max(self.weight_max, weight)
+        self.steps_sum += steps
+        self.steps_min = steps if self.steps_min is None else min(self.steps_min, steps)
+        self.steps_max = steps if self.steps_max is None else max(self.steps_max, steps)
+        if systolic is not None and diastolic is not None:
+            self.bp_counts[blood_pressure_category(systolic, diastolic)] += 1
+        self.weight_ewma, self.weight_ewvar = ewma_update(self.weight_ewma, self.weight_ewvar, weight)
+        self.steps_ewma, self.steps_ewvar = ewma_update(self.steps_ewma, self.steps_ewvar, steps)
+
+        day = date_logged.toordinal()
+        # Streaks only move forward; older backfilled days are picked up by a rebuild
+        if self.last_day is None or day > self.last_day + 1:
+            self.current_streak = 1
+        elif day == self.last_day + 1:
+            self.current_streak += 1
+        if self.last_day is None or day > self.last_day:
+            self.last_day = day
+            self.recent_days = {d: b for d, b in self.recent_days.items() if d > day - WINDOW_DAYS}
+        self.longest_streak = max(self.longest_streak, self.current_streak)
+
+        if day > self.last_day - WINDOW_DAYS:
+            bucket = self.recent_days.setdefault(day, [0, 0.0, 0])
+            bucket[0] += 1
+            bucket[1] += weight
+            bucket[2] += steps
+
+    @property
+    def damaged(self):
+        # Sums made NULL by a NaN reading; the summary has to be rebuilt from the history
+        return self.weight_sum is None or self.steps_sum is None
+
+    @property
+    def weight_mean(self):
+        return self.weight_sum / self.readings if self.readings and not self.damaged else None
+
+    @property
+    def steps_mean(self):
+        return self.steps_sum / self.readings if self.readings and not self.damaged else None
+
+    def streak(self, today=None):
+        """Consecutive days with a reading up to today (or yesterday)."""
+        today = (today or date.today()).toordinal()
+        if self.last_day is None or today - self.last_day > 1:
+            return 0
+        return self.current_streak
+
+    def window(self, days, today=None):
+        """Return (readings, mean weight, mean steps) over the last `days` days."""
+        today = (today or date.today()).toordinal()
+        buckets = [b for d, b in self.recent_days.items() if d > today - days]
+        count = sum(b[0] for b in buckets)
+        if not count:
+            return 0, None, None
+        return count, sum(b[1] for b in buckets) / count, sum(b[2] for b in buckets) / count
+
+    def to_row(self):
+        values = dict(vars(self))
+        for category, column in BP_COLUMNS.items():
+            values[column] = self.bp_counts[category]
+        values["recent_days"] = json.dumps(sorted([d] + b for d, b in self.recent_days.items()))
+        return tuple(values[column] for column in COLUMNS)
+
+    @classmethod
+    def from_row(cls, row):
+        values = dict(zip(COLUMNS, row))
+        summary = cls(values["user_id"])
+        for column in COLUMNS:
+            if column not in BP_COLUMNS.values() and column != "recent_days":
+                setattr(summary, column, values[column])
+        summary.bp_counts = {category: values[column] for category, column in BP_COLUMNS.items()}
+        summary.recent_days = {d: [count, weight, steps] for d, count, weight, steps in json.loads(values["recent_days"])}
+        return summary
+
+
+def load_summary(db, user_id, for_update=False):
+    """Fetch a user's summary (None if there is none yet); db is a backend or transaction."""
+    lock = " FOR UPDATE" if for_update and getattr(db, "dialect", None) == "mysql" else ""
+    row = db.fetchone(f"SELECT {', '.join(COLUMNS)} FROM health_summaries WHERE user_id = %s{lock}", (user_id,))
+    return UserSummary.from_row(row) if row else None
+
+
+def save_summary(tx, summary, exists):
+    if exists:
+        assignments = ", ".join(f"{column} = %s" for column in COLUMNS[1:])
+        tx.execute(f"UPDATE health_summaries SET {assignments} WHERE user_id = %s",
+                   summary.to_row()[1:] + (summary.user_id,))
+    else:
+        tx.execute(f"INSERT INTO health_summaries ({', '.join(COLUMNS)}) VALUES ({', '.join(['%s'] * len(COLUMNS))})",
+                   summary.to_row())
+
+
+def iter_readings(db, user_id, chunk=REPLAY_CHUNK):
+    """Yield (id, date_logged, weight, systolic, diastolic, steps) oldest first, archived ones included."""
+    archive = configured_archive()
+    if archive is None:
+        yield from _iter_live_readings(db, user_id, chunk)
+        return
+    last_id = None
+    for row in heapq.merge(archive.user_rows(user_id), _iter_live_readings(db, user_id, chunk),
+                           key=lambda row: (row[1], row[0])):
+        if row[0] != last_id:  # A row both archived and still live (interrupted archive run)
+            yield row
+        last_id = row[0]
+
+
+def _iter_live_readings(db, user_id, chunk):
+    key = None
+    while True:
+        where, params = "user_id = %s", [user_id]
+        if key:
+            where += " AND (date_logged > %s OR (date_logged = %s AND id > %s))"
+            params += [key[0], key[0], key[1]]
+        rows = db.fetchall(
+            "SELECT id, date_logged, weight, systolic, diastolic, steps FROM health_data "
+            f"WHERE {where} ORDER BY date_logged, id LIMIT {int(chunk)}",
+            params,
+        )
+        yield from rows
+        if len(rows) < chunk:
+            return
+        key = (rows[-1][1], rows[-1][0])
+
+
+def replay(db, user_id):
+    """Compute a user's summary from scratch out of health_data."""
+    summary = UserSummary(user_id)
+    for row in iter_readings(db, user_id):
+        summary.add(*row)
+    return summary
+
+
+def record_reading(tx, user_id, reading_id, date_logged, reading):
+    """Update the user's summary for a reading just inserted in the same transaction."""
+    record_readings(tx, user_id, [(reading_id, date_logged, reading)])
+
+
+def record_readings(tx, user_id, readings):
+    """Update the user's summary once for several (reading id, date_logged, Reading) just inserted.
+
+    Each reading is checked against the baselines from before it; anomalies go to the alerts table.
+    """
+    anomalies = []
+    summary = load_summary(tx, user_id, for_update=True)
+    if summary is None or summary.damaged:
+        # First (or unusable) summary for this user: build it from the history (includes the new readings)
+        for reading_id, date_logged, reading in readings:
+            anomalies.extend((reading_id, date_logged, alert) for alert in detect_anomalies(None, reading))
+        save_summary(tx, replay(tx, user_id), exists=summary is not None)
+    else:
+        for reading_id, date_logged, reading in readings:
+            anomalies.extend((reading_id, date_logged, alert) for alert in detect_anomalies(summary, reading))
+            summary.add(reading_id, date_logged, reading.weight, reading.systolic, reading.diastolic,
+                        reading.steps)
+        save_summary(tx, summary, exists=True)
+    if anomalies:
+        save_alerts(tx, user_id, anomalies)
+
+
+def _user_ids(backend, user_ids):
+    if user_ids is not None:
+        return list(user_ids)
+    return [row[0] for row in backend.fetchall("SELECT DISTINCT user_id FROM health_data ORDER BY user_id")]
+
+
+def rebuild(backend, user_ids=None):
+    """Recompute the summaries of the given users (default: everyone); returns the count."""
+    count = 0
+    for user_id in _user_ids(backend, user_ids):
+        with backend.transaction() as tx:
+            exists = load_summary(tx, user_id, for_update=True) is not None
+            save_summary(tx, replay(tx, user_id), exists)
+        count += 1
+    return count
+
+
+def _same(stored, rebuilt):
+    if isinstance(stored, float) or isinstance(rebuilt, float):
+        return stored is not None and rebuilt is not None and math.isclose(stored, rebuilt, rel_tol=1e-6)
+    return stored == rebuilt
+
+
+def check(backend, user_ids=None):
+    """Compare stored summaries with rebuilt ones; returns [(user_id, field, stored, rebuilt)]."""
+    mismatches = []
+    for user_id in _user_ids(backend, user_ids):
+        stored = load_summary(backend, user_id)
+        rebuilt = replay(backend, user_id)
+        if stored is None:
+            mismatches.append((user_id, "summary", None, "missing"))
+            continue
+        for column, old, new in zip(COLUMNS, stored.to_row(), rebuilt.to_row()):
+            if column == "recent_days":
+                old, new = json.loads(old), json.loads(new)
+                same = len(old) == len(new) and all(
+                    all(_same(a, b) for a, b in zip(x, y)) for x, y in zip(old, new))
+            else:
+                same = _same(old, new)
+            if not same:
+                mismatches.append((user_id, column, old, new))
+    return mismatches
+
+
+def main(argv=None):
+    from health_tracker.session import user_id_cache
+    from health_tracker.storage import get_backend
+
+    parser = argparse.ArgumentParser(description="Rebuild or check the per-user health summaries.")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--user", action="append", help="username (repeatable, default: all users)")
+    parser.add_argument("--db", help="database URL (default: HEALTH_TRACKER_DB)")
+    args = parser.parse_args(argv)
+
+    backend = get_backend(args.db)
+    user_ids = None
+    if args.user:
+        user_ids = list(user_id_cache(backend).resolve(args.user).values())
+
+    if args.command == "rebuild":
+        print(f"Rebuilt {rebuild(backend, user_ids)} summaries.")
+        return 0
+    mismatches = check(backend, user_ids)
+    for user_id, column, stored, rebuilt in mismatches:
+        print(f"user {user_id}: {column} stored={stored!r} rebuilt={rebuilt!r}")
+    print("Summaries match." if not mismatches else f"{len(mismatches)} mismatches.")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Deterministic synthetic populations for benchmarks and demos.
+
+populate() fills a database with users, doctors spread over the
+specialties offered at registration, and years of daily readings per user.
+Every value comes from one seeded random generator, so the same arguments
+always produce the same population.  Each user has a personal baseline
+(weight, blood pressure, activity) that drifts slowly, with day-to-day
+noise and the odd missed day, so summaries, tips and alerts see
+realistic histories.
+
+All accounts share one password (hashed once, with the normal scrypt
+cost, so logins take as long as real ones)::
+
+    python -m health_tracker.synthetic --users 1000 --doctors 50 --years 2 --db sqlite:///demo.db
+"""
+import argparse
+import random
+import sys
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from health_tracker.bulk_import import INSERT_SQL
+from health_tracker.doctors import SPECIALTIES, doctor_directory
+from health_tracker.passwords import hash_password
+from health_tracker.summaries import rebuild as rebuild_summaries
+from health_tracker.validation import DIASTOLIC_RANGE, STEPS_RANGE, SYSTOLIC_RANGE
+
+PASSWORD = "synthetic123"  # Password of every generated account
+BATCH_SIZE = 5000  # Readings inserted per committed batch
+SKIP_DAY = 0.15  # Chance that a user logs nothing on a given day
+
+FIRST_NAMES = ["Amina", "Jean", "Grace", "Eric", "Aline", "Patrick", "Diane", "Claude", "Esther", "Samuel",
+               "Alice", "David", "Nadia", "Olivier", "Ruth", "Yves"]
+LAST_NAMES = ["Mugisha", "Uwase", "Habimana", "Ingabire", "Nkurunziza", "Mukamana", "Niyonzima", "Uwimana",
+              "Kagame", "Mutesi", "Ndayisaba", "Umutoni"]
+
+Population = namedtuple("Population", ["usernames", "doctor_usernames", "password", "readings", "start", "end"])
+
+
+def username(n):
+    return f"user{n:06d}"
+
+
+def doctor_username(n):
+    return f"doctor{n:04d}"
+
+
+def _clamp(value, bounds):
+    # Keep generated values inside what validation accepts from real users
+    return min(max(value, bounds[0]), bounds[1])
+
+
+def user_readings(rng, user_id, start, days):
+    """Yield INSERT_SQL parameter tuples for one user's history, oldest first."""
+    weight = rng.gauss(72, 14)
+    systolic, diastolic = rng.gauss(122, 12), rng.gauss(79, 8)
+    steps = rng.gammavariate(4, 1800)
+    for day in range(days):
+        # Slow drift of the baseline, then day-to-day noise around it
+        weight += rng.gauss(0, 0.05)
+        systolic += rng.gauss(0, 0.2)
+        steps = max(500.0, steps + rng.gauss(0, 40))
+        if rng.random() < SKIP_DAY:
+            continue
+        reading_weight = round(min(max(weight + rng.gauss(0, 0.6), 35), 250), 1)
+        reading_systolic = int(_clamp(round(systolic + rng.gauss(0, 6)), SYSTOLIC_RANGE))
+        reading_diastolic = int(_clamp(round(diastolic + rng.gauss(0, 5)), DIASTOLIC_RANGE))
+        reading_steps = int(_clamp(round(rng.gauss(steps, steps * 0.25)), STEPS_RANGE))
+        logged = start + timedelta(days=day, minutes=rng.randrange(6 * 60, 22 * 60))
+        yield (user_id, reading_weight, f"{reading_systolic}/{reading_diastolic}",
+               reading_systolic, reading_diastolic, reading_steps, logged)
+
+
+def populate(backend, users=100, doctors=20, years=1.0, seed=42, end=None, batch_size=BATCH_SIZE):
+    """Add a synthetic population to backend and return a Population describing it.
+
+    Readings cover the `years` before `end` (default: midnight today).  User
+    and doctor usernames are numbered from the ones already present, so
+    populate can be called again on the same database.
+    """
+    rng = random.Random(seed)
+    end = end or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    days = max(1, int(years * 365))
+    start = end - timedelta(days=days)
+    password_hash = hash_password(PASSWORD)
+
+    first_user = backend.fetchone("SELECT COUNT(*) FROM users")[0]
+    first_doctor = backend.fetchone("SELECT COUNT(*) FROM doctors")[0]
+    usernames = [username(n) for n in range(first_user, first_user + users)]
+    doctor_usernames = [doctor_username(n) for n in range(first_doctor, first_doctor + doctors)]
+
+    backend.executemany("INSERT INTO users (username, password) VALUES (%s, %s)",
+                        [(name, password_hash) for name in usernames])
+    backend.executemany(
+        "INSERT INTO doctors (name, specialty, email, phone, username, password) VALUES (%s, %s, %s, %s, %s, %s)",
+        [(f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", SPECIALTIES[n % len(SPECIALTIES)],
+          f"{name}@clinic.example.org", f"07{rng.randrange(10 ** 8):08d}", name, password_hash)
+         for n, name in enumerate(doctor_usernames)],
+    )
+    doctor_directory(backend).invalidate()
+
+    user_ids = []
+    for chunk in range(0, len(usernames), 500):
+        names = usernames[chunk:chunk + 500]
+        rows = backend.fetchall(
+            f"SELECT id FROM users WHERE username IN ({', '.join(['%s'] * len(names))}) ORDER BY username", names)
+        user_ids.extend(row[0] for row in rows)
+
+    readings, batch = 0, []
+    for user_id in user_ids:
+        for row in user_readings(rng, user_id, start, days):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                readings += backend.executemany(INSERT_SQL, batch)
+                batch = []
+    if batch:
+        readings += backend.executemany(INSERT_SQL, batch)
+    rebuild_summaries(backend, user_ids)
+    return Population(usernames, doctor_usernames, PASSWORD, readings, start, end)
+
+
+def main(argv=None):
+    from health_tracker.storage import get_backend
+
+    parser = argparse.ArgumentParser(description="Fill a database with a synthetic population.")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--doctors", type=int, default=20)
+    parser.add_argument("--years", type=float, default=1.0, help="years of daily readings per user")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="database URL (default: HEALTH_TRACKER_DB)")
+    args = parser.parse_args(argv)
+
+    population = populate(get_backend(args.db), args.users, args.doctors, args.years, args.seed)
+    print(f"Added {len(population.usernames)} users, {len(population.doctor_usernames)} doctors and "
+          f"{population.readings} readings from {population.start.date()} to {population.end.date()} "
+          f"(password: {population.password}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
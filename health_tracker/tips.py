@@ -0,0 +1,234 @@
+"""Rules-driven, personalised health tips.
+
+Tips and the rules that pick them live in a versioned data file
+(``health_tracker/tips.json``, or ``HEALTH_TRACKER_TIPS``) that is loaded
+once per process and compiled into lookup tables:
+
+* ``categories`` - general, nutrition and exercise tips for the tips menu
+* ``metrics`` - how a user's numbers map to buckets: either the names of the
+  blood pressure categories, or ``bands`` of ``[upper bound, bucket]`` pairs
+  (a value below the bound falls in that bucket, ``null`` means no bound)
+* ``tips`` - the tips of every (metric, bucket); ``weight``/``any`` are the
+  tips for a single weight value, which has no trend to bucket
+
+A user's metric values come from their stored progress summary (latest
+blood pressure category, 7-day step average, weight change against the
+30-day average, logging streak), so choosing tips never scans a history.
+Tip lists are memoised per (rule version, buckets).  The schema has no
+height column, so BMI bands cannot be computed; a band rule for any new
+summary-derived value only needs an entry in METRIC_SOURCES.
+
+Assign tips to the whole population in one batch::
+
+    python -m health_tracker.tips [--db URL] [--out assignments.csv]
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+from bisect import bisect_right
+from collections import Counter
+from datetime import date
+
+from health_tracker.summaries import COLUMNS as SUMMARY_COLUMNS, UserSummary
+from health_tracker.validation import blood_pressure_category, parse_blood_pressure
+
+TIPS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tips.json")
+SCORE_CHUNK = 2000  # Summaries read per query by the batch scorer
+
+
+def _bp_category(summary, today):
+    if summary.latest_systolic is None or summary.latest_diastolic is None:
+        return None
+    return blood_pressure_category(summary.latest_systolic, summary.latest_diastolic)
+
+
+def _steps_7d(summary, today):
+    count, _, steps = summary.window(7, today)
+    return steps if count else None
+
+
+def _weight_change_30d(summary, today):
+    count, weight, _ = summary.window(30, today)
+    if not count or summary.latest_weight is None:
+        return None
+    return summary.latest_weight - weight
+
+
+def _streak_days(summary, today):
+    return summary.streak(today)
+
+
+# Values a rule can use, computed in constant time from a UserSummary
+METRIC_SOURCES = {
+    "bp_category": _bp_category,
+    "steps_7d": _steps_7d,
+    "weight_change_30d": _weight_change_30d,
+    "streak_days": _streak_days,
+}
+
+
+class TipRules:
+    """A compiled tips data file."""
+
+    def __init__(self, data):
+        self.version = data["version"]
+        self.categories = {name: tuple(tips) for name, tips in data["categories"].items()}
+        self.metrics = []  # (metric, source function, band upper bounds or None, bucket names)
+        for metric, rule in data["metrics"].items():
+            if rule["source"] not in METRIC_SOURCES:
+                raise ValueError(f"Tips rule {metric}: unknown source {rule['source']}")
+            if "bands" in rule:
+                bounds = [bound for bound, _ in rule["bands"]]
+                if bounds[-1] is not None or bounds[:-1] != sorted(bounds[:-1]) or None in bounds[:-1]:
+                    raise ValueError(f"Tips rule {metric}: bands must ascend and end with a null bound")
+                self.metrics.append((metric, METRIC_SOURCES[rule["source"]], bounds[:-1],
+                                     tuple(name for _, name in rule["bands"])))
+            else:
+                self.metrics.append((metric, METRIC_SOURCES[rule["source"]], None, tuple(rule["buckets"])))
+        self._by_metric = {entry[0]: entry for entry in self.metrics}
+        self.tips = {
+            (metric, bucket): tuple(tips)
+            for metric, buckets in data["tips"].items() for bucket, tips in buckets.items()
+        }
+        self._memo = {}  # (version, buckets) -> tips
+
+    @classmethod
+    def load(cls, path=None):
+        path = path or os.environ.get("HEALTH_TRACKER_TIPS") or TIPS_FILE
+        with open(path, encoding="utf-8") as handle:
+            return cls(json.load(handle))
+
+    def category(self, name):
+        """Tips of a menu category (general tips for an unknown one)."""
+        return self.categories.get(name, self.categories["general"])
+
+    def bucket(self, metric, value):
+        """Bucket of a metric value, or None when the value is missing."""
+        _, _, bounds, buckets = self._by_metric[metric]
+        if value is None:
+            return None
+        if bounds is None:
+            return value if value in buckets else None
+        return buckets[bisect_right(bounds, value)]
+
+    def buckets_for_summary(self, summary, today=None):
+        """(metric, bucket) pairs of a UserSummary, in rule order."""
+        buckets = []
+        for metric, source, _, _ in self.metrics:
+            bucket = self.bucket(metric, source(summary, today))
+            if bucket is not None:
+                buckets.append((metric, bucket))
+        return tuple(buckets)
+
+    def buckets_for_reading(self, weight=None, blood_pressure=None, steps=None, **_):
+        """(metric, bucket) pairs from one raw reading (a single weight only gets the general weight tips).
+
+        Raises ValueError for an invalid weight, blood pressure or step count.
+        """
+        buckets = []
+        if weight is not None:
+            try:
+                float(weight)
+            except (TypeError, ValueError):
+                raise ValueError("Please enter valid numbers!") from None
+            if ("weight", "any") in self.tips:
+                buckets.append(("weight", "any"))
+        if blood_pressure is not None and "blood_pressure" in self._by_metric:
+            buckets.append(("blood_pressure", blood_pressure_category(*parse_blood_pressure(blood_pressure))))
+        if steps is not None and "steps" in self._by_metric:
+            try:
+                buckets.append(("steps", self.bucket("steps", int(steps))))
+            except (TypeError, ValueError):
+                raise ValueError("Please enter valid numbers!") from None
+        return tuple(buckets)
+
+    def tips_for(self, buckets):
+        """Tips of a bucket combination, memoised per rule version."""
+        key = (self.version, buckets)
+        tips = self._memo.get(key)
+        if tips is None:
+            tips = self._memo[key] = tuple(tip for bucket in buckets for tip in self.tips.get(bucket, ()))
+        return tips
+
+
+_rules = None
+_rules_lock = threading.Lock()
+
+
+def tip_rules():
+    """The process-wide compiled tips data file (loaded on first use)."""
+    global _rules
+    with _rules_lock:
+        if _rules is None:
+            _rules = TipRules.load()
+        return _rules
+
+
+def iter_summaries(backend, chunk=SCORE_CHUNK):
+    """Yield every stored UserSummary in user id order, a chunk at a time."""
+    last_id = 0
+    while True:
+        rows = backend.fetchall(
+            f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM health_summaries "
+            f"WHERE user_id > %s ORDER BY user_id LIMIT {int(chunk)}",
+            (last_id,),
+        )
+        for row in rows:
+            yield UserSummary.from_row(row)
+        if len(rows) < chunk:
+            return
+        last_id = rows[-1][0]
+
+
+def score_population(backend, rules=None, today=None):
+    """Yield (user_id, buckets, tips) for every user with a summary."""
+    rules = rules or tip_rules()
+    for summary in iter_summaries(backend):
+        buckets = rules.buckets_for_summary(summary, today)
+        yield summary.user_id, buckets, rules.tips_for(buckets)
+
+
+def main(argv=None):
+    from tabulate import tabulate
+
+    from health_tracker.storage import get_backend
+
+    parser = argparse.ArgumentParser(description="Assign personalised tips to every user.")
+    parser.add_argument("--db", help="database URL (default: HEALTH_TRACKER_DB)")
+    parser.add_argument("--today", type=date.fromisoformat, help="score as of this day (default: today)")
+    parser.add_argument("--out", help="write one CSV row per user to this file")
+    args = parser.parse_args(argv)
+
+    rules = tip_rules()
+    metrics = [metric for metric, _, _, _ in rules.metrics]
+    counts = Counter()
+    users = 0
+    out = open(args.out, "w", newline="", encoding="utf-8") if args.out else None
+    try:
+        writer = csv.writer(out) if out else None
+        if writer:
+            writer.writerow(["user_id", "rule_version"] + metrics + ["tips"])
+        for user_id, buckets, tips in score_population(get_backend(args.db), rules, args.today):
+            users += 1
+            counts.update(buckets)
+            if writer:
+                chosen = dict(buckets)
+                writer.writerow([user_id, rules.version] + [chosen.get(metric, "") for metric in metrics]
+                                + [" | ".join(tips)])
+    finally:
+        if out:
+            out.close()
+
+    print(f"Scored {users} users with tips rules version {rules.version}.")
+    print(tabulate(
+        [(metric, bucket, counts[(metric, bucket)]) for metric, _, _, buckets in rules.metrics for bucket in buckets],
+        headers=["Metric", "Bucket", "Users"], tablefmt="grid",
+    ))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Validation and classification rules for health metric readings.
+
+Shared by the interactive menu (log_health_metrics) and the non-interactive
+entry points so every reading is checked and categorised the same way.
+"""
+import math
+from collections import namedtuple
+
+# Accepted blood pressure range (systolic / diastolic, mmHg)
+SYSTOLIC_RANGE = (60, 200)
+DIASTOLIC_RANGE = (40, 130)
+WEIGHT_RANGE = (2.0, 500.0)  # kg
+STEPS_RANGE = (0, 100000)  # Steps per reading
+
+# Blood pressure categories (ACC/AHA), ordered from lowest to highest risk
+BP_CATEGORIES = ("normal", "elevated", "stage 1", "stage 2")
+
+
+class Reading(namedtuple("Reading", ["weight", "systolic", "diastolic", "steps"])):
+    """One validated health reading."""
+
+    __slots__ = ()
+
+    @property
+    def blood_pressure(self):
+        # Stored in the '120/80' format the users type in
+        return f"{self.systolic}/{self.diastolic}"
+
+
+def parse_health_metrics(weight, blood_pressure, steps):
+    """Convert and validate raw metric values into a Reading.
+
+    Raises ValueError with a message that can be shown to the user.
+    """
+    try:
+        weight = float(weight)
+        steps = int(steps)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError("Please enter valid numbers!") from None
+    # float() also accepts 'nan' and 'inf', which the summaries cannot add up
+    if not math.isfinite(weight):
+        raise ValueError("Please enter valid numbers!")
+    if not WEIGHT_RANGE[0] <= weight <= WEIGHT_RANGE[1]:
+        raise ValueError(f"Weight must be between {WEIGHT_RANGE[0]:g} and {WEIGHT_RANGE[1]:g} kg")
+    if not STEPS_RANGE[0] <= steps <= STEPS_RANGE[1]:
+        raise ValueError(f"Steps must be between {STEPS_RANGE[0]} and {STEPS_RANGE[1]}")
+
+    sys_bp, dia_bp = parse_blood_pressure(blood_pressure)
+    return Reading(weight, sys_bp, dia_bp, steps)
+
+
+def parse_blood_pressure(blood_pressure):
+    """Parse and validate a '120/80' reading into (systolic, diastolic).
+
+    Raises ValueError with a message that can be shown to the user.
+    """
+    # Validate blood pressure format
+    blood_pressure = str(blood_pressure)
+    if not blood_pressure.count('/') == 1:
+        raise ValueError("Blood pressure must be in format '120/80'")
+
+    # Parse and validate blood pressure values
+    try:
+        sys_bp, dia_bp = map(int, blood_pressure.split('/'))
+    except ValueError:
+        raise ValueError("Please enter valid numbers!") from None
+    if not (SYSTOLIC_RANGE[0] <= sys_bp <= SYSTOLIC_RANGE[1] and DIASTOLIC_RANGE[0] <= dia_bp <= DIASTOLIC_RANGE[1]):
+        raise ValueError("Blood pressure values are out of normal range")
+    return sys_bp, dia_bp
+
+
+def blood_pressure_category(systolic, diastolic):
+    """Return the BP_CATEGORIES entry for a reading."""
+    if systolic >= 140 or diastolic >= 90:
+        return "stage 2"
+    if systolic >= 130 or diastolic >= 80:
+        return "stage 1"
+    if systolic >= 120:
+        return "elevated"
+    return "normal"
@@ -0,0 +1,32 @@
+"""Worker processes for jobs split into user id ranges.
+
+The alerts backfill and cohort reports both split their users into
+contiguous id ranges, several per worker so uneven ranges even out, and run
+one task per range on a pool of worker processes.
+"""
+import os
+
+RANGES_PER_WORKER = 4  # User id ranges per worker, to even out uneven ranges
+
+
+def worker_count(workers=None):
+    """The number of worker processes to use: `workers`, or one per CPU."""
+    return workers or os.cpu_count() or 1
+
+
+def user_ranges(first_user, last_user, workers):
+    """Split first_user..last_user into at most RANGES_PER_WORKER contiguous inclusive ranges per worker."""
+    size = max(1, -(-(last_user - first_user + 1) // (workers * RANGES_PER_WORKER)))
+    return [(lo, min(lo + size - 1, last_user)) for lo in range(first_user, last_user + 1, size)]
+
+
+def run_tasks(worker, tasks, workers):
+    """Yield worker(task) for every task, in completion order, on `workers` processes."""
+    if workers == 1:
+        yield from map(worker, tasks)
+        return
+    import multiprocessing  # Only jobs with several workers need worker processes
+
+    # Fresh interpreters: pooled connections must not be shared with forked children
+    with multiprocessing.get_context("spawn").Pool(workers) as pool:
+        yield from pool.imap_unordered(worker, tasks)
@@ -0,0 +1,32 @@
+"""Fresh, migrated SQLite databases for the tests."""
+import os
+import shutil
+import tempfile
+import unittest
+
+from health_tracker.bulk_import import INSERT_SQL
+from health_tracker.storage import create_backend
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """TestCase with an empty database in self.db and a scratch directory in self.tmp."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.db = create_backend("sqlite:///" + os.path.join(self.tmp, "health.db"))
+        self.addCleanup(self.db.close)
+
+    def add_user(self, username="alice", password="unused"):
+        with self.db.transaction() as tx:
+            return tx.execute("INSERT INTO users (username, password) VALUES (%s, %s)",
+                              (username, password)).lastrowid
+
+    def add_readings(self, user_id, rows):
+        """Insert (weight, systolic, diastolic, steps, date_logged) rows as they are, NULLs included."""
+        with self.db.transaction() as tx:
+            tx.executemany(INSERT_SQL, [
+                (user_id, weight, None if systolic is None else f"{systolic}/{diastolic}", systolic, diastolic,
+                 steps, date_logged)
+                for weight, systolic, diastolic, steps, date_logged in rows
+            ])
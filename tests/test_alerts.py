@@ -0,0 +1,37 @@
+import unittest
+from datetime import datetime, timedelta
+
+from _db import DatabaseTestCase
+from health_tracker.alerts import backfill_range, detect
+from health_tracker.summaries import UserSummary
+from health_tracker.validation import Reading
+
+START = datetime(2024, 1, 1, 8, 0)
+
+
+class DetectTest(unittest.TestCase):
+    def test_skips_missing_metrics(self):
+        summary = UserSummary(1)
+        for day in range(10):
+            summary.add(day + 1, START + timedelta(days=day), 70.0, 120, 80, 8000)
+        self.assertEqual(detect(summary, Reading(None, 120, 80, None)), [])
+        kinds = [alert.kind for alert in detect(summary, Reading(None, 120, 80, 100))]
+        self.assertEqual(kinds, ["steps_drop"])
+
+
+class BackfillTest(DatabaseTestCase):
+    def test_null_weight_rows(self):
+        # Older versions stored NaN weights as NULL; they must not stop the worker
+        user_id = self.add_user()
+        rows = [(70.0, 120, 80, 8000, START + timedelta(days=day)) for day in range(10)]
+        rows.append((None, 120, 80, 8000, START + timedelta(days=10)))
+        rows.append((95.0, 120, 80, 8000, START + timedelta(days=11)))
+        self.add_readings(user_id, rows)
+
+        self.assertEqual(backfill_range(self.db, user_id, user_id), (12, 1))
+        alerts = self.db.fetchall("SELECT kind, value FROM alerts WHERE user_id = %s", (user_id,))
+        self.assertEqual(alerts, [("weight_change", 95.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import os
+import unittest
+
+from _db import DatabaseTestCase
+from health_tracker.bulk_import import import_files
+from health_tracker.summaries import check
+
+
+class ImportFilesTest(DatabaseTestCase):
+    def test_imported_readings_are_summarised_and_checked(self):
+        user_id = self.add_user("alice")
+        path = os.path.join(self.tmp, "readings.csv")
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write("username,weight,blood_pressure,steps,date_logged\n")
+            for day in range(1, 11):
+                handle.write(f"alice,70,120/80,8000,2024-01-{day:02d} 08:00:00\n")
+            handle.write("alice,70,185/110,8000,2024-01-11 08:00:00\n")
+            handle.write("bob,70,120/80,8000,2024-01-11 09:00:00\n")
+
+        report = import_files([path], self.db)
+        self.assertEqual((report.inserted, len(report.rejected)), (11, 1))
+        self.assertEqual(check(self.db), [])
+        alerts = self.db.fetchall("SELECT kind FROM alerts WHERE user_id = %s", (user_id,))
+        self.assertEqual(alerts, [("bp_crisis",)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from datetime import datetime, timedelta
+
+from _db import DatabaseTestCase
+from health_tracker.history import fetch_page, iter_history
+
+START = datetime(2024, 1, 1, 8, 0)
+
+
+class KeysetPaginationTest(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user_id = self.add_user("alice")
+        other_id = self.add_user("bob")
+        # 23 readings on 6 distinct timestamps, so most page boundaries fall inside a run of equal dates
+        dates = [START + timedelta(hours=n // 4) for n in range(23)]
+        self.add_readings(self.user_id, [(70.0, 120, 80, 5000, date) for date in dates])
+        self.add_readings(other_id, [(80.0, 120, 80, 5000, date) for date in dates[:8]])
+        rows = self.db.fetchall("SELECT id, date_logged FROM health_data WHERE user_id = %s", (self.user_id,))
+        self.expected = [row[0] for row in sorted(rows, key=lambda row: (row[1], row[0]), reverse=True)]
+
+    def test_pages_older_then_newer_without_gaps(self):
+        pages = [fetch_page(self.db, self.user_id, page_size=5)]
+        while pages[-1].has_older:
+            pages.append(fetch_page(self.db, self.user_id, older_than=pages[-1].last_key, page_size=5))
+        older_ids = [row.id for page in pages for row in page.rows]
+        self.assertEqual(older_ids, self.expected)
+        self.assertEqual([len(page.rows) for page in pages], [5, 5, 5, 5, 3])
+
+        # Back towards the newest page from the oldest one
+        back = [pages[-1]]
+        while back[-1].has_newer:
+            back.append(fetch_page(self.db, self.user_id, newer_than=back[-1].first_key, page_size=5))
+        newer_ids = [row.id for page in reversed(back) for row in page.rows]
+        self.assertEqual(sorted(newer_ids), sorted(self.expected))
+        self.assertEqual(len(newer_ids), len(set(newer_ids)))
+        self.assertEqual(newer_ids, sorted(newer_ids, key=self.expected.index))
+
+    def test_stream_matches_pages(self):
+        self.assertEqual([row.id for row in iter_history(self.db, self.user_id, page_size=3)], self.expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import json
+import os
+import unittest
+from datetime import datetime, timedelta
+
+from _db import DatabaseTestCase
+from health_tracker.ingest import IngestQueue, QueuedReading, load_checkpoint, record_entry, save_checkpoint
+from health_tracker.summaries import check
+from health_tracker.validation import Reading
+
+START = datetime(2024, 1, 1, 8, 0)
+
+
+class IngestQueueTest(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.tmp, "ingest.wal")
+        self.user_id = self.add_user()
+
+    def open_queue(self):
+        queue = IngestQueue(self.db, self.path, group_interval=0.01, fsync=False)
+        self.addCleanup(queue.close)
+        return queue
+
+    def reading(self, seq):
+        return QueuedReading(seq, self.user_id, START + timedelta(days=seq), Reading(70.0 + seq, 120, 80, 5000))
+
+    def stored_weights(self):
+        return [row[0] for row in self.db.fetchall("SELECT weight FROM health_data ORDER BY date_logged")]
+
+    def test_replays_log_that_stopped_mid_batch(self):
+        # Records 1-2 were committed; the process died while 3-4 were queued and 5 was half written
+        with open(self.path, "w", encoding="utf-8") as log:
+            log.write(json.dumps({"wal": "crashed"}) + "\n")
+            for seq in range(1, 5):
+                log.write(json.dumps(record_entry(self.reading(seq))) + "\n")
+            log.write(json.dumps(record_entry(self.reading(5)))[:20])
+        self.add_readings(self.user_id, [(71.0, 120, 80, 5000, START + timedelta(days=1)),
+                                         (72.0, 120, 80, 5000, START + timedelta(days=2))])
+        with self.db.transaction() as tx:
+            save_checkpoint(tx, "crashed", 2)
+
+        queue = self.open_queue()
+        self.assertEqual(queue.recovered, 2)
+        self.assertTrue(queue.flush(timeout=5))
+        self.assertEqual(self.stored_weights(), [71.0, 72.0, 73.0, 74.0])
+        self.assertEqual(load_checkpoint(self.db, "crashed"), 4)
+        self.assertEqual(queue.submit(self.user_id, Reading(75.0, 120, 80, 5000), START + timedelta(days=5)), 5)
+        self.assertTrue(queue.flush(timeout=5))
+        self.assertEqual(self.stored_weights(), [71.0, 72.0, 73.0, 74.0, 75.0])
+        with open(self.path, "rb") as log:
+            self.assertTrue(log.read().endswith(b"\n"))  # The torn tail was cut off, not appended to
+
+    def test_checkpoint_skips_committed_records(self):
+        queue = self.open_queue()
+        for day in range(3):
+            queue.submit(self.user_id, Reading(70.0 + day, 120, 80, 5000), START + timedelta(days=day))
+        self.assertTrue(queue.flush(timeout=5))
+        queue.close()
+
+        reopened = self.open_queue()
+        self.assertEqual(reopened.recovered, 0)
+        self.assertTrue(reopened.flush(timeout=5))
+        self.assertEqual(self.stored_weights(), [70.0, 71.0, 72.0])
+        self.assertEqual(check(self.db), [])
+
+    def test_rejected_reading_goes_to_dead_letter_file(self):
+        queue = self.open_queue()
+        queue.submit(self.user_id, Reading(70.0, 120, 80, 5000), START)
+        bad_seq = queue.submit(self.user_id + 100, Reading(71.0, 120, 80, 5000), START)  # No such user
+        queue.submit(self.user_id, Reading(72.0, 120, 80, 5000), START + timedelta(days=1))
+        self.assertTrue(queue.flush(timeout=5))
+
+        self.assertEqual(queue.rejected, 1)
+        self.assertEqual(self.stored_weights(), [70.0, 72.0])
+        with open(queue.dead_letter_path, encoding="utf-8") as dead:
+            entries = [json.loads(line) for line in dead]
+        self.assertEqual([(entry["seq"], entry["user_id"]) for entry in entries], [(bad_seq, self.user_id + 100)])
+        self.assertIn("error", entries[0])
+        self.assertEqual(load_checkpoint(self.db, queue.wal.wal_id), bad_seq + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import hashlib
+import unittest
+
+from _db import DatabaseTestCase
+from health_tracker.core import HealthTracker
+from health_tracker.passwords import verify_password
+from health_tracker.ratelimit import USER_BURST, USER_REFILL, LoginLimiter, login_limiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class LoginTest(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tracker = HealthTracker(self.db, ingest=False)
+        self.addCleanup(login_limiter().succeeded, "legacy")  # The limiter is process-wide
+
+    def stored_password(self, username):
+        return self.db.fetchone("SELECT password FROM users WHERE username = %s", (username,))[0]
+
+    def test_legacy_hash_is_upgraded_to_scrypt(self):
+        legacy = hashlib.sha256(b"secret123").hexdigest()
+        self.add_user("legacy", legacy)
+
+        self.assertEqual(self.tracker.login_user("legacy", "secret123"), (True, "Login successful!"))
+        stored = self.stored_password("legacy")
+        self.assertTrue(stored.startswith("scrypt$"))
+        self.assertEqual(verify_password("secret123", stored), (True, False))
+
+        self.tracker.logout_user()
+        self.assertEqual(self.tracker.login_user("legacy", "secret123"), (True, "Login successful!"))
+        self.assertEqual(self.stored_password("legacy"), stored)  # Not rehashed again
+
+    def test_wrong_password_is_rejected(self):
+        legacy = hashlib.sha256(b"secret123").hexdigest()
+        self.add_user("legacy", legacy)
+
+        self.assertEqual(self.tracker.login_user("legacy", "secret124"), (False, "Incorrect password!, try again!..."))
+        self.assertIsNone(self.tracker.session)
+        self.assertEqual(self.stored_password("legacy"), legacy)
+
+    def test_refuses_logins_after_the_burst(self):
+        self.add_user("legacy", hashlib.sha256(b"secret123").hexdigest())
+        for _ in range(USER_BURST):
+            self.assertFalse(self.tracker.login_user("legacy", "wrong-password")[0])
+        success, message = self.tracker.login_user("legacy", "secret123")  # Even the right password waits
+        self.assertFalse(success)
+        self.assertTrue(message.startswith("Too many failed logins"), message)
+
+
+class LoginLimiterTest(unittest.TestCase):
+    def test_refuses_after_burst_and_refills(self):
+        clock = FakeClock()
+        limiter = LoginLimiter(clock=clock)
+        for _ in range(USER_BURST):
+            self.assertEqual(limiter.retry_after("alice"), 0)
+            limiter.failed("alice")
+        wait = limiter.retry_after("alice")
+        self.assertAlmostEqual(wait, 1 / USER_REFILL)
+        self.assertEqual(limiter.retry_after("bob"), 0)  # Other usernames are not affected
+
+        clock.now += wait / 2
+        self.assertAlmostEqual(limiter.retry_after("alice"), wait / 2)
+        clock.now += wait / 2
+        self.assertEqual(limiter.retry_after("alice"), 0)
+        limiter.failed("alice")
+        self.assertGreater(limiter.retry_after("alice"), 0)  # Only one token came back
+
+    def test_success_resets_the_bucket(self):
+        limiter = LoginLimiter(clock=FakeClock())
+        for _ in range(USER_BURST):
+            limiter.failed("alice")
+        limiter.succeeded("alice")
+        self.assertEqual(limiter.retry_after("alice"), 0)
+
+if __name__ == "__main__":
+    unittest.main()
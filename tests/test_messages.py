@@ -0,0 +1,34 @@
+import unittest
+from datetime import datetime, timedelta
+
+from _db import DatabaseTestCase
+from health_tracker import messages
+
+
+class ReplyTest(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        user_id = self.add_user()
+        with self.db.transaction() as tx:
+            self.doctor_id = tx.execute(
+                "INSERT INTO doctors (name, specialty, username, password) VALUES (%s, %s, %s, %s)",
+                ("Ann Lee", "Cardiology", "drlee", "unused")).lastrowid
+        self.message_id = messages.send(self.db, user_id, self.doctor_id, "Can we meet?", "appointment",
+                                        datetime.now() + timedelta(days=2))
+
+    def test_confirms_a_future_appointment(self):
+        appointment_at = (datetime.now() + timedelta(days=3)).replace(microsecond=0)
+        self.assertTrue(messages.reply(self.db, self.doctor_id, self.message_id, "See you then", appointment_at))
+        message = messages.open_message(self.db, self.doctor_id, self.message_id)
+        self.assertEqual((message.status, message.appointment_at), ("replied", appointment_at))
+
+    def test_rejects_an_appointment_in_the_past(self):
+        with self.assertRaisesRegex(ValueError, "must be in the future"):
+            messages.reply(self.db, self.doctor_id, self.message_id, "See you then",
+                           datetime.now() - timedelta(hours=1))
+        message = messages.open_message(self.db, self.doctor_id, self.message_id)
+        self.assertEqual((message.status, message.reply, message.appointment_at), ("read", None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+
+from _db import DatabaseTestCase
+from health_tracker.core import HealthTracker
+from health_tracker.summaries import check, load_summary, rebuild
+
+
+class SummaryDriftTest(DatabaseTestCase):
+    def test_logged_readings_match_a_rebuild(self):
+        tracker = HealthTracker(self.db, ingest=False)
+        self.assertTrue(tracker.register_user("alice", "secret123")[0])
+        self.assertTrue(tracker.login_user("alice", "secret123")[0])
+        for weight, blood_pressure, steps in [("70.5", "120/80", "6500"), ("71", "135/85", "4000"),
+                                              ("69.8", "118/76", "12000"), ("70.2", "185/110", "0"),
+                                              ("70", "142/92", "8000")]:
+            self.assertEqual(tracker.log_health_metrics(weight, blood_pressure, steps),
+                             (True, "Health metrics logged successfully!"))
+
+        user_id = tracker.session.user_id
+        self.assertEqual(check(self.db), [])
+        before = load_summary(self.db, user_id).to_row()
+        self.assertEqual(rebuild(self.db), 1)
+        self.assertEqual(check(self.db), [])
+        after = load_summary(self.db, user_id)
+        self.assertEqual((after.readings, after.latest_weight, after.bp_counts),
+                         (5, 70.0, {"normal": 1, "elevated": 0, "stage 1": 2, "stage 2": 2}))
+        self.assertEqual(after.to_row()[:9], before[:9])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+import unittest
+
+from health_tracker.tips import tip_rules
+
+
+class BucketsForReadingTest(unittest.TestCase):
+    def test_weight_gets_the_general_weight_tips(self):
+        rules = tip_rules()
+        self.assertEqual(rules.buckets_for_reading(weight="72.5"), (("weight", "any"),))
+        self.assertTrue(rules.tips_for(rules.buckets_for_reading(weight=72.5)))
+
+    def test_rejects_invalid_weight(self):
+        for weight in ("abc", "", [70]):
+            with self.subTest(weight=weight), self.assertRaisesRegex(ValueError, "Please enter valid numbers!"):
+                tip_rules().buckets_for_reading(weight=weight)
+
+    def test_rejects_invalid_values(self):
+        rules = tip_rules()
+        for metrics in ({"weight": "abc"}, {"weight": [70]}, {"blood_pressure": "120-80"}, {"steps": "many"}):
+            with self.subTest(metrics=metrics), self.assertRaises(ValueError):
+                rules.buckets_for_reading(**metrics)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+
+from health_tracker.validation import parse_health_metrics
+
+
+class ParseHealthMetricsTest(unittest.TestCase):
+    def test_valid_reading(self):
+        reading = parse_health_metrics("70.5", "120/80", "6500")
+        self.assertEqual(reading, (70.5, 120, 80, 6500))
+        self.assertEqual(reading.blood_pressure, "120/80")
+
+    def test_rejects_non_finite_weight(self):
+        # NaN is stored as NULL and used to break the user's progress summary
+        for weight in ("nan", "inf", "-inf", "1e400"):
+            with self.subTest(weight=weight), self.assertRaises(ValueError):
+                parse_health_metrics(weight, "120/80", "5000")
+
+    def test_rejects_out_of_range_weight_and_steps(self):
+        for weight, steps in (("-70", "5000"), ("0", "5000"), ("501", "5000"), ("70", "-1"), ("70", "100001")):
+            with self.subTest(weight=weight, steps=steps), self.assertRaises(ValueError):
+                parse_health_metrics(weight, "120/80", steps)
+
+    def test_rejects_malformed_values(self):
+        for args in (("abc", "120/80", "5000"), ("70", "120-80", "5000"), ("70", "120/80", "5.5"),
+                     ("70", "250/80", "5000")):
+            with self.subTest(args=args), self.assertRaises(ValueError):
+                parse_health_metrics(*args)
+
+
+if __name__ == "__main__":
+    unittest.main()